@@ -1,18 +1,20 @@
 import sys
-import os
-import shutil
-import winreg
-import ctypes
+from utils.startup_timeline import get_startup_timeline
 from PyQt5.QtWidgets import QApplication
 from ui.main_window import MystiAideApp
 
 
 if __name__ == "__main__":
+    timeline = get_startup_timeline()
+    timeline.mark("导入模块")
 
     # 启动主应用程序
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
-    
+    timeline.mark("创建应用")
+
     window = MystiAideApp()
+    timeline.mark("创建主窗口")
     window.show()
+    timeline.mark("显示主窗口")
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+# 测试直接导入程序目录下的 ui/utils 包，界面在没有显示器的环境中运行
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def standin():
+    """本地替身服务器，进程内共享的接口客户端在测试期间指向它"""
+    import utils.api_client as api_client
+    from standin_server import StandinServer
+
+    server = StandinServer().start()
+    saved = api_client._api_client
+    api_client._api_client = api_client.ApiClient(server.base_url)
+    try:
+        yield server
+    finally:
+        api_client._api_client = saved
+        server.stop()
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    """临时目录中的离线镜像，get_mirror() 在测试期间返回它"""
+    import utils.mirror as mirror_module
+
+    mirror = mirror_module.LibraryMirror(str(tmp_path / "mirror.sqlite3"))
+    saved = mirror_module._mirror
+    mirror_module._mirror = mirror
+    try:
+        yield mirror
+    finally:
+        mirror_module._mirror = saved
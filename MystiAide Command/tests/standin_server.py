@@ -0,0 +1,99 @@
+# 测试用的本地替身服务器，模拟命令库目录(cls/dir.php)和各命令库的 main.xml / list.xml
+import hashlib
+import threading
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.catalog import make_full_name
+
+ROOT = "/MystiAide"
+
+
+def make_library(name, commands):
+    """返回命令库的 (main.xml, list.xml)，commands 为 [(命令, 描述), ...]"""
+    main = f"<des>{name} 的描述</des><r>测试作者</r>"
+    list_text = "∅".join(f"{command} --- {description}" for command, description in commands)
+    return main, list_text
+
+
+class StandinServer:
+    """在随机端口上运行的替身服务器
+
+    catalog 为目录 [(名称, 描述), ...]；libraries 为 {完整名称: (main.xml, list.xml)}，
+    不在其中的命令库返回404。requests 记录每个路径被请求的次数。
+    """
+
+    def __init__(self, catalog=(), libraries=None):
+        self.catalog = list(catalog)
+        self.libraries = dict(libraries or {})
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}{ROOT}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def library_requests(self):
+        """命令库文件(main.xml / list.xml)被请求的总次数"""
+        return sum(count for path, count in self.requests.items() if path.startswith("cls/") and path != "cls/dir.php")
+
+    def catalog_body(self):
+        return "\n".join(make_full_name(name, desc) for name, desc in self.catalog).encode('utf-8')
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = urllib.parse.unquote(urllib.parse.urlparse(self.path).path)
+                if not path.startswith(ROOT + "/"):
+                    return self.reply(404)
+                path = path[len(ROOT) + 1:]
+                with server._lock:
+                    server.requests[path] += 1
+
+                if path == "cls/dir.php":
+                    body = server.catalog_body()
+                    etag = '"%s"' % hashlib.md5(body).hexdigest()
+                    if self.headers.get("If-None-Match") == etag:
+                        return self.reply(304, headers={"ETag": etag})
+                    return self.reply(200, body, {"ETag": etag})
+
+                parts = path.split("/")
+                if len(parts) == 3 and parts[0] == "cls" and parts[2] in ("main.xml", "list.xml"):
+                    library = server.libraries.get(parts[1])
+                    if library is None:
+                        return self.reply(404)
+                    text = library[0] if parts[2] == "main.xml" else library[1]
+                    return self.reply(200, text.encode('utf-8'))
+                return self.reply(404)
+
+            def do_HEAD(self):
+                self.reply(200)
+
+            def reply(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body and self.command != "HEAD":
+                    self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,137 @@
+import io
+import os
+
+import pytest
+
+from utils import machine_id
+from utils.aes_crypto import AESCrypto
+
+CHUNK = AESCrypto.CHUNK_SIZE
+SIZES = [0, 15, 16, 17, CHUNK - 1, CHUNK, CHUNK + 1]
+
+
+@pytest.fixture(autouse=True)
+def machine(monkeypatch):
+    monkeypatch.setattr(machine_id, "_compute_machine_info", lambda: "Test:1:MystiAide_Secret_Key")
+    machine_id.invalidate_machine_info()
+    yield
+    machine_id.invalidate_machine_info()
+
+
+def make_data(size):
+    return bytes(i * 7 % 251 for i in range(size))
+
+
+class TrickleReader(io.RawIOBase):
+    """像管道一样每次最多只返回几个字节的文件对象"""
+
+    def __init__(self, data, step=5):
+        self._data = memoryview(data)
+        self._pos = 0
+        self._step = step
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        end = self._pos + min(size, self._step) if size >= 0 else len(self._data)
+        chunk = bytes(self._data[self._pos:end])
+        self._pos += len(chunk)
+        return chunk
+
+
+def encrypt(src, chunk_size=None):
+    dst = io.BytesIO()
+    written = AESCrypto.encrypt_stream(src, dst, chunk_size)
+    assert written == len(dst.getvalue())
+    return dst.getvalue()
+
+
+def decrypt(src, chunk_size=None):
+    dst = io.BytesIO()
+    written = AESCrypto.decrypt_stream(src, dst, chunk_size)
+    assert written == len(dst.getvalue())
+    return dst.getvalue()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_stream_round_trip_at_chunk_boundaries(size):
+    data = make_data(size)
+
+    encrypted = encrypt(io.BytesIO(data))
+    assert len(encrypted) == 16 + (size // 16 + 1) * 16
+    assert decrypt(io.BytesIO(encrypted)) == data
+    # 缓冲区(bytes)输入走另一条分块路径，结果与 encrypt_bytes/decrypt_bytes 兼容
+    assert decrypt(encrypted) == data
+    assert AESCrypto.decrypt_bytes(encrypted) == data
+    assert decrypt(AESCrypto.encrypt_bytes(data)) == data
+    assert AESCrypto.decrypt_bytes(encrypt(data)) == data
+
+
+@pytest.mark.parametrize("size", [0, 15, 16, 17, 95, 96, 97])
+def test_small_chunks_and_short_reads(size):
+    data = make_data(size)
+
+    encrypted = encrypt(TrickleReader(data), chunk_size=32)
+    assert decrypt(TrickleReader(encrypted), chunk_size=32) == data
+    assert decrypt(encrypted, chunk_size=32) == data
+
+
+def test_chunk_size_must_be_a_multiple_of_the_block_size():
+    with pytest.raises(ValueError):
+        encrypt(b"data", chunk_size=20)
+    with pytest.raises(ValueError):
+        decrypt(encrypt(b"data"), chunk_size=20)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+@pytest.mark.parametrize("size", SIZES)
+def test_file_round_trip(tmp_path, size, use_mmap):
+    data = make_data(size)
+    plain_path = str(tmp_path / "plain.bin")
+    with open(plain_path, 'wb') as f:
+        f.write(data)
+
+    assert AESCrypto.encrypt_file(plain_path, use_mmap=use_mmap)
+    os.remove(plain_path)
+    assert AESCrypto.decrypt_file(plain_path + ".enc", use_mmap=use_mmap)
+
+    with open(plain_path, 'rb') as f:
+        assert f.read() == data
+    assert sorted(os.listdir(tmp_path)) == ["plain.bin", "plain.bin.enc"]
+
+
+def corrupt_truncated(encrypted):
+    return encrypted[:-5]          # 长度不是16的倍数
+
+
+def corrupt_padding(encrypted):
+    return encrypted[:-1] + bytes([encrypted[-1] ^ 0xFF])  # 最后一个分组解密后填充无效
+
+
+def corrupt_missing_iv(encrypted):
+    return encrypted[:10]
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+@pytest.mark.parametrize("corrupt", [corrupt_truncated, corrupt_padding, corrupt_missing_iv])
+def test_corrupt_file_fails_without_leaving_output(tmp_path, corrupt, use_mmap):
+    encrypted = AESCrypto.encrypt_bytes(make_data(CHUNK + 1))
+    enc_path = tmp_path / "data.bin.enc"
+    enc_path.write_bytes(corrupt(encrypted))
+
+    assert AESCrypto.decrypt_file(str(enc_path), use_mmap=use_mmap) is False
+
+    assert os.listdir(tmp_path) == ["data.bin.enc"]
+
+
+def test_failed_decryption_keeps_existing_output(tmp_path):
+    out_path = tmp_path / "data.bin"
+    out_path.write_bytes(b"old contents")
+    enc_path = tmp_path / "data.bin.enc"
+    enc_path.write_bytes(corrupt_padding(AESCrypto.encrypt_bytes(b"new contents")))
+
+    assert AESCrypto.decrypt_file(str(enc_path)) is False
+
+    assert out_path.read_bytes() == b"old contents"
+    assert sorted(os.listdir(tmp_path)) == ["data.bin", "data.bin.enc"]
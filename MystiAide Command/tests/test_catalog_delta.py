@@ -0,0 +1,225 @@
+import random
+
+import pytest
+from PyQt5.QtCore import QPersistentModelIndex
+
+from ui.catalog_model import CatalogTableModel
+from utils.catalog import MAX_MOVED_ROWS, CatalogDelta, CatalogRowList, diff_catalog, plan_moves
+
+
+def make_rows(count, start=0):
+    return [(f"库{i}", f"作者{i % 7}@{i}") for i in range(start, start + count)]
+
+
+def apply_to_list(rows, delta):
+    """按 CatalogDelta 的定义在普通列表上应用差异"""
+    rows = CatalogRowList(rows)
+    for start, count in delta.removed_ranges():
+        del rows[start:start + count]
+    if delta.moves is None:
+        rows[:] = [rows[i] for i in delta.order]
+    for first, count, dest in delta.moves or ():
+        rows.move_rows(first, count, dest)
+    for start, inserted in delta.inserted_ranges():
+        rows[start:start] = inserted
+    for start, changed in delta.changed_ranges():
+        rows[start:start + len(changed)] = changed
+    return list(rows)
+
+
+class ModelRecorder:
+    """记录模型发出的结构变化信号"""
+
+    def __init__(self, model):
+        self.events = []
+        model.modelReset.connect(lambda: self.events.append("reset"))
+        model.layoutChanged.connect(lambda *args: self.events.append("layout"))
+        model.rowsRemoved.connect(lambda parent, first, last: self.events.append(("removed", first, last)))
+        model.rowsInserted.connect(lambda parent, first, last: self.events.append(("inserted", first, last)))
+        model.rowsMoved.connect(lambda parent, first, last, dest_parent, dest:
+                                self.events.append(("moved", first, last, dest)))
+        model.dataChanged.connect(lambda top_left, bottom_right, roles:
+                                  self.events.append(("changed", top_left.row(), bottom_right.row())))
+
+
+def make_model(rows):
+    model = CatalogTableModel()
+    model.append_rows(rows)
+    return model
+
+
+# ---- diff_catalog ----
+
+def test_identical_catalogs_give_empty_delta():
+    rows = make_rows(50)
+    delta = diff_catalog(rows, list(rows))
+    assert delta.is_empty()
+    assert delta.order is None
+
+
+def test_added_rows():
+    old = make_rows(20)
+    new = old[:5] + [("新库A", "作者@100")] + old[5:] + [("新库B", "作者@101"), ("新库C", "作者@102")]
+    delta = diff_catalog(old, new)
+    assert delta.order is None
+    assert delta.removed == []
+    assert delta.inserted == [(5, ("新库A", "作者@100")), (21, ("新库B", "作者@101")), (22, ("新库C", "作者@102"))]
+    assert delta.inserted_ranges() == [(5, [("新库A", "作者@100")]),
+                                       (21, [("新库B", "作者@101"), ("新库C", "作者@102")])]
+    assert apply_to_list(old, delta) == new
+
+
+def test_removed_rows():
+    old = make_rows(20)
+    new = old[:3] + old[6:10] + old[11:]
+    delta = diff_catalog(old, new)
+    assert delta.order is None
+    assert delta.inserted == []
+    assert delta.removed == [3, 4, 5, 10]
+    # 从后往前删除，前面的行号不受影响
+    assert delta.removed_ranges() == [(10, 1), (3, 3)]
+    assert apply_to_list(old, delta) == new
+
+
+def test_changed_description_is_an_update():
+    old = make_rows(10)
+    new = list(old)
+    new[4] = ("库4", "改过的描述@4")
+    delta = diff_catalog(old, new)
+    assert delta.removed == []
+    assert delta.inserted == []
+    assert delta.changed == [(4, ("库4", "改过的描述@4"))]
+    assert apply_to_list(old, delta) == new
+
+
+def test_mixed_changes_round_trip():
+    old = make_rows(100)
+    new = old[:10] + make_rows(3, start=500) + old[15:60] + old[61:] + make_rows(2, start=900)
+    new[30] = (new[30][0], "新描述")
+    delta = diff_catalog(old, new)
+    assert delta.order is None
+    assert delta.changed == [(30, new[30])]
+    assert apply_to_list(old, delta) == new
+
+
+def test_reorder_becomes_moves():
+    old = make_rows(10)
+    new = old[1:2] + old[:1] + old[2:8] + old[9:] + old[8:9]
+    delta = diff_catalog(old, new)
+    assert delta.removed == delta.inserted == delta.changed == []
+    assert len(delta.moves) == 2
+    assert apply_to_list(old, delta) == new
+
+
+def test_reorder_with_removed_inserted_and_changed_rows():
+    old = make_rows(50)
+    new = [("新库", "作者@1")] + old[40:] + old[:10] + old[12:40]
+    new[20] = (new[20][0], "新描述")
+    delta = diff_catalog(old, new)
+    assert delta.removed == [10, 11]
+    assert delta.moves
+    assert apply_to_list(old, delta) == new
+
+
+def test_large_reorder_is_a_single_layout_change():
+    old = make_rows(MAX_MOVED_ROWS * 3)
+    new = list(old)
+    random.Random(1).shuffle(new)
+    delta = diff_catalog(old, new)
+    assert delta.moves is None
+    assert apply_to_list(old, delta) == new
+
+
+@pytest.mark.parametrize("old, new", [
+    (make_rows(5), make_rows(5) + make_rows(1)),                      # 新目录多了一个同名行
+    (make_rows(5) + make_rows(1), make_rows(5)),                      # 旧目录的同名行被删除
+    ([("库", "甲"), ("库", "乙")], [("库", "乙"), ("库", "丙")]),     # 同名的行按出现顺序对应
+])
+def test_rows_with_the_same_name_are_matched_in_order(old, new):
+    assert apply_to_list(old, diff_catalog(old, new)) == new
+
+
+def test_plan_moves_reproduces_the_new_order():
+    rng = random.Random(2)
+    for _ in range(300):
+        order = list(range(rng.randint(0, 30)))
+        for _ in range(rng.randint(0, 4)):
+            if order:
+                order.insert(rng.randrange(len(order)), order.pop(rng.randrange(len(order))))
+        rows = CatalogRowList(range(len(order)))
+        for first, count, dest in plan_moves(order):
+            rows.move_rows(first, count, dest)
+        assert rows == order
+    assert plan_moves([1, 2, 3, 0]) == [(0, 1, 4)]
+    assert plan_moves([2, 0, 1], limit=0) is None
+
+
+# ---- CatalogTableModel.apply_delta ----
+
+def test_apply_delta_updates_rows_incrementally():
+    old = make_rows(200)
+    new = old[:3] + old[6:150] + make_rows(4, start=1000) + old[150:]
+    new[100] = (new[100][0], "改过的描述")
+    model = make_model(old)
+    recorder = ModelRecorder(model)
+
+    model.apply_delta(diff_catalog(old, new))
+
+    assert recorder.events == [("removed", 3, 5), ("inserted", 147, 150), ("changed", 100, 100)]
+    assert list(model.store()) == new
+    assert model.rowCount() == len(new)
+
+
+def test_apply_large_delta_stays_incremental():
+    old = make_rows(3000)
+    new = [row for i, row in enumerate(old) if i % 3] + make_rows(1000, start=5000)
+    new[::4] = [(name, "新描述") for name, desc in new[::4]]
+    model = make_model(old)
+    recorder = ModelRecorder(model)
+
+    model.apply_delta(diff_catalog(old, new))
+
+    assert "reset" not in recorder.events
+    assert ("inserted", 2000, 2999) in recorder.events
+    assert list(model.store()) == new
+
+
+def test_apply_delta_moves_rows_and_keeps_persistent_indexes(qapp):
+    old = make_rows(10)
+    new = old[:2] + old[3:8] + old[2:3] + old[8:]
+    model = make_model(old)
+    kept = QPersistentModelIndex(model.index(2, 0))
+    recorder = ModelRecorder(model)
+
+    model.apply_delta(diff_catalog(old, new))
+
+    assert recorder.events == [("moved", 2, 2, 8)]
+    assert list(model.store()) == new
+    assert kept.row() == 7
+
+
+def test_apply_large_reorder_changes_layout_without_reset(qapp):
+    old = make_rows(MAX_MOVED_ROWS * 3)
+    new = list(old)
+    random.Random(3).shuffle(new)
+    model = make_model(old)
+    kept = QPersistentModelIndex(model.index(42, 1))
+    recorder = ModelRecorder(model)
+
+    model.apply_delta(diff_catalog(old, new))
+
+    assert recorder.events == ["layout"]
+    assert list(model.store()) == new
+    assert kept.row() == new.index(old[42])
+    assert kept.column() == 1
+
+
+def test_apply_empty_delta_changes_nothing():
+    old = make_rows(10)
+    model = make_model(old)
+    recorder = ModelRecorder(model)
+
+    model.apply_delta(CatalogDelta())
+
+    assert recorder.events == []
+    assert list(model.store()) == old
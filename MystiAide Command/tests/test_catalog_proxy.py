@@ -0,0 +1,182 @@
+import pytest
+from PyQt5.QtCore import QItemSelectionModel, QPersistentModelIndex
+
+from ui.catalog_model import CatalogTableModel, CatalogFilterProxy
+
+
+def make_rows(count, start=0):
+    return [(f"库{i}", f"作者@{i}") for i in range(start, start + count)]
+
+
+@pytest.fixture
+def models(qapp):
+    model = CatalogTableModel()
+    model.append_rows(make_rows(100))
+    proxy = CatalogFilterProxy()
+    proxy.setSourceModel(model)
+    return model, proxy
+
+
+def visible_names(proxy):
+    return [proxy.index(row, 0).data() for row in range(proxy.rowCount())]
+
+
+def test_unfiltered_proxy_shows_every_row(models):
+    model, proxy = models
+    assert not proxy.is_filtered()
+    assert proxy.rowCount() == 100
+    assert proxy.columnCount() == 2
+    assert proxy.index(42, 1).data() == "作者@42"
+    assert proxy.headerData(0, 1) == "名称"
+    assert not proxy.index(100, 0).isValid()
+
+
+def test_visible_rows_map_to_source_rows(models):
+    model, proxy = models
+    proxy.set_visible_rows([3, 10, 57])
+    assert proxy.is_filtered()
+    assert visible_names(proxy) == ["库3", "库10", "库57"]
+    assert proxy.mapToSource(proxy.index(1, 0)).row() == 10
+    assert proxy.mapFromSource(model.index(57, 1)).row() == 2
+    assert not proxy.mapFromSource(model.index(4, 0)).isValid()
+
+    proxy.set_visible_rows(None)
+    assert proxy.rowCount() == 100
+
+
+def test_filtering_keeps_persistent_indexes_that_stay_visible(models):
+    model, proxy = models
+    kept = QPersistentModelIndex(proxy.index(57, 0))
+    hidden = QPersistentModelIndex(proxy.index(4, 0))
+
+    proxy.set_visible_rows([3, 10, 57])
+    assert kept.row() == 2
+    assert not hidden.isValid()
+
+    proxy.set_visible_rows(None)
+    assert kept.row() == 57
+
+
+def test_selection_survives_a_new_search(models):
+    model, proxy = models
+    selection = QItemSelectionModel(proxy)
+    selection.setCurrentIndex(proxy.index(20, 0), QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
+
+    proxy.set_visible_rows(list(range(0, 100, 5)))
+    assert selection.currentIndex().row() == 4
+    assert selection.isRowSelected(4, proxy.index(0, 0).parent())
+
+    proxy.set_visible_rows(None)
+    assert selection.currentIndex().row() == 20
+
+
+def test_same_result_list_is_not_applied_twice(models):
+    model, proxy = models
+    layouts = []
+    proxy.layoutChanged.connect(lambda *args: layouts.append(args))
+    rows = [1, 2, 3]
+    proxy.set_visible_rows(rows)
+    proxy.set_visible_rows(rows)
+    proxy.set_visible_rows(None)
+    proxy.set_visible_rows(None)
+    assert len(layouts) == 2
+
+
+def test_source_changes_are_forwarded_when_unfiltered(models):
+    model, proxy = models
+    events = []
+    proxy.rowsInserted.connect(lambda parent, first, last: events.append(("inserted", first, last)))
+    proxy.rowsRemoved.connect(lambda parent, first, last: events.append(("removed", first, last)))
+
+    model.append_rows(make_rows(2, 100))
+    model.beginRemoveRows(proxy.index(0, 0).parent(), 10, 19)
+    model.store().replace_range(10, 20, [])
+    model.endRemoveRows()
+
+    assert events == [("inserted", 100, 101), ("removed", 10, 19)]
+    assert proxy.rowCount() == 92
+    assert proxy.index(10, 0).data() == "库20"
+
+
+def test_source_rows_removed_while_filtered(models):
+    model, proxy = models
+    proxy.set_visible_rows([5, 12, 15, 40, 80])
+    tail = QPersistentModelIndex(proxy.index(4, 0))
+    events = []
+    proxy.rowsRemoved.connect(lambda parent, first, last: events.append((first, last)))
+
+    model.beginRemoveRows(proxy.index(0, 0).parent(), 10, 19)
+    model.store().replace_range(10, 20, [])
+    model.endRemoveRows()
+
+    # 可见的 12 和 15 随源模型删除，之后的行号前移
+    assert events == [(1, 2)]
+    assert visible_names(proxy) == ["库5", "库40", "库80"]
+    assert proxy.mapToSource(proxy.index(2, 0)).row() == 70
+    assert tail.row() == 2
+
+
+def test_source_rows_inserted_while_filtered_stay_hidden(models):
+    model, proxy = models
+    proxy.set_visible_rows([5, 40])
+    model.beginInsertRows(proxy.index(0, 0).parent(), 10, 11)
+    model.store().replace_range(10, 10, [("新库A", "x"), ("新库B", "y")])
+    model.endInsertRows()
+
+    assert visible_names(proxy) == ["库5", "库40"]
+    assert proxy.mapToSource(proxy.index(1, 0)).row() == 42
+
+
+def test_data_changes_are_mapped_to_visible_rows(models):
+    model, proxy = models
+    proxy.set_visible_rows([5, 12, 15, 40])
+    changes = []
+    proxy.dataChanged.connect(lambda top_left, bottom_right, roles: changes.append((top_left.row(), bottom_right.row())))
+
+    model.dataChanged.emit(model.index(10, 0), model.index(20, 1))
+    model.dataChanged.emit(model.index(30, 0), model.index(35, 1))
+    assert changes == [(1, 2)]
+
+
+def test_source_moves_while_filtered_resort_the_visible_rows(models):
+    model, proxy = models
+    proxy.set_visible_rows([2, 50, 60])
+    moved = QPersistentModelIndex(proxy.index(1, 0))
+
+    # 把第 50 行移动到第 0 行之前
+    parent = proxy.index(0, 0).parent()
+    assert model.beginMoveRows(parent, 50, 50, parent, 0)
+    rows = list(model.store())
+    rows.insert(0, rows.pop(50))
+    model.store().replace_range(0, len(rows), rows)
+    model.endMoveRows()
+
+    assert visible_names(proxy) == ["库50", "库2", "库60"]
+    assert moved.row() == 0
+
+
+def test_source_reset_shows_every_row_again(models):
+    model, proxy = models
+    proxy.set_visible_rows([1, 2])
+    model.clear()
+    assert not proxy.is_filtered()
+    assert proxy.rowCount() == 0
+
+
+def test_source_layout_change_keeps_persistent_indexes(models):
+    model, proxy = models
+    proxy.set_visible_rows([3, 10, 57])
+    kept = QPersistentModelIndex(proxy.index(2, 1))
+
+    # 源模型整体重新排列：行号倒过来
+    model.layoutAboutToBeChanged.emit()
+    rows = list(model.store())[::-1]
+    model.store().replace_range(0, len(rows), rows)
+    source_indexes = model.persistentIndexList()
+    model.changePersistentIndexList(source_indexes, [model.index(99 - index.row(), index.column())
+                                                      for index in source_indexes])
+    model.layoutChanged.emit()
+
+    assert not proxy.is_filtered()
+    assert kept.row() == 42
+    assert kept.data() == "作者@57"
@@ -0,0 +1,80 @@
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+import ui.command_detail_dialog as dialog_module
+from standin_server import make_library
+from ui.command_detail_dialog import CommandDetailDialog
+from ui.prefetcher import DetailPrefetcher
+from utils.detail_cache import LibraryDetailCache
+from utils.request_scheduler import INTERACTIVE, PREFETCH
+
+LIBRARY = "Git 常用命令≈作者甲@1"
+
+
+@pytest.fixture
+def detail_cache(tmp_path, monkeypatch):
+    cache = LibraryDetailCache(str(tmp_path))
+    monkeypatch.setattr(dialog_module, "get_detail_cache", lambda: cache)
+    monkeypatch.setattr(dialog_module, "get_mirror", lambda: None)
+    return cache
+
+
+@pytest.fixture
+def priorities(standin, monkeypatch):
+    """记录对话框请求命令库文件时使用的优先级"""
+    import utils.api_client as api_client
+
+    api = api_client._api_client
+    recorded = {}
+    library_file = api.library_file
+
+    def recording_library_file(list_name, filename, priority=INTERACTIVE, *args, **kwargs):
+        recorded[filename] = priority
+        return library_file(list_name, filename, priority, *args, **kwargs)
+
+    monkeypatch.setattr(api, "library_file", recording_library_file)
+    standin.libraries[LIBRARY] = make_library("Git 常用命令", [("git status", "查看状态")])
+    return recorded
+
+
+def open_dialog():
+    dialog = CommandDetailDialog(LIBRARY)
+    for worker in dialog.fetch_workers:
+        worker.wait(5000)
+    QCoreApplication.processEvents()
+    return dialog
+
+
+def test_fresh_cache_is_shown_without_requests(qapp, standin, detail_cache, priorities):
+    detail_cache.put(LIBRARY, "main", "<des>缓存的描述</des>")
+    detail_cache.put(LIBRARY, "list", "git log --- 查看历史")
+
+    dialog = open_dialog()
+
+    assert dialog.fetch_workers == []
+    assert standin.library_requests() == 0
+    assert dialog.shown_content["list"] == "git log --- 查看历史"
+    dialog.close()
+
+
+def test_stale_cache_is_revalidated_at_prefetch_priority(qapp, standin, detail_cache, priorities, monkeypatch):
+    detail_cache.put(LIBRARY, "main", "<des>旧的描述</des>")
+    detail_cache.put(LIBRARY, "list", "git log --- 查看历史")
+    monkeypatch.setattr(DetailPrefetcher, "FRESH_SECONDS", 0)  # 缓存立即过期
+
+    dialog = open_dialog()
+
+    assert priorities == {"main.xml": PREFETCH, "list.xml": PREFETCH}
+    assert dialog.shown_content["list"] == "git status --- 查看状态"
+    assert detail_cache.peek(LIBRARY)["list"] == "git status --- 查看状态"
+    dialog.close()
+
+
+def test_missing_parts_are_fetched_at_interactive_priority(qapp, standin, detail_cache, priorities):
+    detail_cache.put(LIBRARY, "main", "<des>缓存的描述</des>")
+
+    dialog = open_dialog()
+
+    assert priorities == {"main.xml": PREFETCH, "list.xml": INTERACTIVE}
+    assert dialog.shown_content["list"] == "git status --- 查看状态"
+    dialog.close()
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from utils import machine_id
+from utils.credential_store import CredentialStore
+
+
+@pytest.fixture
+def machine(monkeypatch, tmp_path):
+    """可以更换的机器信息，登录文件保存在临时目录中"""
+    monkeypatch.setenv("APPDATA", str(tmp_path))
+    current = {"info": "Test:1:MystiAide_Secret_Key"}
+    monkeypatch.setattr(machine_id, "_compute_machine_info", lambda: current["info"])
+    machine_id.invalidate_machine_info()
+    yield current
+    machine_id.invalidate_machine_info()
+
+
+def test_saved_login_is_read_back(machine):
+    assert CredentialStore().save("alice", "42")
+
+    login = CredentialStore().load()
+
+    assert (login["username"], login["user_id"]) == ("alice", "42")
+
+
+def test_machine_info_is_computed_once(machine, monkeypatch):
+    calls = []
+    monkeypatch.setattr(machine_id, "_compute_machine_info", lambda: calls.append(1) or "Test:2:Key")
+    machine_id.invalidate_machine_info()
+
+    store = CredentialStore()
+    store.save("alice", "42")
+    store.clear()
+    store.save("bob", "7")
+
+    assert len(calls) == 1
+
+
+def test_store_follows_invalidated_machine_info(machine):
+    store = CredentialStore()
+    store.save("alice", "42")
+    old_path = store.path
+    assert store.load()["username"] == "alice"
+
+    machine["info"] = "Test:2:MystiAide_Secret_Key"
+    machine_id.invalidate_machine_info()
+
+    # 新的机器信息对应另一个文件，旧的登录状态不再使用
+    assert store.path != old_path
+    assert store.load() is None
+    assert os.path.exists(old_path)
+
+    store.save("bob", "7")
+    assert os.path.exists(store.path)
+    assert CredentialStore().load()["username"] == "bob"
+
+
+def test_invalidation_without_change_keeps_login(machine):
+    store = CredentialStore()
+    store.save("alice", "42")
+
+    machine_id.invalidate_machine_info()
+
+    assert store.load()["username"] == "alice"
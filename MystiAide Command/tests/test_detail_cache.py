@@ -0,0 +1,37 @@
+import threading
+
+from utils.detail_cache import LibraryDetailCache
+
+
+def test_concurrent_puts_of_both_parts_are_merged(tmp_path):
+    cache = LibraryDetailCache(str(tmp_path))
+    names = [f"库{i}≈作者@{i}" for i in range(30)]
+    barrier = threading.Barrier(2)
+
+    def put_all(part):
+        for name in names:
+            barrier.wait()
+            cache.put(name, part, f"{part}:{name}")
+
+    threads = [threading.Thread(target=put_all, args=(part,)) for part in ("main", "list")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reloaded = LibraryDetailCache(str(tmp_path))
+    for name in names:
+        for entry in (cache.peek(name), reloaded.get(name)):
+            assert entry["main"] == f"main:{name}"
+            assert entry["list"] == f"list:{name}"
+
+
+def test_put_merges_with_the_entry_on_disk(tmp_path):
+    LibraryDetailCache(str(tmp_path)).put("库≈作者@1", "main", "<des>描述</des>")
+
+    cache = LibraryDetailCache(str(tmp_path))
+    cache.put("库≈作者@1", "list", "git status --- 查看状态")
+
+    entry = LibraryDetailCache(str(tmp_path)).get("库≈作者@1")
+    assert entry["main"] == "<des>描述</des>"
+    assert entry["list"] == "git status --- 查看状态"
@@ -0,0 +1,211 @@
+import sqlite3
+import threading
+
+import pytest
+
+from standin_server import make_library
+from ui.mirror_sync import MirrorSyncWorker
+from utils.catalog import make_full_name
+from utils.mirror import LibraryMirror
+
+CATALOG = [
+    ("Git 常用命令", "作者甲@1"),
+    ("Docker 容器", "作者乙@2"),
+    ("网络诊断工具", "作者甲@3"),
+]
+COMMANDS = {
+    "Git 常用命令": [("git status", "查看工作区状态"), ("git commit -m", "提交暂存的修改"),
+                    ("git log --oneline", "单行显示提交历史")],
+    "Docker 容器": [("docker ps", "列出运行中的容器"), ("docker logs -f", "持续输出容器日志"),
+                  ("docker exec -it", "在容器中执行命令")],
+    "网络诊断工具": [("ping", "测试网络连通性"), ("traceroute", "显示数据包经过的路由"),
+               ("netstat -tlnp", "查看监听的端口和进程")],
+}
+
+
+def full_name(name):
+    return make_full_name(name, dict(CATALOG)[name])
+
+
+def serve_catalog(standin, skip=()):
+    standin.catalog = list(CATALOG)
+    standin.libraries = {full_name(name): make_library(name, commands)
+                         for name, commands in COMMANDS.items() if name not in skip}
+
+
+def run_sync(rows):
+    """在当前线程执行一次同步，返回 (sync_finished 的参数, sync_failed 的参数)"""
+    worker = MirrorSyncWorker(rows)
+    finished, failed = [], []
+    worker.sync_finished.connect(lambda synced, errors: finished.append((synced, errors)))
+    worker.sync_failed.connect(failed.append)
+    worker.run()
+    return finished, failed
+
+
+def store_all(mirror):
+    mirror.replace_catalog(CATALOG)
+    for name, commands in COMMANDS.items():
+        mirror.store_library(full_name(name), *make_library(name, commands))
+
+
+# ---- WAL 镜像和同步 ----
+
+def test_mirror_uses_wal(mirror):
+    assert mirror._conn().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_reads_are_not_blocked_by_an_open_write(mirror):
+    mirror.replace_catalog(CATALOG)
+    writer = sqlite3.connect(mirror.path, timeout=0)
+    try:
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("UPDATE libraries SET synced_at = 1")
+        # 写事务未提交时，另一个线程仍能立即读到提交前的内容
+        result = []
+        reader = threading.Thread(target=lambda: result.append(mirror.stats()))
+        reader.start()
+        reader.join(5)
+        assert result == [(3, 0)]
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_sync_mirrors_every_library(qapp, standin, mirror):
+    serve_catalog(standin)
+
+    finished, failed = run_sync(CATALOG)
+
+    assert failed == []
+    assert finished == [(3, 0)]
+    assert mirror.stats() == (3, 3)
+    assert mirror.catalog_rows() == CATALOG
+    assert [c['command'] for c in mirror.get_commands(full_name("Docker 容器"))] == \
+        ["docker ps", "docker logs -f", "docker exec -it"]
+    assert mirror.get_library(full_name("Git 常用命令"))["main"].startswith("<des>Git 常用命令")
+    assert mirror.get_meta("last_sync") is not None
+
+
+def test_sync_resumes_with_remaining_libraries(qapp, standin, mirror):
+    serve_catalog(standin, skip=("Docker 容器",))
+
+    finished, _ = run_sync(CATALOG)
+    assert finished == [(2, 1)]
+    assert mirror.pending_libraries() == [full_name("Docker 容器")]
+
+    # 再次同步只获取上次失败的命令库
+    serve_catalog(standin)
+    standin.requests.clear()
+    finished, _ = run_sync(CATALOG)
+    assert finished == [(1, 0)]
+    assert standin.library_requests() == 2
+    assert mirror.stats() == (3, 3)
+
+    standin.requests.clear()
+    assert run_sync(CATALOG)[0] == [(0, 0)]
+    assert standin.library_requests() == 0
+
+
+def test_removed_library_is_dropped_with_its_commands(mirror):
+    store_all(mirror)
+    mirror.replace_catalog(CATALOG[:2])
+
+    assert mirror.stats() == (2, 2)
+    assert mirror.get_commands(full_name("网络诊断工具")) == []
+    assert mirror.search_commands("traceroute") == []
+
+
+# ---- FTS5 全文搜索 ----
+
+@pytest.fixture
+def trigram_mirror(mirror):
+    if mirror.fts_tokenizer != "trigram":
+        pytest.skip("SQLite 不支持 trigram 分词")
+    store_all(mirror)
+    return mirror
+
+
+def commands_of(results):
+    return [command for _, _, command, _ in results]
+
+
+def test_search_matches_any_fragment(trigram_mirror):
+    assert commands_of(trigram_mirror.search_commands("tatu")) == ["git status"]
+    assert commands_of(trigram_mirror.search_commands("oneline")) == ["git log --oneline"]
+
+
+def test_search_matches_chinese_in_description(trigram_mirror):
+    results = trigram_mirror.search_commands("容器日志")
+    assert results == [(full_name("Docker 容器"), 1, "docker logs -f", "持续输出容器日志")]
+
+
+def test_search_requires_every_term(trigram_mirror):
+    assert commands_of(trigram_mirror.search_commands("docker 容器中")) == ["docker exec -it"]
+    assert trigram_mirror.search_commands("docker traceroute") == []
+
+
+def add_description_match(mirror):
+    """加入一个只在描述中出现 netstat 的命令"""
+    name = "命令与描述"
+    mirror.replace_catalog(CATALOG + [(name, "作者丙@4")])
+    mirror.store_library(make_full_name(name, "作者丙@4"), *make_library(name, [
+        ("echo 端口", "输出 netstat 的说明"),
+        ("netstat -an", "显示所有连接"),
+    ]))
+
+
+def test_command_matches_rank_before_description_matches(trigram_mirror):
+    add_description_match(trigram_mirror)
+
+    results = commands_of(trigram_mirror.search_commands("netstat"))
+
+    assert sorted(results[:2]) == ["netstat -an", "netstat -tlnp"]
+    assert results[2:] == ["echo 端口"]
+
+
+def test_broad_queries_put_command_matches_first(trigram_mirror):
+    add_description_match(trigram_mirror)
+    # 匹配数量超过 RANK_MAX 时不再按相关度排序，只把命令本身匹配的排在前面
+    trigram_mirror.RANK_MAX = 1
+
+    results = commands_of(trigram_mirror.search_commands("netstat"))
+
+    assert sorted(results[:2]) == ["netstat -an", "netstat -tlnp"]
+    assert results[2:] == ["echo 端口"]
+    assert len(trigram_mirror.search_commands("netstat", limit=2)) == 2
+    assert commands_of(trigram_mirror.search_commands("netstat", limit=3))[2:] == ["echo 端口"]
+
+
+def test_short_terms_fall_back_to_like(trigram_mirror):
+    assert commands_of(trigram_mirror.search_commands("ps")) == ["docker ps"]
+    assert commands_of(trigram_mirror.search_commands("端口")) == ["netstat -tlnp"]
+
+
+def test_query_syntax_is_escaped(trigram_mirror):
+    for query in ('"git', 'git"', "AND NOT", "st*", "status)", "NEAR(git", "-m"):
+        trigram_mirror.search_commands(query)
+    assert commands_of(trigram_mirror.search_commands("commit -m")) == ["git commit -m"]
+
+
+def test_index_follows_resynced_library(trigram_mirror):
+    name = "Git 常用命令"
+    trigram_mirror.store_library(full_name(name), *make_library(name, [("git stash", "暂存当前修改")]))
+
+    assert trigram_mirror.search_commands("status") == []
+    assert commands_of(trigram_mirror.search_commands("stash")) == ["git stash"]
+
+
+def test_existing_commands_are_indexed_when_fts_is_added(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    old = LibraryMirror(path)
+    if old.fts_tokenizer != "trigram":
+        pytest.skip("SQLite 不支持 trigram 分词")
+    store_all(old)
+    # 模拟建立全文索引之前的镜像
+    conn = old._conn()
+    conn.executescript("DROP TABLE commands_fts; DROP TRIGGER commands_fts_insert; DROP TRIGGER commands_fts_delete;")
+
+    reopened = LibraryMirror(path)
+
+    assert commands_of(reopened.search_commands("traceroute")) == ["traceroute"]
@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+from PyQt5 import sip
+from PyQt5.QtCore import QCoreApplication, QEvent
+
+import ui.prefetcher as prefetcher_module
+from standin_server import make_library
+from ui.prefetcher import DetailPrefetcher
+from ui.workers import FetchWorker, retire_worker
+from utils.api_client import ApiResponse
+from utils.detail_cache import LibraryDetailCache
+
+LIBRARY = "Git 常用命令≈作者甲@1"
+
+
+def process_deferred_deletes():
+    QCoreApplication.processEvents()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+
+def test_retire_worker_releases_finished_thread(qapp):
+    worker = FetchWorker(lambda cancel_token: ApiResponse(200, "ok"))
+    worker.start()
+    worker.wait(5000)
+    process_deferred_deletes()  # finished 已经发出
+
+    retire_worker(worker)
+    process_deferred_deletes()
+
+    assert sip.isdeleted(worker)
+
+
+def test_retire_worker_keeps_running_thread_until_it_ends(qapp):
+    started = threading.Event()
+
+    def request(cancel_token):
+        started.set()
+        cancel_token.wait(5)
+        return ApiResponse(200, "ok")
+
+    worker = FetchWorker(request)
+    worker.start()
+    started.wait(5)
+
+    retire_worker(worker)
+    assert not sip.isdeleted(worker)
+    worker.wait(5000)
+    process_deferred_deletes()
+
+    assert sip.isdeleted(worker)
+
+
+class RecordingCache(LibraryDetailCache):
+    """记录 get() 在哪些线程中被调用"""
+
+    def __init__(self, cache_dir):
+        super().__init__(cache_dir)
+        self.get_threads = []
+
+    def get(self, list_name):
+        self.get_threads.append(threading.current_thread())
+        return super().get(list_name)
+
+
+@pytest.fixture
+def detail_cache(tmp_path, monkeypatch):
+    # 磁盘上已有刚获取过的详情，内存中没有
+    LibraryDetailCache(str(tmp_path)).put(LIBRARY, "main", "<des>缓存</des>")
+    LibraryDetailCache(str(tmp_path)).put(LIBRARY, "list", "git status --- 查看状态")
+    cache = RecordingCache(str(tmp_path))
+    monkeypatch.setattr(prefetcher_module, "get_detail_cache", lambda: cache)
+    monkeypatch.setattr(prefetcher_module, "get_mirror", lambda: None)
+    return cache
+
+
+def run_prefetch(prefetcher, list_name):
+    prefetcher.request(list_name)
+    worker = prefetcher._worker
+    if worker is not None:
+        worker.wait(5000)
+    QCoreApplication.processEvents()
+    return worker
+
+
+def test_disk_cache_is_checked_on_the_worker_thread(qapp, standin, detail_cache):
+    prefetcher = DetailPrefetcher()
+
+    worker = run_prefetch(prefetcher, LIBRARY)
+
+    assert worker is not None and not worker.fetched
+    assert detail_cache.get_threads
+    assert threading.main_thread() not in detail_cache.get_threads
+    assert standin.library_requests() == 0
+    assert prefetcher._fetched == 0
+
+    # 预取线程读过磁盘后内容在内存中，界面线程直接判断为较新，不再启动线程
+    assert run_prefetch(prefetcher, LIBRARY) is None
+
+
+def test_missing_library_is_fetched(qapp, standin, detail_cache):
+    name = "Docker 容器≈作者乙@2"
+    standin.libraries[name] = make_library("Docker 容器", [("docker ps", "列出容器")])
+    prefetcher = DetailPrefetcher()
+
+    worker = run_prefetch(prefetcher, name)
+
+    assert worker.fetched
+    assert prefetcher._fetched == 1
+    assert standin.library_requests() == 2
+    assert detail_cache.peek(name)["list"] == "docker ps --- 列出容器"
@@ -0,0 +1,103 @@
+import random
+import time
+
+import pytest
+
+from utils.search_index import CatalogSearchIndex
+
+WORDS = ["docker", "git", "npm", "pip", "kubectl", "ssh", "curl", "ffmpeg", "nginx", "redis", "mysql",
+         "python", "node", "java", "go", "rust", "linux", "windows", "adb", "vim", "tmux", "systemd", "cron",
+         "aws", "helm", "terraform", "ansible", "conda", "yarn", "maven", "gradle", "cargo", "make", "cmake",
+         "gcc", "openssl", "rsync", "tar", "zip", "grep", "sed", "awk", "jq", "powershell", "wsl", "brew"]
+HAN = "网络命令工具系统管理文件脚本数据库容器服务配置安装备份监控日志编译测试开发运维安全加密压缩下载上传同步"
+
+
+def make_catalog(count, seed=7):
+    """接近真实目录的数据：名称由常用词组合而成，描述为 作者@编号，作者有几千个"""
+    rng = random.Random(seed)
+    han_words = [rng.choice(HAN) + rng.choice(HAN) for _ in range(2000)]
+    authors = []
+    for k in range(3000):
+        if rng.random() < 0.5:
+            author = "".join(rng.choice(HAN) for _ in range(rng.randint(2, 3)))
+        else:
+            author = rng.choice(["dev", "ops", "cmd", "tool", "admin"]) + str(rng.randint(1, 9999))
+        authors.append(f"{author}@{10000 + k}")
+    rows = []
+    for i in range(count):
+        name = "".join(rng.choice(WORDS) if rng.random() < 0.3 else rng.choice(han_words)
+                       for _ in range(rng.randint(1, 3)))
+        name += rng.choice(["", "", "工具", "命令", "大全", str(rng.randint(1, 99))])
+        rows.append((f"{name}{i}" if rng.random() < 0.2 else name, rng.choice(authors)))
+    return rows
+
+
+def brute_force(rows, query):
+    query = query.lower()
+    return [row for row, (name, desc) in enumerate(rows)
+            if query in name.lower() or query in desc.lower()]
+
+
+def build_index(rows, batch=2000):
+    index = CatalogSearchIndex()
+    for start in range(0, len(rows), batch):
+        index.add_rows(rows[start:start + batch])
+    return index
+
+
+def test_search_matches_substring_scan():
+    rows = make_catalog(3000) + [("Docker Compose", "Dev1@10000"), ("网络命令", "")]
+    index = build_index(rows, batch=700)
+    assert len(index) == len(rows)
+
+    queries = ["d", "Do", "docker", "dockerc", "网", "网络", "网络命令", "@10", "@10001", "dev1@",
+               "命令", "工具1", "k", "zz", "数据库", "mpose", "r c"]
+    rng = random.Random(1)
+    for name, desc in rng.sample(rows, 30):
+        text = name + desc
+        start = rng.randrange(len(text))
+        queries.append(text[start:start + rng.randint(1, 6)])
+    for query in queries:
+        assert index.search(query) == brute_force(rows, query), query
+    assert index.search("") is None
+
+
+def test_typing_narrows_and_backspace_hits_cache():
+    rows = make_catalog(3000)
+    index = build_index(rows)
+    for query in ["m", "my", "mys", "mysq", "mysql", "mysq", "mys", "dock", "mysql"]:
+        assert index.search(query) == brute_force(rows, query), query
+
+
+def test_added_rows_are_searchable():
+    rows = make_catalog(500)
+    index = build_index(rows)
+    assert index.search("新增的库") == []
+    index.add_rows([("新增的库", rows[0][1])])
+    assert index.search("新增的库") == [500]
+    assert index.search(rows[0][1]) == brute_force(rows + [("新增的库", rows[0][1])], rows[0][1])
+
+
+def best_time(index, query, runs=7):
+    best = None
+    for _ in range(runs):
+        index._reset_query_cache()
+        start = time.perf_counter()
+        index.search(query)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@pytest.fixture(scope="module")
+def large_index():
+    rows = make_catalog(100000)
+    return rows, build_index(rows)
+
+
+@pytest.mark.parametrize("query", ["docker", "git", "mysql", "网络", "命令大全", "dev1", "@1234", "tool9", "数据库"])
+def test_common_queries_take_under_a_millisecond(large_index, query):
+    rows, index = large_index
+    assert index.search(query) == brute_force(rows, query)
+    elapsed = best_time(index, query)
+    assert elapsed < 0.001, f"{query!r} 用时 {elapsed * 1000:.2f}ms"
@@ -0,0 +1,327 @@
+from bisect import bisect_left, bisect_right
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QPersistentModelIndex
+
+from utils.catalog import CatalogStore, CatalogRowList
+
+
+class CatalogTableModel(QAbstractTableModel):
+    """命令库目录模型，数据按需通过data()读取，不为每行创建控件"""
+
+    HEADERS = ["名称", "描述"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._store = CatalogStore()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._store)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole or role == Qt.ToolTipRole:
+            if index.column() == 0:
+                return self._store.name(index.row())
+            return self._store.desc(index.row())
+        if role == Qt.UserRole:
+            return self.full_name(index.row())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def full_name(self, row):
+        """返回指定行的完整名称(名称≈描述)"""
+        return self._store.full_name(row)
+
+    def store(self):
+        return self._store
+
+    def append_rows(self, rows):
+        """追加一批行"""
+        if not rows:
+            return
+        first = len(self._store)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._store.extend(rows)
+        self.endInsertRows()
+
+    def apply_delta(self, delta):
+        """按差异增量更新：只删除、移动和插入变化的行，描述改变的行就地更新，
+        视图的选中项和滚动位置得以保留"""
+        if delta.is_empty():
+            return
+        # 更新期间改用普通列表，每一段变化只是列表操作；完成后再转回紧凑存储
+        rows = CatalogRowList(self._store)
+        self._store = rows
+
+        for start, count in delta.removed_ranges():
+            self.beginRemoveRows(QModelIndex(), start, start + count - 1)
+            del rows[start:start + count]
+            self.endRemoveRows()
+
+        if delta.moves is not None:
+            for first, count, dest in delta.moves:
+                self.beginMoveRows(QModelIndex(), first, first + count - 1, QModelIndex(), dest)
+                rows.move_rows(first, count, dest)
+                self.endMoveRows()
+        else:
+            self._reorder_rows(rows, delta.order)
+
+        for start, inserted in delta.inserted_ranges():
+            self.beginInsertRows(QModelIndex(), start, start + len(inserted) - 1)
+            rows[start:start] = inserted
+            self.endInsertRows()
+
+        last_column = self.columnCount() - 1
+        for start, changed in delta.changed_ranges():
+            rows[start:start + len(changed)] = changed
+            self.dataChanged.emit(self.index(start, 0), self.index(start + len(changed) - 1, last_column))
+
+        self._store = CatalogStore(rows)
+
+    def _reorder_rows(self, rows, order):
+        """需要移动的行太多时，按新顺序一次调整布局，并更新持久索引"""
+        self.layoutAboutToBeChanged.emit()
+        rows[:] = [rows[i] for i in order]
+        positions = [0] * len(order)
+        for new_row, old_row in enumerate(order):
+            positions[old_row] = new_row
+        old_indexes = self.persistentIndexList()
+        new_indexes = [self.index(positions[index.row()], index.column()) for index in old_indexes]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def clear(self):
+        """清空所有行"""
+        self.beginResetModel()
+        self._store = CatalogStore()
+        self.endResetModel()
+
+
+class CatalogFilterProxy(QAbstractTableModel):
+    """按源模型行号列表过滤的视图模型
+
+    可见行保存为递增的源模型行号列表，第 i 行直接对应源模型的第 rows[i] 行。
+    过滤时只替换这个列表并发出一次布局变化，不会为源模型的每一行调用Python代码；
+    index() 使用 QAbstractTableModel 的C++实现，视图重新布局时也不进入Python。
+    布局变化时更新持久索引，选中项在新的过滤结果中仍然可见时得以保留。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._source = None
+        self._columns = 0
+        self._rows = None      # 可见的源模型行号(递增)，None 表示显示全部
+        self._removing = None  # 源模型删除行期间受影响的可见行区间
+        self._saved = None     # 布局变化期间保存的 (持久索引, 源模型行号)
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        self._source = model
+        self._columns = model.columnCount()
+        self._rows = None
+        model.dataChanged.connect(self._on_source_data_changed)
+        model.rowsAboutToBeInserted.connect(self._on_source_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self._on_source_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self._on_source_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self._on_source_rows_removed)
+        model.rowsAboutToBeMoved.connect(self._on_source_rows_about_to_be_moved)
+        model.rowsMoved.connect(self._on_source_rows_moved)
+        model.modelAboutToBeReset.connect(self._on_source_reset_started)
+        model.modelReset.connect(self._on_source_reset)
+        model.layoutAboutToBeChanged.connect(self._on_source_layout_about_to_be_changed)
+        model.layoutChanged.connect(self._on_source_layout_changed)
+        self.endResetModel()
+
+    def sourceModel(self):
+        return self._source
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._source is None:
+            return 0
+        if self._rows is None:
+            return self._source.rowCount()
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._columns
+
+    def index(self, row, column, parent=QModelIndex()):
+        # 树视图布局时为每个可见行调用一次，直接检查范围，不再经由 rowCount()/columnCount()
+        rows = self._rows
+        count = len(rows) if rows is not None else self._source.rowCount()
+        if 0 <= row < count and 0 <= column < self._columns and not parent.isValid():
+            return self.createIndex(row, column)
+        return QModelIndex()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        return self._source.data(self.mapToSource(index), role)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        return self._source.headerData(section, orientation, role)
+
+    def source_row(self, row):
+        """可见的第 row 行对应的源模型行号"""
+        return row if self._rows is None else self._rows[row]
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self._source.index(self.source_row(index.row()), index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        return self._index_for_source_row(source_index.row(), source_index.column())
+
+    def _index_for_source_row(self, source_row, column):
+        """源模型第 source_row 行在视图中的索引，被过滤掉时返回无效索引"""
+        rows = self._rows
+        if rows is None:
+            return self.index(source_row, column)
+        pos = bisect_left(rows, source_row)
+        if pos < len(rows) and rows[pos] == source_row:
+            return self.index(pos, column)
+        return QModelIndex()
+
+    def set_visible_rows(self, rows):
+        """设置可见的源模型行号(递增)，传入None显示全部"""
+        if rows is self._rows:
+            return  # 搜索结果来自缓存且与当前显示的相同，或一直显示全部
+        self._begin_layout_change()
+        self._rows = rows
+        self._end_layout_change(lambda source_row: source_row)
+
+    def is_filtered(self):
+        return self._rows is not None
+
+    # ---- 布局变化 ----
+
+    def _begin_layout_change(self):
+        """发出布局即将变化的信号并记住每个持久索引对应的源模型行"""
+        self.layoutAboutToBeChanged.emit()
+        self._saved = [(index, self.source_row(index.row())) for index in self.persistentIndexList()]
+
+    def _end_layout_change(self, remap):
+        """按 remap(旧源模型行号) -> 新源模型行号 更新持久索引，然后发出布局变化信号"""
+        saved, self._saved = self._saved, None
+        for index, source_row in saved:
+            self.changePersistentIndex(index, self._index_for_source_row(remap(source_row), index.column()))
+        self.layoutChanged.emit()
+
+    # ---- 转发源模型的变化 ----
+    # 显示全部时行号一一对应，直接转发；过滤时只换算受影响的可见行
+
+    def _visible_range(self, first, last):
+        """源模型第 first 到 last 行中可见的部分，返回可见行区间 [lo, hi)"""
+        rows = self._rows
+        return bisect_left(rows, first), bisect_right(rows, last)
+
+    def _shift_rows(self, lo, hi, first, shift):
+        """丢弃可见行 [lo, hi)，并把之后源模型行号不小于 first 的行平移 shift"""
+        rows = list(self._rows[:lo])
+        rows.extend(row + shift if row >= first else row for row in self._rows[hi:])
+        self._rows = rows
+
+    def _on_source_data_changed(self, top_left, bottom_right, roles=()):
+        if self._rows is None:
+            lo, hi = top_left.row(), bottom_right.row() + 1
+        else:
+            lo, hi = self._visible_range(top_left.row(), bottom_right.row())
+        if hi > lo:
+            self.dataChanged.emit(self.index(lo, top_left.column()),
+                                  self.index(hi - 1, bottom_right.column()), roles)
+
+    def _on_source_rows_about_to_be_inserted(self, parent, first, last):
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def _on_source_rows_inserted(self, parent, first, last):
+        if self._rows is None:
+            self.endInsertRows()
+        else:
+            # 新行不在当前的过滤结果中，之后的行号整体后移
+            pos = bisect_left(self._rows, first)
+            self._shift_rows(pos, pos, first, last - first + 1)
+
+    def _on_source_rows_about_to_be_removed(self, parent, first, last):
+        if self._rows is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            return
+        lo, hi = self._removing = self._visible_range(first, last)
+        if hi > lo:
+            self.beginRemoveRows(QModelIndex(), lo, hi - 1)
+
+    def _on_source_rows_removed(self, parent, first, last):
+        if self._rows is None:
+            self.endRemoveRows()
+            return
+        (lo, hi), self._removing = self._removing, None
+        self._shift_rows(lo, hi, last + 1, first - last - 1)
+        if hi > lo:
+            self.endRemoveRows()
+
+    def _on_source_rows_about_to_be_moved(self, parent, start, end, dest_parent, dest):
+        if self._rows is None:
+            self.beginMoveRows(QModelIndex(), start, end, QModelIndex(), dest)
+        else:
+            self._begin_layout_change()
+
+    def _on_source_rows_moved(self, parent, start, end, dest_parent, dest):
+        if self._rows is None:
+            self.endMoveRows()
+            return
+        remap = _move_remap(start, end, dest)
+        self._rows = sorted(remap(row) for row in self._rows)
+        self._end_layout_change(remap)
+
+    def _on_source_layout_about_to_be_changed(self, *args):
+        self.layoutAboutToBeChanged.emit()
+        self._saved = [(index, QPersistentModelIndex(self.mapToSource(index)))
+                       for index in self.persistentIndexList()]
+
+    def _on_source_layout_changed(self, *args):
+        # 源模型重新排列后原来的行号没有意义，恢复显示全部；持久索引跟随源模型的行
+        saved, self._saved = self._saved, None
+        self._rows = None
+        for index, source_index in saved:
+            self.changePersistentIndex(index, self.index(source_index.row(), index.column()))
+        self.layoutChanged.emit()
+
+    def _on_source_reset_started(self, *args):
+        self.beginResetModel()
+
+    def _on_source_reset(self, *args):
+        # 源模型整体变化后原来的行号没有意义，恢复显示全部
+        self._rows = None
+        self.endResetModel()
+
+
+def _move_remap(start, end, dest):
+    """返回把第 start 到 end 行移动到 dest 之前后，旧行号到新行号的换算函数"""
+    count = end - start + 1
+
+    def remap(row):
+        if start <= row <= end:
+            return row - start + (dest - count if dest > end else dest)
+        if dest > end and end < row < dest:
+            return row - count
+        if dest < start and dest <= row < start:
+            return row + count
+        return row
+    return remap
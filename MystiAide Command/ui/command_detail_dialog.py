@@ -1,18 +1,41 @@
-import re
-import urllib.parse
-import requests
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-                            QPushButton, QTextBrowser, QFrame, QScrollArea, 
-                            QProgressBar, QMessageBox, QApplication, QWidget, QGraphicsDropShadowEffect)
-from PyQt5.QtCore import Qt, QPropertyAnimation, QEasingCurve
-from PyQt5.QtGui import QCursor, QFont, QColor
+                            QPushButton, QTextBrowser, QFrame,
+                            QProgressBar, QApplication, QWidget, QGraphicsDropShadowEffect)
+from PyQt5.QtCore import Qt, QPropertyAnimation, QEasingCurve, QTimer
+from PyQt5.QtGui import QFont, QColor
+from functools import partial
 from utils.styles import GLOBAL_STYLE
+from utils.api_client import get_api_client
+from utils.command_library import parse_main_xml, parse_command_list
+from utils.detail_cache import get_detail_cache
+from utils.mirror import get_mirror
+from utils.request_scheduler import CancelToken, INTERACTIVE, PREFETCH
+from utils.circuit_breaker import TimeBudget
+from ui.workers import FetchWorker, retire_worker
+from ui.prefetcher import DetailPrefetcher, is_fresh_entry
+from ui.command_list_view import CommandListView
+
+
+def fetch_and_cache(request, list_name, part, cancel_token):
+    """在后台线程获取详情的一部分，成功时同时写入详情缓存，写磁盘不占用界面线程"""
+    response = request(cancel_token=cancel_token)
+    if response.status_code == 200 and not cancel_token.is_cancelled():
+        get_detail_cache().put(list_name, part, response.text)
+    return response
+
 
 class CommandDetailDialog(QDialog):
+    FETCH_BUDGET = 10  # 秒，main.xml 和 list.xml 包括重试在内的最长等待时间，超时后只显示缓存
+
     def __init__(self, list_name, parent=None):
         super().__init__(parent)
         self.list_name = list_name
         self.parent = parent
+        # 对话框内的所有请求共用一个取消标记，关闭对话框时一起取消
+        self.cancel_token = CancelToken()
+        self.fetch_workers = []
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.finished.connect(self.cancel_fetches)
         self.setWindowTitle(f"{list_name.split('≈')[0]} - 详情")
         self.setGeometry(200, 200, 850, 650)
         
@@ -144,13 +167,14 @@ class CommandDetailDialog(QDialog):
         
         self.cmd_layout.addWidget(cmd_header)
         
-        # 创建可滚动的命令列表区域
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setStyleSheet("""
-            QScrollArea {
+        # 命令列表(虚拟化视图，只绘制可见的命令)
+        self.command_view = CommandListView()
+        self.command_view.setStyleSheet("""
+            QListView {
                 border: none;
-                background-color: transparent;
+                border-radius: 4px;
+                background-color: #f8f9fa;
+                padding: 10px;
             }
             QScrollBar:vertical {
                 border: none;
@@ -170,16 +194,8 @@ class CommandDetailDialog(QDialog):
                 height: 0px;
             }
         """)
-        
-        self.cmd_content = QWidget()
-        self.cmd_content.setStyleSheet("background-color: #f8f9fa; border-radius: 4px;")
-        self.cmd_content_layout = QVBoxLayout(self.cmd_content)
-        self.cmd_content_layout.setAlignment(Qt.AlignTop)
-        self.cmd_content_layout.setContentsMargins(10, 10, 10, 10)
-        self.cmd_content_layout.setSpacing(8)
-        
-        self.scroll_area.setWidget(self.cmd_content)
-        self.cmd_layout.addWidget(self.scroll_area)
+        self.command_view.command_clicked.connect(self.copy_command)
+        self.cmd_layout.addWidget(self.command_view)
         
         self.layout.addWidget(self.cmd_frame)
         
@@ -191,6 +207,7 @@ class CommandDetailDialog(QDialog):
         
         # 存储命令列表
         self.command_list = []
+        self.target_command = None  # 等待定位的 (命令, 行号)
     
     def add_shadow_effect(self, widget):
         """为控件添加阴影效果"""
@@ -213,110 +230,138 @@ class CommandDetailDialog(QDialog):
             self.parent.floating_window.activateWindow()
     
     def load_details(self):
-        """加载命令库详情"""
-        try:
-            self.progress_bar.setValue(10)
-            QApplication.processEvents()
-            
-            encoded_list_name = urllib.parse.quote(self.list_name)
-            main_xml_url = f"https://www.viqu.com/MystiAide/cls/{encoded_list_name}/main.xml"
-            
-            self.progress_bar.setValue(30)
-            QApplication.processEvents()
-            
-            response = requests.get(main_xml_url)
-            
-            if response.status_code == 200:
-                response.encoding = 'utf-8'
-                content = response.text
-                
-                # 解析XML
-                des_match = re.search(r'<des>(.*?)</des>', content)
-                r_match = re.search(r'<r>(.*?)</r>', content)
-                
-                # 设置描述和作者
-                if des_match:
-                    desc_text = des_match.group(1)
-                    self.desc_browser.setPlainText(desc_text)
-                
-                if r_match:
-                    author_text = r_match.group(1)
-                    self.author_display.setText(author_text)
-                
-                self.progress_bar.setValue(50)
-                QApplication.processEvents()
-                
-                # 获取list.xml内容
-                list_xml_url = f"https://www.viqu.com/MystiAide/cls/{encoded_list_name}/list.xml"
-                response = requests.get(list_xml_url)
-                
-                self.progress_bar.setValue(70)
-                QApplication.processEvents()
-                
-                if response.status_code == 200:
-                    response.encoding = 'utf-8'
-                    list_items = [item.strip() for item in response.text.split('∅') if item.strip()]
-                    
-                    # 清空命令列表
-                    self.command_list = []
-                    
-                    # 添加命令列表
-                    for item in list_items:
-                        parts = item.split('---')
-                        command = parts[0].strip()
-                        description = parts[1].strip() if len(parts) > 1 else ""
-                        
-                        # 添加到命令列表
-                        self.command_list.append({
-                            'command': command,
-                            'description': description
-                        })
-                        
-                        # 创建命令项
-                        cmd_item = QLabel()
-                        cmd_item.setTextFormat(Qt.RichText)
-                        cmd_item.setTextInteractionFlags(Qt.TextBrowserInteraction)
-                        cmd_item.setCursor(QCursor(Qt.PointingHandCursor))
-                        cmd_item.setStyleSheet("QLabel { margin-bottom: 10px; }")
-                        
-                        html = f"""
-                        <div style="margin-bottom: 8px; padding: 8px; border-left: 3px solid #2196F3; background-color: #f8f9fa; box-shadow: 0 1px 2px rgba(0,0,0,0.05);">
-                            <a href='command://{command}' style="color: #2196F3; text-decoration: none; font-weight: bold; font-size: 14px; word-wrap: break-word; word-break: break-all;">{command}</a>
-                        """
-                        if description:
-                            html += f"""
-                            <div style="color: #555; margin-top: 5px; padding-left: 5px; font-size: 13px; word-wrap: break-word; word-break: break-all; border-top: 1px solid #f0f0f0; padding-top: 5px;">
-                                {description}
-                            </div>
-                            """
-                        html += "</div>"
-                        
-                        cmd_item.setText(html)
-                        cmd_item.setWordWrap(True)  # 启用文本自动换行
-                        cmd_item.linkActivated.connect(self.copy_command)
-                        
-                        self.cmd_content_layout.addWidget(cmd_item)
-                    
-                    self.progress_bar.setValue(100)
-                    QApplication.processEvents()
-                else:
-                    error_label = QLabel(f"无法获取命令列表，HTTP状态码: {response.status_code}")
-                    self.cmd_content_layout.addWidget(error_label)
-            else:
-                error_label = QLabel(f"无法获取详情，HTTP状态码: {response.status_code}")
-                self.layout.addWidget(error_label)
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"发生错误: {str(e)}")
-        finally:
-            # 隐藏进度条
+        """加载命令库详情，main.xml 和 list.xml 同时在后台获取，各自到达后立即显示
+
+        有缓存时先直接显示缓存内容：缓存在 DetailPrefetcher.FRESH_SECONDS 内获取过的
+        不再请求；较旧的以预取优先级在后台重新获取，不占用交互请求的并发名额，
+        内容有变化才重新显示。缓存中没有的部分仍以交互优先级获取。
+        离线镜像中已有的命令库直接从本地读取，不访问网络。
+        """
+        self.detail_cache = get_detail_cache()
+        self.shown_content = {"main": None, "list": None}
+        
+        mirror = get_mirror()
+        mirrored = mirror.get_library(self.list_name) if mirror else None
+        if mirrored:
+            self.show_main(mirrored["main"])
+            self.show_list(mirrored["list"])
+            return
+        
+        cached = self.detail_cache.get(self.list_name) or {}
+        if cached.get("main") is not None:
+            self.show_main(cached["main"])
+        if cached.get("list") is not None:
+            self.show_list(cached["list"])
+        if is_fresh_entry(cached, DetailPrefetcher.FRESH_SECONDS):
+            return
+        if not cached:
+            self.progress_bar.setRange(0, 0)  # 忙碌状态
+            self.progress_bar.setVisible(True)
+        self.pending_fetches = 2
+        
+        api = get_api_client()
+        budget = TimeBudget(self.FETCH_BUDGET)
+        # 已显示缓存的部分只是重新验证，用户不必等待
+        main_priority = PREFETCH if cached.get("main") is not None else INTERACTIVE
+        main_request = partial(api.library_main, self.list_name, main_priority, budget=budget)
+        self.main_worker = FetchWorker(partial(fetch_and_cache, main_request, self.list_name, "main"),
+                                       self, self.cancel_token)
+        self.main_worker.fetched.connect(self.on_main_loaded)
+        self.main_worker.fetch_failed.connect(self.on_main_failed)
+        
+        list_priority = PREFETCH if cached.get("list") is not None else INTERACTIVE
+        list_request = partial(api.library_list, self.list_name, list_priority, budget=budget)
+        self.list_worker = FetchWorker(partial(fetch_and_cache, list_request, self.list_name, "list"),
+                                       self, self.cancel_token)
+        self.list_worker.fetched.connect(self.on_list_loaded)
+        self.list_worker.fetch_failed.connect(self.on_list_failed)
+        
+        self.fetch_workers = [self.main_worker, self.list_worker]
+        for worker in self.fetch_workers:
+            worker.finished.connect(self.on_fetch_finished)
+            worker.start()
+    
+    def cancel_fetches(self):
+        """对话框关闭时取消还在进行的请求，已到达的结果也不再处理"""
+        self.cancel_token.cancel()
+        for worker in self.fetch_workers:
+            retire_worker(worker)
+        self.fetch_workers = []
+    
+    def on_fetch_finished(self):
+        """两个请求都结束后隐藏进度条"""
+        self.pending_fetches -= 1
+        if self.pending_fetches <= 0:
             self.progress_bar.setVisible(False)
     
-    def copy_command(self, link):
+    def on_main_loaded(self, content):
+        """main.xml 获取成功"""
+        if self.cancel_token.is_cancelled():
+            return  # 对话框已关闭
+        if content != self.shown_content["main"]:
+            self.show_main(content)
+    
+    def show_main(self, content):
+        """显示描述和作者"""
+        self.shown_content["main"] = content
+        desc_text, author_text = parse_main_xml(content)
+        if desc_text is not None:
+            self.desc_browser.setPlainText(desc_text)
+        if author_text is not None:
+            self.author_display.setText(author_text)
+    
+    def on_main_failed(self, message):
+        """描述加载失败，不影响命令列表"""
+        if self.cancel_token.is_cancelled():
+            return  # 对话框已关闭
+        if self.shown_content["main"] is not None:
+            return  # 已显示缓存内容
+        error_label = QLabel(f"无法获取详情，{message}")
+        error_label.setStyleSheet("color: #d93025;")
+        self.detail_layout.addWidget(error_label)
+    
+    def on_list_loaded(self, content):
+        """list.xml 获取成功"""
+        if self.cancel_token.is_cancelled():
+            return  # 对话框已关闭
+        if content != self.shown_content["list"]:
+            self.show_list(content)
+    
+    def show_list(self, content):
+        """显示命令列表"""
+        self.shown_content["list"] = content
+        self.command_list = parse_command_list(content)
+        self.command_view.set_commands(self.command_list)
+        if self.target_command is not None:
+            QTimer.singleShot(0, self.apply_target_command)
+    
+    def on_list_failed(self, message):
+        """命令列表加载失败，不影响描述"""
+        if self.cancel_token.is_cancelled():
+            return  # 对话框已关闭
+        if self.shown_content["list"] is not None:
+            return  # 已显示缓存内容
+        error_label = QLabel(f"无法获取命令列表，{message}")
+        error_label.setStyleSheet("color: #d93025;")
+        self.cmd_layout.addWidget(error_label)
+    
+    def scroll_to_command(self, command, row_hint=None):
+        """滚动命令列表到指定命令并高亮；命令列表还没有显示时，显示后再定位"""
+        self.target_command = (command, row_hint)
+        # 等对话框显示、列表完成布局后再滚动
+        QTimer.singleShot(0, self.apply_target_command)
+    
+    def apply_target_command(self):
+        target = self.target_command
+        if target is None or not self.command_list:
+            return
+        if self.command_view.scroll_to_command(*target):
+            self.target_command = None
+    
+    def copy_command(self, command):
         """复制命令到剪贴板"""
-        if link.startswith("command://"):
-            command = link[9:]  # 去掉 command:// 前缀
-            clipboard = QApplication.clipboard()
-            clipboard.setText(command)
-            
-            if self.parent:
-                self.parent.status_bar.showMessage(f"已复制命令: {command}")
\ No newline at end of file
+        clipboard = QApplication.clipboard()
+        clipboard.setText(command)
+        
+        if self.parent:
+            self.parent.status_bar.showMessage(f"已复制命令: {command}")
\ No newline at end of file
@@ -0,0 +1,238 @@
+from difflib import SequenceMatcher
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QCursor
+
+COMMAND_ROLE = Qt.UserRole + 1
+DESCRIPTION_ROLE = Qt.UserRole + 2
+
+
+class CommandListModel(QAbstractListModel):
+    """命令列表模型，每行是 {'command': ..., 'description': ...}"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._commands = []
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._commands)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        command_data = self._commands[index.row()]
+        if role == Qt.DisplayRole or role == COMMAND_ROLE:
+            return command_data.get('command', '')
+        if role == DESCRIPTION_ROLE:
+            return command_data.get('description', '')
+        if role == Qt.ToolTipRole:
+            return "点击复制命令"
+        return None
+
+    def commands(self):
+        return self._commands
+
+    def set_commands(self, commands):
+        """替换全部命令"""
+        self.beginResetModel()
+        self._commands = list(commands)
+        self.endResetModel()
+
+    def update_commands(self, commands):
+        """与当前命令比较后只插入、删除变化的行，相同的行保持不动
+
+        新旧列表重合较少时直接整体替换，避免在差异很大的长列表上做比较。
+        """
+        commands = list(commands)
+        old_keys = [_command_key(c) for c in self._commands]
+        new_keys = [_command_key(c) for c in commands]
+        if old_keys == new_keys:
+            self._commands = commands
+            return
+
+        common = len(set(old_keys) & set(new_keys))
+        if common * 2 < min(len(old_keys), len(new_keys)) or not common:
+            self.set_commands(commands)
+            return
+
+        matcher = SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+        # 从后往前应用，前面的行号不受影响
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == 'equal':
+                continue
+            if i2 > i1:
+                self.beginRemoveRows(QModelIndex(), i1, i2 - 1)
+                del self._commands[i1:i2]
+                self.endRemoveRows()
+            if j2 > j1:
+                self.beginInsertRows(QModelIndex(), i1, i1 + (j2 - j1) - 1)
+                self._commands[i1:i1] = commands[j1:j2]
+                self.endInsertRows()
+        self._commands = commands
+
+
+def _command_key(command_data):
+    return command_data.get('command', ''), command_data.get('description', '')
+
+
+class CommandItemDelegate(QStyledItemDelegate):
+    """只绘制可见行的命令项：左侧色条、加粗的命令和下方的描述，长文本自动换行"""
+
+    DEFAULT_STYLE = {
+        "accent": "#2196F3",          # 左侧色条，为None时不绘制
+        "command_color": "#2196F3",
+        "description_color": "#555555",
+        "background": "#f8f9fa",
+        "hover_background": "#eef3fd",
+        "highlight_background": "#fff4d6",  # 定位到的命令
+        "command_size": 14,           # 像素
+        "description_size": 13,
+        "padding": 8,
+        "spacing": 5,                 # 命令与描述之间的间距
+        "margin": 8,                  # 命令项之间的间距
+        "indent": 5,                  # 描述的缩进
+    }
+
+    TEXT_FLAGS = Qt.AlignLeft | Qt.AlignTop | Qt.TextWrapAnywhere
+
+    def __init__(self, view, style=None):
+        super().__init__(view)
+        self.view = view
+        self.item_style = dict(self.DEFAULT_STYLE, **(style or {}))
+        self.command_font = QFont(view.font())
+        self.command_font.setPixelSize(self.item_style["command_size"])
+        self.command_font.setBold(True)
+        self.description_font = QFont(view.font())
+        self.description_font.setPixelSize(self.item_style["description_size"])
+        self._size_cache = {}
+
+    def _text_heights(self, width, command, description):
+        """计算命令和描述在给定宽度下换行后的高度，结果按内容和宽度缓存"""
+        key = (width, command, description)
+        heights = self._size_cache.get(key)
+        if heights is None:
+            style = self.item_style
+            text_width = max(1, width - 2 * style["padding"] - (3 if style["accent"] else 0))
+            command_height = QFontMetrics(self.command_font).boundingRect(
+                QRect(0, 0, text_width, 100000), self.TEXT_FLAGS, command).height()
+            description_height = 0
+            if description:
+                description_height = QFontMetrics(self.description_font).boundingRect(
+                    QRect(0, 0, text_width - style["indent"], 100000), self.TEXT_FLAGS, description).height()
+            heights = (command_height, description_height)
+            if len(self._size_cache) > 20000:
+                self._size_cache.clear()
+            self._size_cache[key] = heights
+        return heights
+
+    def _item_width(self):
+        return self.view.viewport().width()
+
+    def sizeHint(self, option, index):
+        style = self.item_style
+        width = self._item_width()
+        description = index.data(DESCRIPTION_ROLE)
+        command_height, description_height = self._text_heights(width, index.data(COMMAND_ROLE), description)
+        height = 2 * style["padding"] + command_height + style["margin"]
+        if description:
+            height += style["spacing"] + description_height
+        return QSize(width, height)
+
+    def paint(self, painter, option, index):
+        style = self.item_style
+        command = index.data(COMMAND_ROLE)
+        description = index.data(DESCRIPTION_ROLE)
+        rect = option.rect.adjusted(0, 0, 0, -style["margin"])
+        command_height, description_height = self._text_heights(option.rect.width(), command, description)
+
+        painter.save()
+        hovered = option.state & (QStyle.State_MouseOver | QStyle.State_Selected)
+        if index.row() == self.view.highlighted_row:
+            background = style["highlight_background"]
+        else:
+            background = style["hover_background"] if hovered else style["background"]
+        painter.fillRect(rect, QColor(background))
+
+        left = rect.left() + style["padding"]
+        if style["accent"]:
+            painter.fillRect(QRect(rect.left(), rect.top(), 3, rect.height()), QColor(style["accent"]))
+            left += 3
+        text_width = rect.right() - style["padding"] - left + 1
+        top = rect.top() + style["padding"]
+
+        painter.setFont(self.command_font)
+        painter.setPen(QColor(style["command_color"]))
+        painter.drawText(QRect(left, top, text_width, command_height), self.TEXT_FLAGS, command)
+
+        if description:
+            top += command_height + style["spacing"]
+            painter.setFont(self.description_font)
+            painter.setPen(QColor(style["description_color"]))
+            painter.drawText(QRect(left + style["indent"], top, text_width - style["indent"], description_height),
+                             self.TEXT_FLAGS, description)
+        painter.restore()
+
+
+class CommandListView(QListView):
+    """虚拟化的命令列表：只为可见行调用绘制，点击命令项发出 command_clicked
+
+    scroll_to_command() 可以滚动到指定命令并高亮显示。
+    """
+
+    command_clicked = pyqtSignal(str)
+
+    def __init__(self, parent=None, item_style=None):
+        super().__init__(parent)
+        self.command_model = CommandListModel(self)
+        self.setModel(self.command_model)
+        self.highlighted_row = -1
+        self.item_delegate = CommandItemDelegate(self, item_style)
+        self.setItemDelegate(self.item_delegate)
+
+        # 分批布局，上万条命令时也能先显示第一屏
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(200)
+        self.setResizeMode(QListView.Adjust)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setMouseTracking(True)
+        self.viewport().setCursor(QCursor(Qt.PointingHandCursor))
+
+        self.clicked.connect(self._on_clicked)
+
+    def set_commands(self, commands):
+        self.highlighted_row = -1
+        self.command_model.set_commands(commands)
+
+    def find_command(self, command, row_hint=None):
+        """返回命令所在的行号，找不到时返回-1
+
+        row_hint 处正好是该命令时直接使用，否则从头查找第一个相同的命令。
+        """
+        commands = self.command_model.commands()
+        if row_hint is not None and 0 <= row_hint < len(commands) \
+                and commands[row_hint].get('command') == command:
+            return row_hint
+        for row, command_data in enumerate(commands):
+            if command_data.get('command') == command:
+                return row
+        return -1
+
+    def scroll_to_command(self, command, row_hint=None):
+        """滚动到命令所在的行并高亮显示，找不到时返回False"""
+        row = self.find_command(command, row_hint)
+        if row < 0:
+            return False
+        self.highlighted_row = row
+        self.scrollTo(self.command_model.index(row), QAbstractItemView.PositionAtCenter)
+        self.viewport().update()
+        return True
+
+    def _on_clicked(self, index):
+        command = index.data(COMMAND_ROLE)
+        if command:
+            self.command_clicked.emit(command)
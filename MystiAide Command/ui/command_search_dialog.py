@@ -0,0 +1,191 @@
+import time
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QTreeView, QAbstractItemView
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtGui import QFont
+
+from utils.styles import GLOBAL_STYLE
+from utils.mirror import get_mirror
+
+
+class CommandSearchModel(QAbstractTableModel):
+    """命令搜索结果，每行是 (命令库名称, 位置, 命令, 描述)"""
+
+    HEADERS = ["命令", "描述", "命令库"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._results = []
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._results)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        library, _, command, description = self._results[index.row()]
+        if role == Qt.DisplayRole:
+            if index.column() == 0:
+                return command
+            if index.column() == 1:
+                return description
+            return library.split('≈')[0]
+        if role == Qt.ToolTipRole:
+            return library if index.column() == 2 else command
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def result(self, row):
+        return self._results[row]
+
+    def set_results(self, results):
+        self.beginResetModel()
+        self._results = list(results)
+        self.endResetModel()
+
+
+class CommandSearchDialog(QDialog):
+    """在离线镜像的所有命令中搜索，双击结果打开所在的命令库并定位到该命令"""
+
+    LIMIT = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parent = parent
+        self.setWindowTitle("搜索所有命令")
+        self.setGeometry(220, 160, 900, 600)
+        self.setStyleSheet(GLOBAL_STYLE + """
+            QDialog {
+                background-color: #f8f9fa;
+            }
+            QLineEdit {
+                border: 1px solid #dadce0;
+                border-radius: 4px;
+                padding: 8px;
+                background-color: white;
+                font-size: 14px;
+            }
+            QTreeView {
+                border: 1px solid #e0e0e0;
+                border-radius: 6px;
+                background-color: white;
+                alternate-background-color: #f8f9fa;
+                font-size: 13px;
+            }
+            QHeaderView::section {
+                background-color: #4285f4;
+                color: white;
+                padding: 8px;
+                border: none;
+                font-weight: bold;
+            }
+            QTreeView::item {
+                padding: 6px 4px;
+            }
+            QTreeView::item:selected {
+                background-color: #e8f0fe;
+                color: #1a73e8;
+            }
+        """)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(10)
+
+        title = QLabel("搜索所有命令")
+        title.setFont(QFont("Microsoft YaHei UI", 16, QFont.Bold))
+        layout.addWidget(title)
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("输入命令或描述中的关键词，多个词用空格分隔...")
+        self.search_input.returnPressed.connect(self.open_current)
+        layout.addWidget(self.search_input)
+
+        # 边输入边搜索
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+
+        self.result_model = CommandSearchModel(self)
+        self.result_view = QTreeView()
+        self.result_view.setModel(self.result_model)
+        self.result_view.setUniformRowHeights(True)
+        self.result_view.setRootIsDecorated(False)
+        self.result_view.setAlternatingRowColors(True)
+        self.result_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.result_view.setColumnWidth(0, 320)
+        self.result_view.setColumnWidth(1, 320)
+        self.result_view.doubleClicked.connect(self.open_result)
+        layout.addWidget(self.result_view, 1)
+
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #5f6368;")
+        layout.addWidget(self.status_label)
+        self.show_mirror_status()
+
+    def show_mirror_status(self):
+        mirror = get_mirror()
+        if mirror is None:
+            self.status_label.setText("还没有离线镜像，请先点击\"离线镜像\"同步命令库")
+            return
+        total, synced = mirror.stats()
+        self.status_label.setText(f"可在已同步的 {synced}/{total} 个命令库中搜索")
+
+    def run_search(self):
+        """在离线镜像中搜索并显示结果和耗时"""
+        self.search_timer.stop()
+        query = self.search_input.text().strip()
+        mirror = get_mirror()
+        if not query or mirror is None:
+            self.result_model.set_results([])
+            self.show_mirror_status()
+            return
+
+        started = time.perf_counter()
+        try:
+            results = mirror.search_commands(query, self.LIMIT)
+        except Exception as e:
+            print(f"搜索命令时出错: {str(e)}")
+            results = []
+        elapsed = (time.perf_counter() - started) * 1000
+        self.result_model.set_results(results)
+
+        if not results:
+            self.status_label.setText(f"没有找到匹配的命令 ({elapsed:.0f} 毫秒)")
+        elif len(results) >= self.LIMIT:
+            self.status_label.setText(f"显示最相关的 {len(results)} 条结果，请输入更多关键词 ({elapsed:.0f} 毫秒)")
+        else:
+            self.status_label.setText(f"找到 {len(results)} 条命令 ({elapsed:.0f} 毫秒)")
+
+    def open_current(self):
+        """回车：还有等待执行的搜索时立即搜索，否则打开选中(默认第一条)的结果"""
+        if self.search_timer.isActive():
+            self.run_search()
+            return
+        index = self.result_view.currentIndex()
+        if not index.isValid():
+            index = self.result_model.index(0, 0)
+        self.open_result(index)
+
+    def open_result(self, index):
+        """打开结果所在的命令库详情，并滚动到该命令"""
+        if not index.isValid() or self.parent is None:
+            return
+        library, position, command, _ = self.result_model.result(index.row())
+        detail_dialog = self.parent.show_list_details(library)
+        if detail_dialog is not None:
+            detail_dialog.scroll_to_command(command, position)
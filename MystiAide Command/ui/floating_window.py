@@ -1,7 +1,9 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-                            QScrollArea, QFrame, QSlider, QGraphicsOpacityEffect, QApplication)
+                            QFrame, QSlider, QGraphicsOpacityEffect, QApplication)
 from PyQt5.QtCore import Qt, QPoint, QPropertyAnimation, QEasingCurve
-from PyQt5.QtGui import QFont, QCursor, QPainter, QBrush, QColor
+from PyQt5.QtGui import QFont, QPainter, QBrush, QColor
+
+from ui.command_list_view import CommandListView
 
 
 class FloatingCommandWindow(QWidget):
@@ -159,11 +161,21 @@ class FloatingCommandWindow(QWidget):
         separator.setFixedHeight(1)
         content_layout.addWidget(separator)
         
-        # 命令列表区域
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setStyleSheet("""
-            QScrollArea {
+        # 命令列表区域(与详情窗口共用虚拟化视图，只绘制可见的命令)
+        self.command_view = CommandListView(item_style={
+            "accent": None,
+            "command_color": "#3498db",
+            "description_color": "#7f8c8d",
+            "background": "#ffffff",
+            "hover_background": "#f1f3f4",
+            "command_size": 13,
+            "description_size": 12,
+            "padding": 5,
+            "indent": 10,
+            "margin": 10,
+        })
+        self.command_view.setStyleSheet("""
+            QListView {
                 border: none;
                 background-color: transparent;
             }
@@ -185,15 +197,8 @@ class FloatingCommandWindow(QWidget):
                 height: 0px;
             }
         """)
-        
-        self.command_widget = QWidget()
-        self.command_layout = QVBoxLayout(self.command_widget)
-        self.command_layout.setAlignment(Qt.AlignTop)
-        self.command_layout.setContentsMargins(5, 5, 5, 5)
-        self.command_layout.setSpacing(10)
-        
-        scroll_area.setWidget(self.command_widget)
-        content_layout.addWidget(scroll_area)
+        self.command_view.command_clicked.connect(self.copy_command)
+        content_layout.addWidget(self.command_view)
         
         layout.addWidget(self.content_frame)
     
@@ -252,64 +257,17 @@ class FloatingCommandWindow(QWidget):
         self.update_command_display()
     
     def update_command_display(self):
-        """更新命令显示"""
-        # 清除现有内容
-        while self.command_layout.count():
-            item = self.command_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
+        """更新命令显示，与当前显示的命令比较后只更新变化的行"""
+        self.command_view.command_model.update_commands(self.commands)
     
-        # 添加新命令
-        for command_data in self.commands:
-            command = command_data.get('command', 'command')
-            description = command_data.get('description', 'description')
-        
-            cmd_item = QLabel()
-            cmd_item.setTextFormat(Qt.RichText)
-            cmd_item.setTextInteractionFlags(Qt.TextBrowserInteraction)
-            cmd_item.setCursor(QCursor(Qt.PointingHandCursor))
-            cmd_item.setFont(QFont("Microsoft YaHei", 10))  # 使用高质量字体
-            cmd_item.setStyleSheet("""
-            QLabel {
-                margin-bottom: 10px;
-                color: #34495e;
-                font-size: 12px;
-            }
-            QLabel:hover {
-                color: #2c3e50;
-            }
-            """)
-            
-            # 设置宽度以确保自动换行
-            cmd_item.setFixedWidth(300)  # 设置固定宽度
-            cmd_item.setWordWrap(True)   # 启用自动换行
-        
-            html = f"""
-            <div style="margin-bottom: 5px;">
-                <a href='command://{command}' style="color: #3498db; text-decoration: none; font-weight: bold; word-wrap: break-word; word-break: break-all;">{command}</a>
-            </div>
-            """
-            if description:
-                html += f"""
-                <div style="color: #7f8c8d; margin-left: 10px; margin-bottom: 15px; word-wrap: break-word; word-break: break-all;">
-                    {description}
-                </div>
-                """
-            
-            cmd_item.setText(html)
-            cmd_item.linkActivated.connect(self.copy_command)
-            self.command_layout.addWidget(cmd_item)
-    def copy_command(self, link):
+    def copy_command(self, command):
         """复制命令到剪贴板"""
-        if link.startswith("command://"):
-            command = link[9:]
-            clipboard = QApplication.clipboard()
-            clipboard.setText(command)
-            
-            # 使用保存的主应用引用
-            if self.main_app and hasattr(self.main_app, 'status_bar'):
-                self.main_app.status_bar.showMessage(f"已复制命令: {command}")
+        clipboard = QApplication.clipboard()
+        clipboard.setText(command)
+        
+        # 使用保存的主应用引用
+        if self.main_app and hasattr(self.main_app, 'status_bar'):
+            self.main_app.status_bar.showMessage(f"已复制命令: {command}")
 
 
 if __name__ == "__main__":
@@ -1,22 +1,26 @@
-import urllib.parse
-import webbrowser
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                            QLabel, QLineEdit, QPushButton, QTreeWidget, QTreeWidgetItem,
-                            QMessageBox, QProgressBar, QApplication, QFrame, QDialog)
-from PyQt5.QtCore import Qt, QUrl, QPropertyAnimation, QEasingCurve
-from PyQt5.QtGui import QFont, QDesktopServices, QPalette, QColor
-import requests
+                            QLabel, QLineEdit, QPushButton, QTreeView,
+                            QMessageBox, QProgressBar, QFrame, QDialog, QShortcut)
+from PyQt5.QtCore import (Qt, QUrl, QPropertyAnimation, QEasingCurve, QTimer, QPoint,
+                          QModelIndex, QPersistentModelIndex)
+from PyQt5.QtGui import QFont, QDesktopServices, QPalette, QColor, QKeySequence
+from functools import partial
 
 from utils.styles import GLOBAL_STYLE
-from ui.upload_dialog import UploadDialog
-from ui.command_detail_dialog import CommandDetailDialog
+from ui.catalog_model import CatalogTableModel, CatalogFilterProxy
+from utils.usage_stats import LibraryUsageStats
+from utils.login_verification import LoginVerificationCache
+from utils.startup_timeline import get_startup_timeline
+from utils.machine_id import get_machine_info, prefetch_machine_info
 from ui.floating_window import FloatingCommandWindow
-from ui.login_dialog import LoginDialog  # 导入登录对话框
-from ui.register_dialog import RegisterDialog  # 导入注册对话框
-# 在文件顶部添加
-from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
+# 网络请求(requests)、加密(Crypto)、离线镜像和各个对话框在第一次用到时才导入，
+# 主窗口可以更早显示出来
 
 class MystiAideApp(QMainWindow):
+    VERIFY_BUDGET = 10       # 秒，后台验证登录状态的最长时间，超时按离线处理
+    VERIFY_TTL = 12 * 3600   # 秒，验证成功后这段时间内启动不再重新验证
+    FIRST_PAINT_TIMEOUT = 1000  # 毫秒，超过这个时间还没有绘制时不再等待
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("MystiAide 命令库浏览器")
@@ -26,6 +30,8 @@ class MystiAideApp(QMainWindow):
         self.user_name = ""
         self.user_id = ""
         self.is_logged_in = False
+        self.login_verification = LoginVerificationCache(self.VERIFY_TTL)
+        self.verify_worker = None
         
         # 设置应用整体样式
         self.setStyleSheet(GLOBAL_STYLE + """
@@ -70,17 +76,59 @@ class MystiAideApp(QMainWindow):
             }
         """)
         
+        # 恢复登录状态要用到机器信息，在创建界面的同时在后台算好
+        prefetch_machine_info()
+        
         # 悬浮窗
         self.floating_window = FloatingCommandWindow(self)
         
+        # 详情预取和打开记录(预取器在窗口显示后创建)
+        self.usage_stats = LibraryUsageStats()
+        self.prefetcher = None
+        self.frequent_prefetched = False
+        
         self.init_ui()
         
-        # 尝试加载保存的登录状态
-        self.load_login_state()
+        self.list_worker = None
+        self.search_index = None
+        self.last_search_term = ""
+        self.mirror_worker = None
+        self.command_search_dialog = None
+        
+        # 加载列表和恢复登录状态都放到窗口第一次绘制之后
+        self.first_painted = False
+        self.background_started = False
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.background_started:
+            # 窗口一直没有绘制(如最小化启动)时也要开始加载
+            QTimer.singleShot(self.FIRST_PAINT_TIMEOUT, self.start_background_tasks)
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_painted:
+            self.first_painted = True
+            if not self.background_started:
+                get_startup_timeline().mark("首次绘制")
+            # 定时器在这次绘制完成、内容显示到屏幕之后执行
+            QTimer.singleShot(0, self.start_background_tasks)
+    
+    def start_background_tasks(self):
+        """窗口第一次绘制后：开始加载列表，然后恢复登录状态"""
+        from ui.prefetcher import DetailPrefetcher
         
-        # 加载初始列表
-        self.original_items = []
+        if self.background_started:
+            return
+        self.background_started = True
+        timeline = get_startup_timeline()
+        self.prefetcher = DetailPrefetcher(self)
         self.load_main_list()
+        timeline.mark("开始加载列表")
+        
+        # 尝试加载保存的登录状态
+        self.load_login_state()
+        timeline.mark("恢复登录状态")
     
     def init_ui(self):
         """初始化UI组件"""
@@ -194,6 +242,7 @@ class MystiAideApp(QMainWindow):
                 self.logout()
         else:
             # 显示登录对话框
+            from ui.login_dialog import LoginDialog
             dialog = LoginDialog(self)
             self.animate_dialog_open(dialog)
             if dialog.exec_() == QDialog.Accepted:
@@ -208,7 +257,8 @@ class MystiAideApp(QMainWindow):
         if self.is_logged_in:
             QMessageBox.information(self, "已登录", "您已经登录，无需注册")
             return
-            
+        
+        from ui.register_dialog import RegisterDialog
         dialog = RegisterDialog(self)
         self.animate_dialog_open(dialog)
         if dialog.exec_() == QDialog.Accepted:
@@ -220,12 +270,23 @@ class MystiAideApp(QMainWindow):
             self.status_bar.showMessage(f"注册成功并已登录，欢迎 {self.user_name}!")
     
     def logout(self):
-        """退出登录"""
+        """退出登录，并清除保存的登录状态"""
+        self.cancel_login_verify()
         self.user_name = ""
         self.user_id = ""
         self.is_logged_in = False
         self.update_login_status()
         self.status_bar.showMessage("已退出登录")
+        
+        # 清除保存的登录状态
+        self.clear_login_state()
+    
+    def clear_login_state(self):
+        """清除保存的登录状态"""
+        from utils.credential_store import get_credential_store
+        
+        self.login_verification.clear()
+        get_credential_store().clear()
     
     def update_login_status(self):
         """更新登录状态显示"""
@@ -248,6 +309,7 @@ class MystiAideApp(QMainWindow):
             if not self.is_logged_in:
                 return
         
+        from ui.upload_dialog import UploadDialog
         dialog = UploadDialog(self)
         # 传递用户ID
         dialog.set_user_id(self.user_id)
@@ -282,16 +344,23 @@ class MystiAideApp(QMainWindow):
         list_layout = QVBoxLayout(list_container)
         list_layout.setContentsMargins(0, 0, 0, 0)
         
-        self.tree_widget = QTreeWidget()
-        self.tree_widget.setColumnCount(2)
-        self.tree_widget.setHeaderLabels(["名称", "描述"])
+        # 目录模型和过滤代理
+        self.catalog_model = CatalogTableModel(self)
+        self.catalog_proxy = CatalogFilterProxy(self)
+        self.catalog_proxy.setSourceModel(self.catalog_model)
+        
+        self.tree_view = QTreeView()
+        self.tree_view.setModel(self.catalog_proxy)
+        self.tree_view.setUniformRowHeights(True)  # 行高一致，滚动时不必逐行计算
+        self.tree_view.setRootIsDecorated(False)
+        self.tree_view.setItemsExpandable(False)
         
-        self.tree_widget.setColumnWidth(0, 250)  # 名称列宽度
-        self.tree_widget.setColumnWidth(1, 600)  # 描述列宽度
-        self.tree_widget.setIndentation(0)
+        self.tree_view.setColumnWidth(0, 250)  # 名称列宽度
+        self.tree_view.setColumnWidth(1, 600)  # 描述列宽度
+        self.tree_view.setIndentation(0)
         
-        self.tree_widget.setStyleSheet("""
-            QTreeWidget {
+        self.tree_view.setStyleSheet("""
+            QTreeView {
                 border: none;
                 background-color: white;
                 alternate-background-color: #f8f9fa;
@@ -305,15 +374,15 @@ class MystiAideApp(QMainWindow):
                 border: none;
                 font-weight: bold;
             }
-            QTreeWidget::item {
+            QTreeView::item {
                 padding: 8px 4px;
                 border-bottom: 1px solid #f1f3f4;
             }
-            QTreeWidget::item:selected {
+            QTreeView::item:selected {
                 background-color: #e8f0fe;
                 color: #1a73e8;
             }
-            QTreeWidget::item:hover {
+            QTreeView::item:hover {
                 background-color: #f1f3f4;
             }
             QScrollBar:vertical {
@@ -336,92 +405,257 @@ class MystiAideApp(QMainWindow):
         """)
         
         # 设置交替行颜色
-        self.tree_widget.setAlternatingRowColors(True)
-        self.tree_widget.itemDoubleClicked.connect(self.on_item_double_clicked)
-        
-        list_layout.addWidget(self.tree_widget)
+        self.tree_view.setAlternatingRowColors(True)
+        self.tree_view.doubleClicked.connect(self.on_item_double_clicked)
+        
+        # 选中或悬停的命令库提前在后台获取详情
+        self.tree_view.selectionModel().currentChanged.connect(self.prefetch_index)
+        self.tree_view.setMouseTracking(True)
+        self.hover_index = None
+        self.hover_timer = QTimer(self)
+        self.hover_timer.setSingleShot(True)
+        self.hover_timer.setInterval(300)
+        self.hover_timer.timeout.connect(self.on_hover_timeout)
+        self.tree_view.entered.connect(self.on_item_hovered)
+        
+        list_layout.addWidget(self.tree_view)
         self.card_layout.addWidget(list_container)
     
     def load_main_list(self):
-        """加载主列表"""
+        """在后台线程加载主列表(先显示缓存，再向服务器确认更新)"""
+        from ui.workers import CatalogLoadWorker
+        
+        # 如果上一次加载还没结束，先取消
+        self.cancel_main_list_load()
+        
         self.status_bar.showMessage("正在加载列表...")
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
         self.progress_bar.setVisible(True)
-        self.progress_bar.setValue(10)
-        QApplication.processEvents()  
-        
-        try:
-            self.tree_widget.clear()
-            self.progress_bar.setValue(30)
-            QApplication.processEvents()
-            
-            response = requests.get("https://www.viqu.com/MystiAide/cls/dir.php")
-            
-            self.progress_bar.setValue(70)
-            QApplication.processEvents()
-            
-            if response.status_code == 200:
-                response.encoding = 'utf-8'
-                items = response.text.split('\n')
-                self.original_items = []
-                
-                for item in items:
-                    if item.strip():
-                        parts = item.split('≈')
-                        name = parts[0].strip()
-                        desc = parts[1].strip() if len(parts) > 1 else ""
-                        full_name = f"{name}≈{desc}" if desc else name
-                        
-                        self.original_items.append((name, desc, full_name))
-                        
-                        item = QTreeWidgetItem(self.tree_widget)
-                        item.setText(0, name)
-                        item.setText(1, desc)
-                        item.setData(0, Qt.UserRole, full_name)
-                
-                self.status_bar.showMessage(f"加载完成，共 {len(self.original_items)} 个项目")
-            else:
-                QMessageBox.critical(self, "错误", f"无法获取列表，HTTP状态码: {response.status_code}")
-                self.status_bar.showMessage("加载失败")
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"发生错误: {str(e)}")
-            self.status_bar.showMessage("加载出错")
-        finally:
-            self.progress_bar.setValue(100)
-            QApplication.processEvents()
+        self.sync_summary = ""
+        
+        # 列表为空(首次加载)时先显示缓存；刷新时保留当前列表，服务器有更新时只同步差异
+        if self.catalog_model.rowCount() == 0:
+            worker = CatalogLoadWorker(self, show_cached=True)
+        else:
+            worker = CatalogLoadWorker(self, show_cached=False,
+                                       sync_rows=list(self.catalog_model.store()))
+        worker.progress.connect(self.on_list_progress)
+        worker.catalog_started.connect(self.on_catalog_started)
+        worker.rows_loaded.connect(self.on_list_rows_loaded)
+        worker.catalog_loaded.connect(self.on_catalog_loaded)
+        worker.catalog_synced.connect(self.on_catalog_synced)
+        worker.load_finished.connect(self.on_list_load_finished)
+        worker.load_failed.connect(self.on_list_load_failed)
+        worker.finished.connect(worker.deleteLater)
+        self.list_worker = worker
+        worker.start()
+    
+    def cancel_main_list_load(self):
+        """取消正在进行的列表加载"""
+        worker = self.list_worker
+        if worker is not None:
+            from ui.workers import retire_worker
+            retire_worker(worker)
+            self.list_worker = None
             self.progress_bar.setVisible(False)
     
+    def on_list_progress(self, value):
+        """更新下载进度，-1 表示服务器未返回总大小"""
+        if self.sender() is not self.list_worker:
+            return
+        if value < 0:
+            self.progress_bar.setRange(0, 0)  # 总大小未知时显示忙碌状态
+        else:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(value)
+    
+    def on_catalog_started(self, source):
+        """后台开始发送一份新目录(缓存或服务器)，清空当前列表"""
+        if self.sender() is not self.list_worker:
+            return
+        self.search_index = None
+        self.catalog_proxy.set_visible_rows(None)
+        self.catalog_model.clear()
+    
+    def on_list_rows_loaded(self, rows):
+        """接收后台解析好的一批列表项"""
+        if self.sender() is not self.list_worker:
+            return
+        first_batch = self.catalog_model.rowCount() == 0
+        self.catalog_model.append_rows(rows)
+        if first_batch:
+            get_startup_timeline().mark("显示首批目录")
+    
+    def on_catalog_loaded(self, search_index):
+        """一份目录发送完毕，接管后台建好的搜索索引"""
+        if self.sender() is not self.list_worker:
+            return
+        self.search_index = search_index
+        self.status_bar.showMessage(f"已加载 {self.catalog_model.rowCount()} 个项目，正在检查更新...")
+        get_startup_timeline().finish("目录加载完成")
+        # 加载期间输入的关键词在索引就绪后重新搜索
+        if self.search_input.text():
+            self.search_lists()
+    
+    def on_catalog_synced(self, delta, search_index):
+        """刷新时应用新旧目录的差异，保持选中项和滚动位置"""
+        if self.sender() is not self.list_worker:
+            return
+        if delta.is_empty():
+            self.search_index = search_index
+            self.sync_summary = "列表没有变化"
+            return
+        
+        # 记住当前最上面一行，更新后滚动回原位置
+        top_index = QPersistentModelIndex(self.tree_view.indexAt(QPoint(0, 0)))
+        
+        self.search_index = None
+        self.catalog_model.apply_delta(delta)
+        self.search_index = search_index
+        if self.search_input.text():
+            self.search_lists()
+        
+        if top_index.isValid():
+            self.tree_view.scrollTo(QModelIndex(top_index), QTreeView.PositionAtTop)
+        self.sync_summary = (f"新增 {len(delta.inserted)} 个，移除 {len(delta.removed)} 个，"
+                             f"更新 {len(delta.changed)} 个")
+        if delta.order is not None:
+            self.sync_summary += "，顺序已调整"
+    
+    def on_list_load_finished(self, status):
+        """列表加载结束"""
+        if self.sender() is not self.list_worker:
+            return
+        self.list_worker = None
+        self.progress_bar.setVisible(False)
+        count = self.catalog_model.rowCount()
+        # 列表首次就绪后，预取用户最常打开的命令库
+        if not self.frequent_prefetched:
+            self.frequent_prefetched = True
+            self.prefetcher.request_many(self.usage_stats.most_used())
+        if status == "not_modified":
+            self.status_bar.showMessage(f"列表已是最新，共 {count} 个项目")
+        elif status == "offline":
+            self.status_bar.showMessage(f"无法连接服务器，显示缓存的 {count} 个项目 (离线模式)")
+        elif self.sync_summary:
+            self.status_bar.showMessage(f"同步完成，{self.sync_summary}，共 {count} 个项目")
+        else:
+            self.status_bar.showMessage(f"加载完成，共 {count} 个项目")
+    
+    def on_list_load_failed(self, message):
+        """列表加载失败"""
+        if self.sender() is not self.list_worker:
+            return
+        self.list_worker = None
+        self.progress_bar.setVisible(False)
+        get_startup_timeline().finish("目录加载失败")
+        QMessageBox.critical(self, "错误", message)
+        self.status_bar.showMessage("加载失败")
+    
+    def toggle_mirror_sync(self):
+        """开始同步离线镜像；正在同步时停止(已同步的部分保留，下次继续)"""
+        from ui.workers import retire_worker
+        from ui.mirror_sync import MirrorSyncWorker
+        
+        if self.mirror_worker is not None:
+            retire_worker(self.mirror_worker)
+            self.mirror_worker = None
+            self.mirror_button.setText("离线镜像")
+            self.status_bar.showMessage("已停止同步离线镜像，下次同步时继续")
+            return
+        if self.catalog_model.rowCount() == 0:
+            QMessageBox.information(self, "离线镜像", "命令库列表尚未加载完成，请稍后再试")
+            return
+        
+        worker = MirrorSyncWorker(list(self.catalog_model.store()), self)
+        worker.progress.connect(self.on_mirror_progress)
+        worker.sync_finished.connect(self.on_mirror_finished)
+        worker.sync_failed.connect(self.on_mirror_failed)
+        worker.finished.connect(worker.deleteLater)
+        self.mirror_worker = worker
+        self.mirror_button.setText("停止同步")
+        self.status_bar.showMessage("正在同步离线镜像...")
+        worker.start()
+    
+    def on_mirror_progress(self, synced, total):
+        if self.sender() is not self.mirror_worker:
+            return
+        self.status_bar.showMessage(f"正在同步离线镜像: {synced}/{total}")
+    
+    def on_mirror_finished(self, synced, failed):
+        if self.sender() is not self.mirror_worker:
+            return
+        self.mirror_worker = None
+        self.mirror_button.setText("离线镜像")
+        message = f"离线镜像同步完成，本次同步 {synced} 个命令库"
+        if failed:
+            message += f"，{failed} 个失败(下次同步时重试)"
+        self.status_bar.showMessage(message)
+    
+    def on_mirror_failed(self, message):
+        if self.sender() is not self.mirror_worker:
+            return
+        self.mirror_worker = None
+        self.mirror_button.setText("离线镜像")
+        self.status_bar.showMessage(f"离线镜像同步中断: {message}")
+    
+    def closeEvent(self, event):
+        """关闭窗口时取消后台加载和所有打开的详情对话框中的请求"""
+        from ui.workers import retire_worker
+        from ui.command_detail_dialog import CommandDetailDialog
+        
+        for dialog in self.findChildren(CommandDetailDialog):
+            dialog.cancel_fetches()
+        worker = self.list_worker
+        self.list_worker = None
+        if worker is not None:
+            retire_worker(worker, wait_ms=1000)
+        if self.mirror_worker is not None:
+            retire_worker(self.mirror_worker, wait_ms=1000)
+            self.mirror_worker = None
+        self.cancel_login_verify()
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+        super().closeEvent(event)
+    
     def search_lists(self):
         """搜索列表"""
+        self.search_timer.stop()
         search_term = self.search_input.text().lower()
         if not search_term:
             self.clear_search()
             return
+        self.set_search_generation(search_term)
         
-        self.tree_widget.clear()
-        found_count = 0
-        
-        for name, desc, full_name in self.original_items:
-            if search_term in name.lower() or search_term in desc.lower():
-                item = QTreeWidgetItem(self.tree_widget)
-                item.setText(0, name)
-                item.setText(1, desc)
-                item.setData(0, Qt.UserRole, full_name)
-                found_count += 1
+        if self.search_index is not None:
+            matches = self.search_index.search(search_term)
+        else:
+            # 索引尚未就绪(列表仍在加载)时逐行匹配
+            matches = [row for row, (name, desc) in enumerate(self.catalog_model.store())
+                       if search_term in name.lower() or search_term in desc.lower()]
+        self.catalog_proxy.set_visible_rows(matches)
+        found_count = len(matches)
         
         self.status_bar.showMessage(f"找到 {found_count} 个匹配项" if found_count > 0 else "没有找到匹配项")
     
+    def set_search_generation(self, search_term):
+        """搜索条件改变后，之前结果中的行已不再显示，取消为它们排队的预取"""
+        if search_term != self.last_search_term:
+            self.last_search_term = search_term
+            if self.prefetcher is not None:
+                self.prefetcher.cancel_pending()
+    
     def clear_search(self):
         """清除搜索"""
+        self.search_timer.stop()
+        self.search_input.blockSignals(True)
         self.search_input.clear()
-        self.tree_widget.clear()
+        self.search_input.blockSignals(False)
+        self.catalog_proxy.set_visible_rows(None)
+        self.set_search_generation("")
         
-        for name, desc, full_name in self.original_items:
-            item = QTreeWidgetItem(self.tree_widget)
-            item.setText(0, name)
-            item.setText(1, desc)
-            item.setData(0, Qt.UserRole, full_name)
-        
-        self.status_bar.showMessage(f"显示全部 {len(self.original_items)} 个项目")
+        self.status_bar.showMessage(f"显示全部 {self.catalog_model.rowCount()} 个项目")
     
     def setup_url_monitoring(self):
         """设置URL监控，用于检测需要退出登录的链接"""
@@ -432,6 +666,7 @@ class MystiAideApp(QMainWindow):
     
     def check_redirect_url(self, reply):
         """检查重定向URL是否包含需要退出登录的标记"""
+        from PyQt5.QtNetwork import QNetworkRequest
         redirect_url = reply.attribute(QNetworkRequest.RedirectionTargetAttribute)
         if redirect_url:
             url_string = redirect_url.toString()
@@ -439,27 +674,62 @@ class MystiAideApp(QMainWindow):
                 print(f"检测到账号相关链接: {url_string}，执行退出登录")
                 self.logout()
 
-    def on_item_double_clicked(self, item, column):
-        full_name = item.data(0, Qt.UserRole)
+    def on_item_double_clicked(self, index):
+        full_name = index.data(Qt.UserRole)
         # 检查链接是否包含account
         if "account" in full_name:
             self.logout()
             return
         self.show_list_details(full_name)
     
+    def on_item_hovered(self, index):
+        """鼠标在某一行停留一小段时间后预取它的详情"""
+        self.hover_index = QPersistentModelIndex(index)
+        self.hover_timer.start()
+    
+    def on_hover_timeout(self):
+        self.prefetch_index(self.hover_index)
+    
+    def prefetch_index(self, index):
+        """预取指定行的命令库详情"""
+        if index is None or not index.isValid():
+            return
+        full_name = self.catalog_proxy.index(index.row(), 0).data(Qt.UserRole)
+        if full_name and "account" not in full_name and self.prefetcher is not None:
+            self.prefetcher.request(full_name)
+    
     def show_list_details(self, list_name):
         # 检查链接是否包含account
         if "account" in list_name:
             self.logout()
             return
-            
+        
+        self.usage_stats.record_open(list_name)
+        
+        from ui.command_detail_dialog import CommandDetailDialog
         detail_dialog = CommandDetailDialog(list_name, self)
         # 添加动画效果
         self.animate_dialog_open(detail_dialog)
         # 将对话框设置为非模态
         detail_dialog.setModal(False)
         detail_dialog.show()  # 使用show()而不是exec_()
-        # 保存对话框引用，防止被垃圾回收
+        # 对话框以主窗口为父对象，不会被垃圾回收
+        return detail_dialog
+    
+    def show_command_search(self):
+        """打开全部命令搜索(需要离线镜像)"""
+        from utils.mirror import get_mirror
+        from ui.command_search_dialog import CommandSearchDialog
+        
+        if get_mirror() is None:
+            QMessageBox.information(self, "搜索命令", "搜索所有命令需要离线镜像，请先点击\"离线镜像\"同步命令库")
+            return
+        if self.command_search_dialog is None:
+            self.command_search_dialog = CommandSearchDialog(self)
+        self.command_search_dialog.show()
+        self.command_search_dialog.raise_()
+        self.command_search_dialog.activateWindow()
+        self.command_search_dialog.search_input.setFocus()
     
     def create_search_box(self):
         """创建搜索框区域"""
@@ -487,6 +757,13 @@ class MystiAideApp(QMainWindow):
         """)
         self.search_input.returnPressed.connect(self.search_lists)
         
+        # 边输入边搜索，停止输入一小段时间后才执行
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.search_lists)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        
         search_button = QPushButton("搜索")
         search_button.setFixedWidth(80)
         search_button.clicked.connect(self.search_lists)
@@ -514,169 +791,98 @@ class MystiAideApp(QMainWindow):
         """)
         upload_button.clicked.connect(self.show_upload_dialog)
         
+        command_search_button = QPushButton("搜索命令")
+        command_search_button.setFixedWidth(90)
+        command_search_button.setToolTip("在离线镜像的所有命令库中搜索命令 (Ctrl+Shift+F)")
+        command_search_button.clicked.connect(self.show_command_search)
+        QShortcut(QKeySequence("Ctrl+Shift+F"), self, self.show_command_search)
+        
+        self.mirror_button = QPushButton("离线镜像")
+        self.mirror_button.setFixedWidth(90)
+        self.mirror_button.setToolTip("把所有命令库下载到本地，之后打开命令库不再需要网络")
+        self.mirror_button.clicked.connect(self.toggle_mirror_sync)
+        
         search_layout.addWidget(self.search_input, 1)
         search_layout.addWidget(search_button)
         search_layout.addWidget(clear_button)
         search_layout.addWidget(refresh_button)
         search_layout.addWidget(upload_button)
+        search_layout.addWidget(command_search_button)
+        search_layout.addWidget(self.mirror_button)
         
         self.card_layout.addWidget(search_frame)
 
     def load_login_state(self):
-        """加载并解密保存的登录状态"""
-        import os
-        import json
-        import time
-        import requests
-        from utils.aes_crypto import AESCrypto
-        
-        try:
-            # 使用更隐蔽的文件位置和名称
-            config_dir = self.get_secure_config_dir()
-            login_file = self.get_secure_login_file_path(config_dir)
-            
-            if not os.path.exists(login_file):
-                return
-            
-            # 先解密整个文件
-            temp_file = os.path.join(config_dir, f".tmp_{int(time.time())}.dat")
-            if not AESCrypto.decrypt_file(login_file, temp_file):
-                print("解密登录文件失败")
-                return
-            
-            try:
-                # 读取解密后的JSON文件
-                with open(temp_file, "r", encoding="utf-8") as f:
-                    encrypted_data = json.load(f)
-                
-                # 解密内部数据
-                login_data = AESCrypto.decrypt_login_data(encrypted_data)
-                
-                # 删除临时文件
-                os.remove(temp_file)
-                
-                if not login_data:
-                    self.clear_login_state()
-                    return
-                
-                # 检查数据是否完整
-                if "username" in login_data and "user_id" in login_data:
-                    # 检查是否过期
-                    if "timestamp" in login_data:
-                        current_time = time.time()
-                        login_time = login_data["timestamp"]
-                        # 7天 = 604800秒
-                        if current_time - login_time > 604800:
-                            print("登录状态已过期")
-                            self.clear_login_state()
-                            return
-                    
-                    # 恢复登录状态
-                    self.user_name = login_data["username"]
-                    self.user_id = login_data["user_id"]
-                    
-                    # 验证登录状态
-                    self.verify_login(self.user_name, self.user_id)
-                else:
-                    print("登录数据不完整")
-                    self.clear_login_state()
-            except Exception as e:
-                print(f"处理解密后的数据时出错: {str(e)}")
-                # 确保删除临时文件
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-        except Exception as e:
-            print(f"加载登录状态时出错: {str(e)}")
-        
-        def clear_login_state(self):
-            """清除保存的登录状态"""
-            import os
-            
-            try:
-                config_dir = self.get_secure_config_dir()
-                login_file = self.get_secure_login_file_path(config_dir)
-                
-                if os.path.exists(login_file):
-                    os.remove(login_file)
-                    print("已清除登录状态")
-            except Exception as e:
-                print(f"清除登录状态时出错: {str(e)}")
-        
-        def logout(self):
-            """退出登录"""
-            self.user_name = ""
-            self.user_id = ""
-            self.is_logged_in = False
-            self.update_login_status()
-            self.status_bar.showMessage("已退出登录")
-            
-            # 清除保存的登录状态
-            self.clear_login_state()
+        """读取保存的登录状态：先按已登录显示，再在后台验证"""
+        from utils.credential_store import get_credential_store
+        
+        login_data = get_credential_store().load()
+        if not login_data:
+            return
+        
+        self.user_name = login_data["username"]
+        self.user_id = login_data["user_id"]
+        self.is_logged_in = True
+        self.update_login_status()
+        self.status_bar.showMessage(f"欢迎回来, {self.user_name}!")
+        
+        self.verify_login(self.user_name, self.user_id)
 
     def get_machine_info(self):
-        """获取机器特定信息作为加密密钥的种子"""
-        import platform
-        import uuid
-        
-        # 获取系统信息和硬件标识
-        system_info = platform.system() + platform.version()
-        try:
-            machine_id = str(uuid.getnode())  # MAC地址的数字表示
-        except:
-            machine_id = "fallback_id"
-            
-        # 组合并返回
-        return f"{system_info}:{machine_id}:MystiAide_Secret_Key"
+        """获取机器特定信息作为加密密钥的种子(与 AESCrypto 共用同一份缓存)"""
+        return get_machine_info()
 
     def verify_login(self, username, user_id):
-        """验证保存的登录信息是否有效"""
-        try:
-            # 向服务器验证用户信息
-            verify_url = f"https://www.viqu.com/MystiAide/normal_user/getid.php?name={username}"
-            response = requests.get(verify_url)
-            
-            if response.status_code == 200:
-                server_user_id = response.text.strip()
-                if server_user_id and server_user_id == user_id:
-                    # 登录信息有效
-                    self.is_logged_in = True
-                    self.update_login_status()
-                    self.status_bar.showMessage(f"欢迎回来, {self.user_name}!")
-                    print(f"已验证并恢复登录状态: {self.user_name}")
-                else:
-                    print(f"用户ID验证失败: 本地={user_id}, 服务器={server_user_id}")
-                    self.clear_login_state()
-            else:
-                print(f"验证登录状态失败: {response.status_code}")
-                # 如果服务器不可用，仍然使用本地数据
-                self.is_logged_in = True
-                self.update_login_status()
-                self.status_bar.showMessage(f"欢迎回来, {self.user_name}! (离线模式)")
-        except Exception as e:
-            print(f"验证登录状态时出错: {str(e)}")
-            # 如果网络错误，仍然使用本地数据
-            self.is_logged_in = True
-            self.update_login_status()
-            self.status_bar.showMessage(f"欢迎回来, {self.user_name}! (离线模式)")
+        """在后台验证保存的登录信息是否有效，不阻塞界面
 
-    def get_secure_config_dir(self):
-        """获取安全的配置目录"""
-        import os
-        
-        # 使用AppData目录下的隐藏文件夹
-        app_data = os.environ.get('APPDATA', os.path.expanduser('~'))
-        # 创建一个看起来像系统目录的路径
-        config_dir = os.path.join(app_data, "Microsoft", "Credentials", "SystemData")
-        os.makedirs(config_dir, exist_ok=True)
-        return config_dir
-    
-    def get_secure_login_file_path(self, config_dir):
-        """获取安全的登录文件路径，使用不明显的文件名"""
-        import os
-        import hashlib
-        
-        # 使用机器信息的哈希作为文件名的一部分
-        machine_hash = hashlib.md5(self.get_machine_info().encode()).hexdigest()[:12]
-        # 使用看起来像系统文件的名称
-        filename = f"CredentialCache_{machine_hash}.dat"
-        return os.path.join(config_dir, filename)
\ No newline at end of file
+        最近 VERIFY_TTL 秒内验证成功过的不再访问服务器。服务器返回的用户ID
+        不一致时退出登录；无法连接服务器时保持登录(离线模式)。
+        """
+        from ui.workers import FetchWorker
+        from utils.api_client import get_api_client
+        from utils.circuit_breaker import TimeBudget
+        from utils.request_scheduler import BACKGROUND
+        
+        if self.login_verification.is_fresh(username, user_id):
+            print(f"已恢复登录状态: {username}")
+            return
+        
+        self.cancel_login_verify()
+        request = partial(get_api_client().get_user_id, username, BACKGROUND,
+                          budget=TimeBudget(self.VERIFY_BUDGET))
+        worker = FetchWorker(request, self)
+        worker.fetched.connect(self.on_login_verified)
+        worker.fetch_failed.connect(self.on_login_verify_failed)
+        worker.finished.connect(worker.deleteLater)
+        self.verify_worker = worker
+        worker.start()
+    
+    def cancel_login_verify(self):
+        """取消正在进行的登录验证(退出或重新登录时)，结果不再处理"""
+        worker = self.verify_worker
+        if worker is not None:
+            from ui.workers import retire_worker
+            retire_worker(worker)
+            self.verify_worker = None
+    
+    def on_login_verified(self, server_user_id):
+        """服务器返回了用户ID"""
+        if self.sender() is not self.verify_worker:
+            return
+        self.verify_worker = None
+        server_user_id = server_user_id.strip()
+        if server_user_id and server_user_id == self.user_id:
+            self.login_verification.record(self.user_name, self.user_id)
+            print(f"已验证并恢复登录状态: {self.user_name}")
+        else:
+            print(f"用户ID验证失败: 本地={self.user_id}, 服务器={server_user_id}")
+            self.logout()
+            self.status_bar.showMessage("登录状态已失效，请重新登录")
+    
+    def on_login_verify_failed(self, message):
+        """无法验证(服务器不可用或网络错误)，仍然使用本地的登录状态"""
+        if self.sender() is not self.verify_worker:
+            return
+        self.verify_worker = None
+        print(f"验证登录状态失败: {message}")
+        self.user_info_label.setText(f"用户: {self.user_name} (离线模式)")
\ No newline at end of file
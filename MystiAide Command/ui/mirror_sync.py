@@ -0,0 +1,112 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from PyQt5.QtCore import QThread, pyqtSignal
+import requests
+
+from utils.api_client import get_api_client
+from utils.circuit_breaker import CircuitOpenError
+from utils.mirror import get_mirror
+from utils.request_scheduler import CancelToken, RequestCancelled, BACKGROUND
+
+
+class MirrorSyncWorker(QThread):
+    """把整个目录和所有命令库同步到本地离线镜像
+
+    同时最多获取 CONCURRENCY 个命令库(以后台优先级排队，不影响界面上的请求)，
+    每完成一个立即写入数据库，因此中断后再次同步会从剩下的命令库继续。
+    服务器不可用(熔断)时停止本次同步。
+    """
+
+    progress = pyqtSignal(int, int)        # 已同步数量, 命令库总数
+    sync_finished = pyqtSignal(int, int)   # 本次同步的数量, 失败的数量
+    sync_failed = pyqtSignal(str)
+
+    CONCURRENCY = 3
+    MAX_AGE = 7 * 24 * 3600  # 秒，超过这个时间的命令库重新同步
+    EMIT_INTERVAL = 0.2
+
+    def __init__(self, rows, parent=None):
+        super().__init__(parent)
+        self.rows = rows
+        self.api = get_api_client()
+        self.cancel_token = CancelToken()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        self.cancel_token.cancel()
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def fetch_library(self, name):
+        """获取一个命令库的 main.xml 和 list.xml，任一失败时返回None"""
+        main = self.api.library_main(name, BACKGROUND, self.cancel_token)
+        if main.status_code != 200:
+            return None
+        commands = self.api.library_list(name, BACKGROUND, self.cancel_token)
+        if commands.status_code != 200:
+            return None
+        return main.text, commands.text
+
+    def run(self):
+        try:
+            mirror = get_mirror(create=True)
+            mirror.replace_catalog(self.rows)
+            pending = mirror.pending_libraries(self.MAX_AGE)
+            total, synced = mirror.stats()
+            self.progress.emit(synced, total)
+            synced_now, failed = self.sync(mirror, pending, total, synced)
+            mirror.set_meta("last_sync", time.time())
+            if not self.is_cancelled():
+                self.sync_finished.emit(synced_now, failed)
+        except RequestCancelled:
+            return
+        except CircuitOpenError as e:
+            if not self.is_cancelled():
+                self.sync_failed.emit(str(e))
+        except Exception as e:
+            if not self.is_cancelled():
+                self.sync_failed.emit(f"同步离线镜像时出错: {str(e)}")
+
+    def sync(self, mirror, pending, total, synced):
+        """并发获取待同步的命令库，同时进行的请求不超过 CONCURRENCY 个"""
+        synced_now = failed = 0
+        last_emit = 0
+        remaining = iter(pending)
+        with ThreadPoolExecutor(self.CONCURRENCY) as pool:
+            running = {}
+            try:
+                while True:
+                    while len(running) < self.CONCURRENCY and not self.is_cancelled():
+                        name = next(remaining, None)
+                        if name is None:
+                            break
+                        running[pool.submit(self.fetch_library, name)] = name
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            result = future.result()
+                        except (RequestCancelled, CircuitOpenError):
+                            raise
+                        except requests.RequestException as e:
+                            print(f"同步 {name} 失败: {str(e)}")
+                            result = None
+                        if result is None:
+                            failed += 1
+                            continue
+                        mirror.store_library(name, *result)
+                        synced_now += 1
+                    now = time.monotonic()
+                    if now - last_emit >= self.EMIT_INTERVAL:
+                        last_emit = now
+                        self.progress.emit(synced + synced_now, total)
+            finally:
+                # 出错时让还在运行的请求尽快结束
+                if running:
+                    self.cancel_token.cancel()
+        self.progress.emit(synced + synced_now, total)
+        return synced_now, failed
@@ -0,0 +1,137 @@
+import time
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QThread, QTimer
+
+from utils.api_client import get_api_client
+from utils.detail_cache import get_detail_cache
+from utils.mirror import get_mirror
+from utils.request_scheduler import CancelToken, RequestCancelled, PREFETCH
+from ui.workers import retire_worker
+
+
+def is_fresh_entry(entry, fresh_seconds):
+    """详情缓存中的内容是否完整且在 fresh_seconds 秒内获取过"""
+    if not entry or entry.get("main") is None or entry.get("list") is None:
+        return False
+    return time.time() - entry.get("fetched_at", 0) < fresh_seconds
+
+
+class PrefetchWorker(QThread):
+    """低优先级后台线程：获取一个命令库的 main.xml 和 list.xml 并写入详情缓存
+
+    离线镜像或磁盘缓存中已有较新内容时不发送请求(这些检查要读磁盘，
+    所以放在后台线程中)，此时 fetched 为False。
+    """
+
+    def __init__(self, list_name, fresh_seconds, parent=None):
+        super().__init__(parent)
+        self.list_name = list_name
+        self.fresh_seconds = fresh_seconds
+        self.cancel_token = CancelToken()
+        self.fetched = False
+
+    def cancel(self):
+        self.cancel_token.cancel()
+
+    def run(self):
+        cache = get_detail_cache()
+        try:
+            mirror = get_mirror()
+            if mirror is not None and mirror.has_library(self.list_name):
+                return  # 离线镜像中已有
+        except Exception as e:
+            print(f"读取离线镜像失败: {str(e)}")
+        if is_fresh_entry(cache.get(self.list_name), self.fresh_seconds):
+            return
+
+        self.fetched = True
+        api = get_api_client()
+        for part, filename in (("main", "main.xml"), ("list", "list.xml")):
+            if self.cancel_token.is_cancelled():
+                return
+            try:
+                response = api.library_file(self.list_name, filename, PREFETCH, self.cancel_token)
+                if response.status_code != 200 or self.cancel_token.is_cancelled():
+                    return
+                cache.put(self.list_name, part, response.text)
+            except RequestCancelled:
+                return
+            except Exception as e:
+                print(f"预取 {self.list_name} 失败: {str(e)}")
+                return
+
+
+class DetailPrefetcher(QObject):
+    """预取命令库详情，让双击打开时数据通常已经在本地缓存中
+
+    选中或悬停的行、以及用户最常打开的命令库会被加入队列，
+    每次只在一个低优先级线程中获取一个命令库；队列长度和每次运行的
+    总预取数量都有上限，最近请求的排在最前面。界面线程只检查内存中的
+    缓存，磁盘缓存和离线镜像由预取线程检查。
+    """
+
+    MAX_QUEUE = 10
+    MAX_PER_SESSION = 200
+    FRESH_SECONDS = 600  # 缓存在这段时间内获取过的不再预取
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = OrderedDict()  # list_name -> None，末尾为最近请求的
+        self._worker = None
+        self._fetched = 0
+        self._stopped = False
+
+    def request(self, list_name):
+        """请求预取一个命令库(如果缓存中已有较新的内容则忽略)"""
+        if self._stopped or not list_name or self._fetched >= self.MAX_PER_SESSION:
+            return
+        if self._worker is not None and self._worker.list_name == list_name:
+            return
+        if self._is_fresh_in_memory(list_name):
+            return
+        self._queue.pop(list_name, None)
+        self._queue[list_name] = None
+        while len(self._queue) > self.MAX_QUEUE:
+            self._queue.popitem(last=False)  # 丢弃最早的请求
+        self._start_next()
+
+    def request_many(self, list_names):
+        """按顺序请求预取多个命令库，排在前面的先获取"""
+        for list_name in reversed(list_names):
+            self.request(list_name)
+
+    def stop(self):
+        """停止预取，清空队列"""
+        self._stopped = True
+        self.cancel_pending()
+
+    def cancel_pending(self):
+        """丢弃队列并取消正在进行的预取，例如搜索条件改变、之前的行已不再显示时"""
+        self._queue.clear()
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.finished.disconnect(self._on_worker_finished)
+            retire_worker(worker)
+
+    def _is_fresh_in_memory(self, list_name):
+        return is_fresh_entry(get_detail_cache().peek(list_name), self.FRESH_SECONDS)
+
+    def _start_next(self):
+        if self._worker is not None or not self._queue or self._stopped:
+            return
+        list_name, _ = self._queue.popitem(last=True)  # 最近请求的优先
+        if self._is_fresh_in_memory(list_name):
+            QTimer.singleShot(0, self._start_next)
+            return
+        self._worker = PrefetchWorker(list_name, self.FRESH_SECONDS, self)
+        self._worker.finished.connect(self._on_worker_finished)
+        self._worker.start(QThread.LowestPriority)
+
+    def _on_worker_finished(self):
+        worker = self._worker
+        self._worker = None
+        if worker is not None:
+            if worker.fetched:
+                self._fetched += 1
+            worker.deleteLater()
+        self._start_next()
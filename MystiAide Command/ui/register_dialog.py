@@ -3,12 +3,20 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLineEdit,
                             QMessageBox, QApplication, QGraphicsDropShadowEffect, QWidget)
 from PyQt5.QtCore import Qt, QPropertyAnimation, QEasingCurve
 from PyQt5.QtGui import QFont, QColor
-import requests
+from functools import partial
+from ui.workers import FetchWorker, retire_worker
+from utils.api_client import get_api_client
+from utils.circuit_breaker import TimeBudget
+from utils.credential_store import get_credential_store
+from utils.request_scheduler import CancelToken
 from utils.styles import GLOBAL_STYLE
 
 class RegisterDialog(QDialog):
+    REQUEST_BUDGET = 15  # 秒，注册和获取用户ID合计的最长等待时间
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.request_budget = None
         self.setWindowTitle("用户注册")
         self.setFixedSize(400, 350)  # 稍微高一点，因为有确认密码字段
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
@@ -17,6 +25,10 @@ class RegisterDialog(QDialog):
         self.username = ""
         self.user_id = ""
         
+        # 请求在后台线程执行，关闭对话框时一起取消
+        self.cancel_token = CancelToken()
+        self.request_workers = []
+        
         # 设置样式
         self.setStyleSheet(GLOBAL_STYLE + """
             QDialog {
@@ -137,11 +149,11 @@ class RegisterDialog(QDialog):
         cancel_btn.clicked.connect(self.reject)
         
         # 注册按钮
-        register_btn = QPushButton("注册")
-        register_btn.clicked.connect(self.register)
+        self.register_btn = QPushButton("注册")
+        self.register_btn.clicked.connect(self.register)
         
         button_layout.addWidget(cancel_btn)
-        button_layout.addWidget(register_btn)
+        button_layout.addWidget(self.register_btn)
         
         form_container_layout.addWidget(button_container)
         layout.addWidget(form_container)
@@ -169,93 +181,82 @@ class RegisterDialog(QDialog):
             QMessageBox.warning(self, "错误", "两次输入的密码不一致!")
             return
         
-        try:
-            # 注册请求
-            register_url = f"https://www.viqu.com/MystiAide/normal_user/sign.php?type=create&name={username}&data={password}&id=1"
-            response = requests.get(register_url)
-            
-            if response.status_code == 200:
-                response_text = response.text.strip()
-                
-                if "true" in response_text.lower():
-                    # 注册成功，获取用户ID
-                    self.username = username
-                    if self.get_user_id(username):
-                        QMessageBox.information(self, "注册成功", "账号注册成功!")
-                        self.accept()
-                    else:
-                        QMessageBox.warning(self, "注册问题", "注册成功但无法获取用户ID，部分功能可能受限")
-                        self.accept()  # 仍然接受注册，但可能有功能限制
-                else:
-                    QMessageBox.warning(self, "注册失败", response_text)
-            else:
-                QMessageBox.critical(self, "错误", f"服务器响应错误: {response.status_code}")
-        
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"注册过程中发生错误: {str(e)}")
+        # 注册请求
+        self.set_busy(True)
+        self.request_budget = TimeBudget(self.REQUEST_BUDGET)
+        self.start_request(partial(get_api_client().sign, "create", username, password, budget=self.request_budget),
+                           partial(self.on_sign_finished, username), self.on_sign_failed)
     
-    def get_user_id(self, username):
-        """获取用户ID"""
-        try:
-            # 获取用户ID请求
-            id_url = f"https://www.viqu.com/MystiAide/normal_user/getid.php?name={username}"
-            response = requests.get(id_url)
-            
-            if response.status_code == 200:
-                user_id = response.text.strip()
-                if user_id and user_id != "null" and user_id != "false":
-                    self.user_id = user_id
-                    print(f"获取到用户ID: {self.user_id}")  # 调试信息
-                    # 保存登录状态
-                    self.save_login_state(username, self.user_id)
-                    return True
-                else:
-                    print(f"获取用户ID返回无效值: {user_id}")  # 调试信息
-                    return False
-            else:
-                QMessageBox.warning(self, "警告", f"获取用户ID失败: {response.status_code}")
-                return False
-        
-        except Exception as e:
-            QMessageBox.warning(self, "警告", f"获取用户ID时发生错误: {str(e)}")
-            return False
+    def start_request(self, request, on_fetched, on_failed):
+        """在后台线程发送请求，结果交给界面线程的槽函数处理，不阻塞对话框"""
+        worker = FetchWorker(request, self, self.cancel_token)
+        worker.fetched.connect(on_fetched)
+        worker.fetch_failed.connect(on_failed)
+        worker.finished.connect(self.on_request_finished)
+        self.request_workers.append(worker)
+        worker.start()
     
-    def save_login_state(self, username, user_id):
-        """保存加密的登录状态到文件"""
-        import os
-        import json
-        import time
-        from utils.aes_crypto import AESCrypto
-        
-        try:
-            # 使用主窗口中的方法获取安全的配置目录和文件路径
-            config_dir = self.parent().get_secure_config_dir()
-            login_file = self.parent().get_secure_login_file_path(config_dir)
-            
-            # 准备登录数据
-            login_data = {
-                "username": username,
-                "user_id": user_id,
-                "timestamp": time.time()
-            }
-            
-            # 加密数据
-            encrypted_data = AESCrypto.encrypt_login_data(login_data)
-            if not encrypted_data:
-                print("加密登录数据失败")
-                return
-            
-            # 保存加密数据到临时JSON文件
-            temp_file = os.path.join(config_dir, f".tmp_{int(time.time())}.dat")
-            with open(temp_file, "w", encoding="utf-8") as f:
-                json.dump(encrypted_data, f)
-            
-            # 对整个JSON文件再次加密
-            AESCrypto.encrypt_file(temp_file, login_file)
-            
-            # 删除临时文件
-            os.remove(temp_file)
-                
-            print(f"双重加密的登录状态已保存")
-        except Exception as e:
-            print(f"保存登录状态时出错: {str(e)}")
\ No newline at end of file
+    def on_request_finished(self):
+        worker = self.sender()
+        if worker in self.request_workers:
+            self.request_workers.remove(worker)
+            worker.deleteLater()
+    
+    def set_busy(self, busy):
+        """请求进行中时禁用注册按钮，避免重复提交"""
+        self.register_btn.setEnabled(not busy)
+        self.register_btn.setText("注册中..." if busy else "注册")
+    
+    def done(self, result):
+        """关闭对话框时取消还在进行的请求，已到达的结果也不再处理"""
+        self.cancel_token.cancel()
+        for worker in self.request_workers:
+            retire_worker(worker)
+        self.request_workers = []
+        super().done(result)
+    
+    def on_sign_finished(self, username, response_text):
+        """注册请求返回"""
+        if self.cancel_token.is_cancelled():
+            return  # 对话框已关闭
+        response_text = response_text.strip()
+        if "true" in response_text.lower():
+            # 注册成功，获取用户ID
+            self.username = username
+            self.start_request(partial(get_api_client().get_user_id, username, budget=self.request_budget),
+                               self.on_user_id_fetched, self.on_user_id_failed)
+        else:
+            self.set_busy(False)
+            QMessageBox.warning(self, "注册失败", response_text)
+    
+    def on_sign_failed(self, message):
+        if self.cancel_token.is_cancelled():
+            return
+        self.set_busy(False)
+        QMessageBox.critical(self, "错误", f"注册过程中发生错误: {message}")
+    
+    def on_user_id_fetched(self, response_text):
+        """获取用户ID返回"""
+        if self.cancel_token.is_cancelled():
+            return
+        user_id = response_text.strip()
+        if user_id and user_id != "null" and user_id != "false":
+            self.user_id = user_id
+            print(f"获取到用户ID: {self.user_id}")  # 调试信息
+            # 保存登录状态
+            get_credential_store().save(self.username, self.user_id)
+            QMessageBox.information(self, "注册成功", "账号注册成功!")
+            self.accept()
+        else:
+            print(f"获取用户ID返回无效值: {user_id}")  # 调试信息
+            self.accept_without_user_id()
+    
+    def on_user_id_failed(self, message):
+        if self.cancel_token.is_cancelled():
+            return
+        QMessageBox.warning(self, "警告", f"获取用户ID失败: {message}")
+        self.accept_without_user_id()
+    
+    def accept_without_user_id(self):
+        QMessageBox.warning(self, "注册问题", "注册成功但无法获取用户ID，部分功能可能受限")
+        self.accept()  # 仍然接受注册，但可能有功能限制
\ No newline at end of file
@@ -1,12 +1,18 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLineEdit, QTextEdit, 
-                            QPushButton, QProgressBar, QMessageBox, QApplication, 
+                            QPushButton, QProgressBar, QMessageBox, 
                             QFrame, QLabel, QHBoxLayout, QGraphicsDropShadowEffect, QWidget)  # 添加 QWidget
 from PyQt5.QtCore import QRegExp, QPropertyAnimation, QEasingCurve, Qt  # 添加 Qt 到这里
 from PyQt5.QtGui import QRegExpValidator, QFont, QColor
-import requests
+from functools import partial
+from ui.workers import FetchWorker, retire_worker
+from utils.api_client import get_api_client
+from utils.circuit_breaker import TimeBudget
+from utils.request_scheduler import CancelToken
 from utils.styles import GLOBAL_STYLE
 
 class UploadDialog(QDialog):
+    UPLOAD_BUDGET = 60  # 秒，包括重试在内上传的最长等待时间
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("上传命令库")
@@ -15,6 +21,10 @@ class UploadDialog(QDialog):
         # 初始化用户ID
         self.user_id = ""
         
+        # 上传在后台线程执行，关闭对话框时取消
+        self.cancel_token = CancelToken()
+        self.upload_worker = None
+        
         # 设置样式
         # 在样式表中设置的边框属性
         self.setStyleSheet(GLOBAL_STYLE + """
@@ -185,6 +195,7 @@ class UploadDialog(QDialog):
             }
         """)
         upload_btn.clicked.connect(self.upload_data)
+        self.upload_btn = upload_btn
         
         button_layout.addWidget(cancel_btn)
         button_layout.addWidget(upload_btn)
@@ -225,10 +236,13 @@ class UploadDialog(QDialog):
             QMessageBox.warning(self, "错误", "所有字段都必须填写!")
             return
         
+        if self.upload_worker is not None:
+            return  # 上一次上传还没有结束
+        
         # 显示进度条
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(50)
-        QApplication.processEvents()  # 更新UI
+        self.upload_btn.setEnabled(False)
         
         # 处理命令列表
         # 替换#为---，换行符为∅
@@ -250,22 +264,47 @@ class UploadDialog(QDialog):
         if hasattr(self, 'user_id') and self.user_id:
             data["uid"] = self.user_id
         
-        # 发送POST请求
-        try:
-            response = requests.post(
-                "https://www.viqu.com/MystiAide/wi/upload.php",
-                data=data
-            )
-            
-            self.progress_bar.setValue(100)
-            
-            if response.status_code == 200:
-                QMessageBox.information(self, "系统", f"{response.text}")
-                if "成功" in response.text:
-                    self.close()
-            else:
-                QMessageBox.critical(self, "上传失败", f"HTTP状态码: {response.status_code}\n返回内容: {response.text}")
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"上传过程中发生错误: {str(e)}")
-        finally:
-            self.progress_bar.setVisible(False)
\ No newline at end of file
+        # 在后台线程发送POST请求
+        self.upload_worker = FetchWorker(partial(get_api_client().upload, data, budget=TimeBudget(self.UPLOAD_BUDGET)),
+                                         self, self.cancel_token)
+        self.upload_worker.fetched.connect(self.on_upload_finished)
+        self.upload_worker.fetch_failed.connect(self.on_upload_failed)
+        self.upload_worker.finished.connect(self.on_upload_worker_finished)
+        self.upload_worker.start()
+    
+    def on_upload_worker_finished(self):
+        worker = self.sender()
+        if worker is not self.upload_worker:
+            return
+        self.upload_worker = None
+        worker.deleteLater()
+        if not self.cancel_token.is_cancelled():
+            self.progress_bar.setVisible(False)
+            self.upload_btn.setEnabled(True)
+    
+    def on_upload_finished(self, response_text):
+        """上传请求返回"""
+        if self.cancel_token.is_cancelled():
+            return  # 对话框已关闭
+        self.progress_bar.setValue(100)
+        QMessageBox.information(self, "系统", f"{response_text}")
+        if "成功" in response_text:
+            self.close()
+    
+    def on_upload_failed(self, message):
+        if self.cancel_token.is_cancelled():
+            return
+        response = self.sender().response
+        if response is not None:
+            # 服务器拒绝了上传，显示它返回的说明
+            QMessageBox.critical(self, "上传失败", f"HTTP状态码: {response.status_code}\n返回内容: {response.text}")
+        else:
+            QMessageBox.critical(self, "上传失败", f"上传过程中发生错误: {message}")
+    
+    def done(self, result):
+        """关闭对话框时取消还在进行的上传"""
+        self.cancel_token.cancel()
+        if self.upload_worker is not None:
+            retire_worker(self.upload_worker)
+            self.upload_worker = None
+        super().done(result)
\ No newline at end of file
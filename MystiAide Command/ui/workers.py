@@ -0,0 +1,286 @@
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+import requests
+
+from utils.catalog import CatalogStreamParser, diff_catalog, make_full_name
+from utils.catalog_cache import CatalogCache
+from utils.search_index import CatalogSearchIndex
+from utils.pinyin import get_pinyin_cache
+from utils.request_scheduler import get_scheduler, CancelToken, RequestCancelled, INTERACTIVE, BACKGROUND
+from utils.api_client import get_api_client, abort_response
+from utils.circuit_breaker import TimeBudget
+from utils.mirror import get_mirror
+
+_retired_workers = set()
+
+
+def retire_worker(worker, wait_ms=0):
+    """取消一个后台线程，并让它在结束前一直保持存活
+
+    所属的窗口关闭后线程对象不会随窗口销毁(否则Qt会在线程仍在运行时报错)，
+    而是脱离父对象，等线程自己结束后再释放。wait_ms 大于0时最多等待这么久。
+    已经结束的线程直接释放(它的 finished 信号可能已经发出过)。
+    """
+    worker.cancel()
+    if wait_ms > 0:
+        worker.wait(wait_ms)
+    worker.setParent(None)
+    _retired_workers.add(worker)
+
+    def release():
+        _retired_workers.discard(worker)
+        worker.deleteLater()
+
+    # 先连接再检查：取消后线程可能在检查和连接之间结束，重复释放没有影响
+    worker.finished.connect(release)
+    if not worker.isRunning():
+        release()
+
+
+class CatalogLoadWorker(QThread):
+    """后台加载命令库目录，通过信号把结果交回界面线程
+
+    先显示磁盘缓存中的目录(如果有)，再用 If-None-Match / If-Modified-Since
+    向服务器确认；服务器返回304时不再下载，无法连接时继续使用缓存。
+    已经显示了缓存时，确认请求以后台优先级排队，不与用户正在等待的请求争抢连接。
+
+    传入 sync_rows(当前显示的目录)时为同步模式：下载到新目录后不再整体
+    重新发送，而是与 sync_rows 比较，只发送差异。先显示了缓存时也一样，
+    服务器的新目录与已显示的缓存比较，界面的选中项、滚动位置和筛选不受影响。
+    """
+
+    progress = pyqtSignal(int)            # 下载进度(0-100)，-1 表示总大小未知
+    catalog_started = pyqtSignal(str)     # 开始发送一份目录，参数为来源("cache"/"network")
+    rows_loaded = pyqtSignal(list)        # 一批解析好的 (名称, 描述)
+    catalog_loaded = pyqtSignal(object)   # 一份目录发送完毕，参数为建好的搜索索引
+    catalog_synced = pyqtSignal(object, object)  # 同步模式下的差异(CatalogDelta)和新目录的搜索索引
+    load_finished = pyqtSignal(str)       # 加载结束: "updated" / "not_modified" / "offline"
+    load_failed = pyqtSignal(str)         # 加载失败且没有可用的缓存
+
+    CHUNK_SIZE = 64 * 1024
+    BATCH_SIZE = 2000
+    EMIT_INTERVAL = 0.1  # 秒，下载较慢时也定期把已解析的行交给界面
+    RESPONSE_BUDGET = 12  # 秒，包括重试在内等待服务器响应的总时间
+
+    def __init__(self, parent=None, show_cached=True, cache=None, sync_rows=None, priority=INTERACTIVE):
+        super().__init__(parent)
+        self.show_cached = show_cached
+        self.sync_rows = sync_rows
+        self.priority = priority
+        self.cache = cache or CatalogCache()
+        self.api = get_api_client()
+        self.cancel_token = CancelToken()
+        self._response = None
+        self.shown_rows = []  # 最近一次完整发送的目录
+
+    def cancel(self):
+        """取消加载，正在进行的读取会被中断，结果不再发出"""
+        self.cancel_token.cancel()
+
+    def is_cancelled(self):
+        return self.cancel_token.is_cancelled()
+
+    def run(self):
+        has_cache = False
+        try:
+            # 先显示缓存的目录(过期也先显示，随后再确认)
+            has_cache = self.cache.has_body()
+            priority = self.priority
+            if self.show_cached and has_cache:
+                self.show_cache(self.emit_catalog("cache", self.cache.iter_body(self.CHUNK_SIZE)))
+                priority = BACKGROUND
+            elif self.show_cached and self.emit_mirror_catalog():
+                self.show_cache(True)
+                has_cache = True
+                priority = BACKGROUND
+
+            if not self.is_cancelled():
+                # 下载期间一直占用连接名额
+                with get_scheduler().slot(self.api.catalog_url(), priority, self.cancel_token):
+                    self.revalidate(has_cache)
+        except RequestCancelled:
+            return
+        except requests.RequestException as e:
+            if self.is_cancelled():
+                return
+            if has_cache:
+                print(f"无法连接服务器，使用缓存的列表: {str(e)}")
+                self.load_finished.emit("offline")
+            else:
+                self.load_failed.emit(f"发生错误: {str(e)}")
+        except Exception as e:
+            if not self.is_cancelled():
+                self.load_failed.emit(f"发生错误: {str(e)}")
+        finally:
+            if self._response is not None:
+                self._response.close()
+                self._response = None
+
+    def show_cache(self, completed):
+        """缓存已显示：之后从服务器下载到的新目录改为与它比较，只发送差异"""
+        if completed and self.sync_rows is None:
+            self.sync_rows = self.shown_rows
+
+    def emit_mirror_catalog(self):
+        """没有目录缓存时改为显示离线镜像中的目录，返回是否显示了"""
+        mirror = get_mirror()
+        rows = mirror.catalog_rows() if mirror else []
+        if not rows:
+            return False
+        text = "\n".join(make_full_name(name, desc) for name, desc in rows)
+        return self.emit_catalog("cache", [text.encode('utf-8')])
+
+    def revalidate(self, has_cache):
+        """向服务器确认目录是否有更新，有更新时边下载边发送新目录"""
+        headers = self.cache.conditional_headers() if has_cache else {}
+        self._response = self.api.open_catalog(headers, TimeBudget(self.RESPONSE_BUDGET), self.cancel_token)
+        response = self._response
+        self.cancel_token.add_callback(lambda: abort_response(response))
+
+        if response.status_code == 304:
+            self.cache.mark_checked()
+            self.load_finished.emit("not_modified")
+            return
+        if response.status_code != 200:
+            if has_cache:
+                print(f"获取列表失败(HTTP {response.status_code})，使用缓存的列表")
+                self.load_finished.emit("offline")
+            else:
+                self.load_failed.emit(f"无法获取列表，HTTP状态码: {response.status_code}")
+            return
+
+        writer = self.cache.open_writer()
+        try:
+            chunks = self.iter_response(response, writer)
+            if self.sync_rows is not None:
+                completed = self.emit_delta(chunks)
+            else:
+                completed = self.emit_catalog("network", chunks)
+        except BaseException as e:
+            writer.abort()
+            if isinstance(e, requests.RequestException) and not self.is_cancelled():
+                self.api.catalog_failed()
+            raise
+        if not completed:
+            writer.abort()
+            return
+        writer.commit(response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        self.progress.emit(100)
+        self.load_finished.emit("updated")
+
+    def iter_response(self, response, writer):
+        """逐块读取响应，同时写入缓存并报告下载进度"""
+        total = int(response.headers.get('Content-Length') or 0)
+        received = 0
+        self.progress.emit(0 if total else -1)
+        for chunk in response.iter_content(self.CHUNK_SIZE):
+            if self.is_cancelled():
+                return
+            writer.write(chunk)
+            # gzip 压缩时 Content-Length 是压缩后的大小，按已读取的原始字节计算进度
+            received = response.raw.tell() if hasattr(response.raw, 'tell') else received + len(chunk)
+            if total:
+                self.progress.emit(min(99, received * 100 // total))
+            yield chunk
+
+    def emit_catalog(self, source, chunks):
+        """边接收边解析目录并分批发送，同时在后台线程建立搜索索引
+
+        第一批行在收到后立即发送，之后每攒够一批或间隔一段时间发送一次，
+        因此下载结束前就能看到第一屏列表。返回是否完整发送。
+        """
+        parser = CatalogStreamParser()
+        search_index = CatalogSearchIndex(get_pinyin_cache())
+        self.shown_rows = []
+        self.catalog_started.emit(source)
+
+        pending = []
+        last_emit = None
+        for chunk in chunks:
+            if self.is_cancelled():
+                return False
+            pending.extend(parser.feed(chunk))
+            now = time.monotonic()
+            if pending and (last_emit is None or len(pending) >= self.BATCH_SIZE
+                            or now - last_emit >= self.EMIT_INTERVAL):
+                self.shown_rows.extend(pending)
+                self.rows_loaded.emit(pending)
+                # 先发送再建立索引，拼音转换不推迟这一批行的显示
+                search_index.add_rows(pending)
+                pending = []
+                last_emit = now
+
+        if self.is_cancelled():
+            return False
+        pending.extend(parser.close())
+        if pending:
+            self.shown_rows.extend(pending)
+            self.rows_loaded.emit(pending)
+            search_index.add_rows(pending)
+        self.catalog_loaded.emit(search_index)
+        search_index.pinyin.save()
+        return True
+
+    def emit_delta(self, chunks):
+        """解析完整的新目录，与当前显示的目录比较后只发送差异。返回是否完整发送"""
+        parser = CatalogStreamParser()
+        rows = []
+        for chunk in chunks:
+            if self.is_cancelled():
+                return False
+            rows.extend(parser.feed(chunk))
+        if self.is_cancelled():
+            return False
+        rows.extend(parser.close())
+
+        delta = diff_catalog(self.sync_rows, rows)
+        search_index = CatalogSearchIndex(get_pinyin_cache())
+        search_index.add_rows(rows)
+        if self.is_cancelled():
+            return False
+        self.catalog_synced.emit(delta, search_index)
+        search_index.pinyin.save()
+        return True
+
+
+class FetchWorker(QThread):
+    """在后台线程执行一个接口请求并发出响应文本
+
+    request 是 ApiClient 的方法(可用 functools.partial 绑定参数)，
+    调用时传入 cancel_token，返回 ApiResponse。多个线程可以共用同一个
+    cancel_token，例如同一个对话框的所有请求，关闭对话框时一起取消。
+    """
+
+    fetched = pyqtSignal(str)        # 获取成功，参数为响应文本
+    fetch_failed = pyqtSignal(str)   # 获取失败，参数为错误信息
+
+    def __init__(self, request, parent=None, cancel_token=None):
+        super().__init__(parent)
+        self.request = request
+        self.cancel_token = cancel_token or CancelToken()
+        self.response = None  # 收到的响应，fetch_failed 的槽函数可以读取非200响应的内容
+
+    def cancel(self):
+        """取消后不再发出结果，还在排队的请求不再发送，正在读取的连接被关闭"""
+        self.cancel_token.cancel()
+
+    def is_cancelled(self):
+        return self.cancel_token.is_cancelled()
+
+    def run(self):
+        try:
+            response = self.response = self.request(cancel_token=self.cancel_token)
+            if self.is_cancelled():
+                return
+            if response.status_code == 200:
+                self.fetched.emit(response.text)
+            else:
+                self.fetch_failed.emit(f"HTTP状态码: {response.status_code}")
+        except RequestCancelled:
+            return
+        except requests.Timeout:
+            if not self.is_cancelled():
+                self.fetch_failed.emit("请求超时")
+        except Exception as e:
+            if not self.is_cancelled():
+                self.fetch_failed.emit(str(e))
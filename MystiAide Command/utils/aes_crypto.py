@@ -2,14 +2,18 @@ import hashlib
 import base64
 import os
 import json
-import platform
-import uuid
+import mmap
+import traceback
+from functools import lru_cache
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
+from utils import machine_id
 
 class AESCrypto:
     """AES加密解密工具类，参考Java实现"""
     
+    CHUNK_SIZE = 1024 * 1024  # 流式加密解密每次处理的字节数，必须是16的倍数
+    
     @staticmethod
     def md5(data):
         """计算MD5哈希值"""
@@ -19,16 +23,24 @@ class AESCrypto:
     
     @staticmethod
     def get_machine_info():
-        """获取机器特定信息作为加密密钥的种子"""
-        # 获取系统信息和硬件标识
-        system_info = platform.system() + platform.version()
-        try:
-            machine_id = str(uuid.getnode())  # MAC地址的数字表示
-        except:
-            machine_id = "fallback_id"
-            
-        # 组合并返回
-        return f"{system_info}:{machine_id}:MystiAide_Secret_Key"
+        """获取机器特定信息作为加密密钥的种子(进程内只计算一次)"""
+        return machine_id.get_machine_info()
+    
+    @staticmethod
+    def get_machine_key():
+        """由机器信息派生的16字节密钥(进程内只计算一次)"""
+        return machine_id.get_machine_key()
+    
+    @staticmethod
+    def invalidate_machine_key():
+        """丢弃缓存的机器信息和密钥，下次使用时重新计算"""
+        machine_id.invalidate_machine_info()
+        AESCrypto._md5_key.cache_clear()
+    
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _md5_key(key):
+        return AESCrypto.md5(key)[16:]  # 取MD5后16位
     
     @staticmethod
     def encrypt(data, key):
@@ -75,14 +87,12 @@ class AESCrypto:
     @staticmethod
     def encrypt_string(data, key):
         """加密字符串，使用MD5处理密钥"""
-        md5_key = AESCrypto.md5(key)[16:]  # 取MD5后16位
-        return AESCrypto.encrypt(data, md5_key)
+        return AESCrypto.encrypt(data, AESCrypto._md5_key(key))
     
     @staticmethod
     def decrypt_string(encrypted_data, key):
         """解密字符串，使用MD5处理密钥"""
-        md5_key = AESCrypto.md5(key)[16:]  # 取MD5后16位
-        decrypted = AESCrypto.decrypt(encrypted_data, md5_key)
+        decrypted = AESCrypto.decrypt(encrypted_data, AESCrypto._md5_key(key))
         return decrypted.decode('utf-8')
     
     @staticmethod
@@ -94,7 +104,7 @@ class AESCrypto:
             
             # 生成密钥 (使用机器特定信息作为种子)
             machine_info = AESCrypto.get_machine_info()
-            key = hashlib.sha256(machine_info.encode()).digest()[:16]
+            key = AESCrypto.get_machine_key()
             
             # 加密数据
             cipher = AES.new(key, AES.MODE_CBC)
@@ -126,7 +136,7 @@ class AESCrypto:
             
             # 生成解密密钥
             machine_info = AESCrypto.get_machine_info()
-            key = hashlib.sha256(machine_info.encode()).digest()[:16]
+            key = AESCrypto.get_machine_key()
             
             # 解密数据
             iv = base64.b64decode(encrypted_data["iv"])
@@ -148,10 +158,151 @@ class AESCrypto:
             return None
 
     @staticmethod
-    def encrypt_file(file_path, save_path=None):
-        """对整个文件进行加密"""
-        import os
+    def encrypt_bytes(data):
+        """在内存中加密数据，返回与 encrypt_file 写入的文件相同的格式: 16字节IV + 密文"""
+        key = AESCrypto.get_machine_key()
+        cipher = AES.new(key, AES.MODE_CBC)
+        return cipher.iv + cipher.encrypt(pad(data, AES.block_size))
+    
+    @staticmethod
+    def decrypt_bytes(data):
+        """解密 encrypt_bytes 的结果(或 encrypt_file 写入的文件内容)，数据无效时抛出 ValueError"""
+        key = AESCrypto.get_machine_key()
+        cipher = AES.new(key, AES.MODE_CBC, data[:16])
+        return unpad(cipher.decrypt(data[16:]), AES.block_size)
+
+    @staticmethod
+    def _is_stream(src):
+        # mmap 也有 read 方法，但按缓冲区处理更快(不复制)
+        return hasattr(src, 'read') and not isinstance(src, mmap.mmap)
+
+    @staticmethod
+    def _iter_chunks(src, chunk_size):
+        """按 chunk_size 分块读取 src(文件对象，或 bytes/mmap 等支持缓冲区协议的对象)
+
+        除最后一块外每块的长度都是16的倍数。
+        """
+        if AESCrypto._is_stream(src):
+            pending = b''
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                if pending:
+                    chunk = pending + chunk
+                # 管道等可能读不满，不足一个分组的部分留到下一块
+                aligned = len(chunk) - len(chunk) % AES.block_size
+                pending = chunk[aligned:]
+                if aligned:
+                    yield chunk[:aligned]
+            if pending:
+                yield pending
+        else:
+            with memoryview(src) as view:
+                for start in range(0, len(view), chunk_size):
+                    yield view[start:start + chunk_size]
+
+    @staticmethod
+    def encrypt_stream(src, dst, chunk_size=None):
+        """分块加密 src 并写入 dst，格式与 encrypt_bytes 相同(16字节IV + 密文)
+
+        整个数据使用同一个CBC加密上下文，只有最后一块需要填充，内存占用
+        与数据大小无关。src 可以是文件对象、bytes 或 mmap，返回写入的字节数。
+        """
+        chunk_size = chunk_size or AESCrypto.CHUNK_SIZE
+        if chunk_size % AES.block_size:
+            raise ValueError("chunk_size 必须是16的倍数")
+        cipher = AES.new(AESCrypto.get_machine_key(), AES.MODE_CBC)
+        dst.write(cipher.iv)
+        written = len(cipher.iv)
         
+        tail = b''
+        for chunk in AESCrypto._iter_chunks(src, chunk_size):
+            # 只有最后一块可能不足整数个分组
+            aligned = len(chunk) - len(chunk) % AES.block_size
+            if aligned:
+                dst.write(cipher.encrypt(chunk[:aligned]))
+                written += aligned
+            tail = bytes(chunk[aligned:])
+        
+        # 剩余的数据(可能为空)填充后加密
+        last = cipher.encrypt(pad(tail, AES.block_size))
+        dst.write(last)
+        return written + len(last)
+
+    @staticmethod
+    def decrypt_stream(src, dst, chunk_size=None):
+        """分块解密 encrypt_stream/encrypt_bytes 的结果并写入 dst，返回写入的字节数
+
+        最后一个分组的明文要去掉填充，所以每块解密后先留下最后16字节，
+        后面还有数据时再写出。数据无效时抛出 ValueError(此时 dst 中可能
+        已写入部分明文)。
+        """
+        chunk_size = chunk_size or AESCrypto.CHUNK_SIZE
+        if chunk_size % AES.block_size:
+            raise ValueError("chunk_size 必须是16的倍数")
+        
+        if AESCrypto._is_stream(src):
+            iv = b''
+            while len(iv) < AES.block_size:
+                data = src.read(AES.block_size - len(iv))
+                if not data:
+                    break
+                iv += data
+            return AESCrypto._decrypt_chunks(iv, src, dst, chunk_size)
+        with memoryview(src) as view, view[AES.block_size:] as body:
+            return AESCrypto._decrypt_chunks(bytes(view[:AES.block_size]), body, dst, chunk_size)
+
+    @staticmethod
+    def _decrypt_chunks(iv, body, dst, chunk_size):
+        # 前16字节为IV
+        if len(iv) != AES.block_size:
+            raise ValueError("数据不完整，缺少IV")
+        cipher = AES.new(AESCrypto.get_machine_key(), AES.MODE_CBC, iv)
+        
+        written = 0
+        held = b''
+        for chunk in AESCrypto._iter_chunks(body, chunk_size):
+            # 长度不是16的倍数时抛出 ValueError
+            pt = cipher.decrypt(chunk)
+            dst.write(held)
+            written += len(held)
+            held = pt[-AES.block_size:]
+            dst.write(memoryview(pt)[:-AES.block_size])
+            written += len(pt) - AES.block_size
+        
+        last = unpad(held, AES.block_size)
+        dst.write(last)
+        return written + len(last)
+
+    @staticmethod
+    def _transform_file(transform, file_path, save_path, chunk_size, use_mmap):
+        """用 transform(src, dst, chunk_size) 处理文件，先写临时文件，成功后再替换 save_path"""
+        temp_path = save_path + ".tmp"
+        try:
+            with open(file_path, 'rb') as src, open(temp_path, 'wb') as dst:
+                # 空文件不能 mmap
+                if use_mmap and os.fstat(src.fileno()).st_size > 0:
+                    with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        try:
+                            transform(mapped, dst, chunk_size)
+                        except Exception as e:
+                            # 异常的调用栈还引用着 mmap 的切片，不清除就无法关闭 mmap
+                            traceback.clear_frames(e.__traceback__)
+                            raise
+                else:
+                    transform(src, dst, chunk_size)
+            os.replace(temp_path, save_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def encrypt_file(file_path, save_path=None, chunk_size=None, use_mmap=False):
+        """对整个文件进行加密(分块处理，不把整个文件读入内存)"""
         try:
             if not os.path.exists(file_path):
                 print(f"文件不存在: {file_path}")
@@ -161,22 +312,9 @@ class AESCrypto:
             if save_path is None:
                 save_path = file_path + ".enc"
                 
-            # 读取文件内容
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
-                
-            # 生成密钥
-            machine_info = AESCrypto.get_machine_info()
-            key = hashlib.sha256(machine_info.encode()).digest()[:16]
-            
-            # 加密数据
-            cipher = AES.new(key, AES.MODE_CBC)
-            ct_bytes = cipher.encrypt(pad(file_data, AES.block_size))
-            
             # 保存IV和加密数据
-            with open(save_path, 'wb') as f:
-                f.write(cipher.iv)  # 先写入16字节的IV
-                f.write(ct_bytes)   # 再写入加密数据
+            AESCrypto._transform_file(AESCrypto.encrypt_stream, file_path, save_path,
+                                      chunk_size, use_mmap)
                 
             print(f"文件已加密并保存到: {save_path}")
             return True
@@ -186,10 +324,8 @@ class AESCrypto:
             return False
             
     @staticmethod
-    def decrypt_file(file_path, save_path=None):
-        """解密已加密的文件"""
-        import os
-        
+    def decrypt_file(file_path, save_path=None, chunk_size=None, use_mmap=False):
+        """解密已加密的文件(分块处理，不把整个文件读入内存)"""
         try:
             if not os.path.exists(file_path):
                 print(f"文件不存在: {file_path}")
@@ -202,26 +338,67 @@ class AESCrypto:
                 else:
                     save_path = file_path + ".dec"
                     
-            # 读取文件内容
-            with open(file_path, 'rb') as f:
-                iv = f.read(16)  # 读取前16字节作为IV
-                ct_bytes = f.read()  # 读取剩余部分作为加密数据
-                
-            # 生成密钥
-            machine_info = AESCrypto.get_machine_info()
-            key = hashlib.sha256(machine_info.encode()).digest()[:16]
-            
-            # 解密数据
-            cipher = AES.new(key, AES.MODE_CBC, iv)
-            pt = unpad(cipher.decrypt(ct_bytes), AES.block_size)
-            
-            # 保存解密数据
-            with open(save_path, 'wb') as f:
-                f.write(pt)
+            # 前16字节为IV，解密失败时不会留下不完整的文件
+            AESCrypto._transform_file(AESCrypto.decrypt_stream, file_path, save_path,
+                                      chunk_size, use_mmap)
                 
             print(f"文件已解密并保存到: {save_path}")
             return True
             
         except Exception as e:
             print(f"解密文件时出错: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+
+def _benchmark(size_mb=64):
+    """比较一次性加密和分块加密的吞吐量: python -m utils.aes_crypto [大小MB]"""
+    import time
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        plain_path = os.path.join(temp_dir, "plain.bin")
+        with open(plain_path, 'wb') as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        AESCrypto.get_machine_key()
+        
+        def measure(name, func):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            print(f"{name:<16}{elapsed * 1000:>9.1f} ms{size_mb / elapsed:>9.1f} MB/s")
+        
+        enc_path = os.path.join(temp_dir, "plain.bin.enc")
+        out_path = os.path.join(temp_dir, "out.bin")
+        
+        def encrypt_in_memory():
+            with open(plain_path, 'rb') as f:
+                data = AESCrypto.encrypt_bytes(f.read())
+            with open(enc_path, 'wb') as f:
+                f.write(data)
+        
+        def decrypt_in_memory():
+            with open(enc_path, 'rb') as f:
+                data = AESCrypto.decrypt_bytes(f.read())
+            with open(out_path, 'wb') as f:
+                f.write(data)
+        
+        print(f"数据大小: {size_mb} MB，分块大小: {AESCrypto.CHUNK_SIZE // 1024} KB")
+        measure("一次性加密", encrypt_in_memory)
+        measure("一次性解密", decrypt_in_memory)
+        measure("分块加密", lambda: AESCrypto._transform_file(
+            AESCrypto.encrypt_stream, plain_path, enc_path, None, False))
+        measure("分块解密", lambda: AESCrypto._transform_file(
+            AESCrypto.decrypt_stream, enc_path, out_path, None, False))
+        measure("分块加密(mmap)", lambda: AESCrypto._transform_file(
+            AESCrypto.encrypt_stream, plain_path, enc_path, None, True))
+        measure("分块解密(mmap)", lambda: AESCrypto._transform_file(
+            AESCrypto.decrypt_stream, enc_path, out_path, None, True))
+        
+        with open(plain_path, 'rb') as a, open(out_path, 'rb') as b:
+            print("解密结果一致" if a.read() == b.read() else "解密结果不一致!")
+
+
+if __name__ == "__main__":
+    import sys
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 64)
\ No newline at end of file
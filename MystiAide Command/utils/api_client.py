@@ -0,0 +1,250 @@
+# viqu.com 接口的统一客户端：共用连接池、超时、重试和熔断，并经请求调度器排队
+import os
+import time
+import socket
+import threading
+import urllib.parse
+from collections import namedtuple
+from functools import partial
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.request_scheduler import get_scheduler, RequestCancelled, INTERACTIVE, BACKGROUND
+from utils.circuit_breaker import CircuitBreaker, BudgetExceeded, CLOSED
+
+DEFAULT_BASE_URL = "https://www.viqu.com/MystiAide"
+BASE_URL_ENV = "MYSTIAIDE_BASE_URL"  # 设置后改用该地址(如本地测试服务器)
+
+# 已读取完的响应；不可变，合并的请求可以共用
+ApiResponse = namedtuple("ApiResponse", ["status_code", "text"])
+
+
+def abort_response(response):
+    """从其他线程中断一个正在读取的响应
+
+    直接关闭响应会等待读取线程释放连接，因此这里只关闭底层套接字的读写，
+    阻塞中的读取随即返回，由读取线程自己关闭响应。
+    """
+    raw = getattr(response, "raw", None)
+    sock = getattr(getattr(raw, "connection", None), "sock", None)
+    if sock is None:
+        # 开始读取正文后套接字只挂在 http.client 的响应对象上
+        fp = getattr(getattr(raw, "_fp", None), "fp", None)
+        sock = getattr(getattr(fp, "raw", None), "_sock", None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class ApiClient:
+    """MystiAide 服务器接口
+
+    所有请求共用一个保持连接的 Session，默认带超时，响应接受 gzip 压缩。
+    每个接口(目录、命令库详情、账号、上传)有自己的熔断器：服务器连续失败
+    或明显变慢时，后续请求立即抛出 CircuitOpenError，调用方改用缓存或
+    离线数据，服务器在后台探测恢复后自动重新启用。
+
+    连接失败和 5xx 错误会退避重试，但注册、登录和上传请求只在连接超时
+    (请求肯定没有发出)时重试，避免重复提交。传入 budget(TimeBudget)时，
+    所有重试加起来不超过该时间。传入 cancel_token 的请求在取消时会立即
+    中断连接、停止读取并抛出 RequestCancelled。
+    """
+
+    TIMEOUT = (5, 10)          # (连接超时, 读取超时)
+    CATALOG_TIMEOUT = (5, 15)
+    PROBE_TIMEOUT = (3, 5)
+    POOL_SIZE = 8
+    READ_CHUNK = 16 * 1024
+    RETRIES = 2
+    BACKOFF = 0.3              # 秒，每次重试加倍
+
+    def __init__(self, base_url=None):
+        self.base_url = (base_url or os.environ.get(BASE_URL_ENV) or DEFAULT_BASE_URL).rstrip('/')
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "User-Agent": "MystiAide-Desktop",
+        })
+        # 重试由 _open 按熔断器和时间预算控制，连接池本身不重试
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.POOL_SIZE, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        probe_urls = {
+            "catalog": self.catalog_url(),
+            "library": self.url("cls/"),
+            "account": self.url("normal_user/getid.php"),
+            "upload": self.url("wi/upload.php"),
+        }
+        self.breakers = {name: CircuitBreaker(name, partial(self._probe, url))
+                         for name, url in probe_urls.items()}
+
+    def url(self, path):
+        return f"{self.base_url}/{path}"
+
+    def catalog_url(self):
+        return self.url("cls/dir.php")
+
+    def library_file_url(self, list_name, filename):
+        """返回命令库目录下指定文件的地址"""
+        return self.url(f"cls/{urllib.parse.quote(list_name)}/{filename}")
+
+    def is_available(self, endpoint):
+        """接口当前是否可用(未熔断)"""
+        return self.breakers[endpoint].state == CLOSED
+
+    def _probe(self, url):
+        """熔断期间的后台探测：服务器有回应且不是网关或过载错误即视为恢复
+
+        不支持 HEAD 的服务器会回应 501，同样说明服务器在线。
+        """
+        def head():
+            return self.session.head(url, timeout=self.PROBE_TIMEOUT, allow_redirects=False).status_code
+
+        return get_scheduler().request(url, head, BACKGROUND) not in (500, 502, 503, 504)
+
+    def _open(self, method, url, endpoint, idempotent=True, budget=None, cancel_token=None,
+              timeout=None, **kwargs):
+        """发送请求直到收到响应头，返回还未读取正文的 Response
+
+        失败时按退避时间重试，每次发送前检查熔断器、时间预算和取消标记。
+        """
+        breaker = self.breakers[endpoint]
+        timeout = timeout or self.TIMEOUT
+        attempt = 0
+        while True:
+            breaker.before_request()
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, stream=True,
+                                                timeout=budget.clip(timeout) if budget else timeout, **kwargs)
+            except BudgetExceeded:
+                raise
+            except requests.RequestException as e:
+                if cancel_token is not None and cancel_token.is_cancelled():
+                    raise RequestCancelled()
+                breaker.record_failure()
+                retriable = idempotent or isinstance(e, requests.ConnectTimeout)
+                if not retriable or attempt >= self.RETRIES:
+                    raise
+            else:
+                if response.status_code < 500:
+                    breaker.record_success(time.monotonic() - started)
+                    return response
+                breaker.record_failure()
+                if not idempotent or attempt >= self.RETRIES:
+                    return response
+                response.close()
+
+            attempt += 1
+            delay = self.BACKOFF * 2 ** (attempt - 1)
+            if budget is not None and budget.remaining() <= delay:
+                raise BudgetExceeded(f"操作超过 {budget.seconds} 秒未完成")
+            if cancel_token is not None:
+                if cancel_token.wait(delay):
+                    raise RequestCancelled()
+            else:
+                time.sleep(delay)
+
+    def _send(self, method, url, endpoint, priority=INTERACTIVE, coalesce=False, idempotent=True,
+              budget=None, cancel_token=None, **kwargs):
+        """经请求调度器发送请求并读取完整正文，返回 ApiResponse"""
+        def send():
+            response = self._open(method, url, endpoint, idempotent, budget, cancel_token, **kwargs)
+            abort = partial(abort_response, response)
+            if cancel_token is not None:
+                cancel_token.add_callback(abort)
+            try:
+                return ApiResponse(response.status_code, self._read_text(response, cancel_token, budget))
+            except requests.RequestException:
+                self.breakers[endpoint].record_failure()
+                raise
+            finally:
+                if cancel_token is not None:
+                    cancel_token.remove_callback(abort)
+                response.close()
+
+        key = (method, url, tuple(sorted((kwargs.get("params") or {}).items()))) if coalesce else None
+        return get_scheduler().request(url, send, priority, key=key, cancel_token=cancel_token)
+
+    def _read_text(self, response, cancel_token, budget=None):
+        """分块读取响应正文，每块之间检查是否已取消或超出时间预算"""
+        chunks = []
+        try:
+            for chunk in response.iter_content(self.READ_CHUNK):
+                if cancel_token is not None and cancel_token.is_cancelled():
+                    raise RequestCancelled()
+                if budget is not None and budget.expired():
+                    raise BudgetExceeded(f"操作超过 {budget.seconds} 秒未完成")
+                chunks.append(chunk)
+        except (RequestCancelled, BudgetExceeded):
+            raise
+        except Exception:
+            # 连接被取消回调中断时，读取会以各种异常结束
+            if cancel_token is not None and cancel_token.is_cancelled():
+                raise RequestCancelled()
+            raise
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        return b"".join(chunks).decode('utf-8', errors='replace')
+
+    def open_catalog(self, headers=None, budget=None, cancel_token=None):
+        """以流式方式请求命令库目录(dir.php)，返回未读取的 requests.Response
+
+        budget 只限制收到响应头之前的时间，正文可以慢慢读取。调用方负责
+        关闭响应(取消时用 abort_response 中断)，并应在读取期间用调度器的
+        slot() 占用连接名额；读取正文失败时调用 catalog_failed()。
+        """
+        return self._open("GET", self.catalog_url(), "catalog", budget=budget, cancel_token=cancel_token,
+                          headers=headers or {}, timeout=self.CATALOG_TIMEOUT)
+
+    def catalog_failed(self):
+        """记录一次目录正文读取失败"""
+        self.breakers["catalog"].record_failure()
+
+    def library_file(self, list_name, filename, priority=INTERACTIVE, cancel_token=None, timeout=None,
+                     budget=None):
+        """获取命令库的 main.xml 或 list.xml"""
+        return self._send("GET", self.library_file_url(list_name, filename), "library", priority,
+                          coalesce=True, budget=budget, cancel_token=cancel_token, timeout=timeout or self.TIMEOUT)
+
+    def library_main(self, list_name, priority=INTERACTIVE, cancel_token=None, budget=None):
+        return self.library_file(list_name, "main.xml", priority, cancel_token, budget=budget)
+
+    def library_list(self, list_name, priority=INTERACTIVE, cancel_token=None, budget=None):
+        return self.library_file(list_name, "list.xml", priority, cancel_token, budget=budget)
+
+    def sign(self, action, username, password, priority=INTERACTIVE, budget=None, cancel_token=None):
+        """登录(action="sign")或注册(action="create")，返回服务器的原始回复"""
+        params = {"type": action, "name": username, "data": password, "id": 1}
+        return self._send("GET", self.url("normal_user/sign.php"), "account", priority, idempotent=False,
+                          budget=budget, cancel_token=cancel_token, params=params)
+
+    def get_user_id(self, username, priority=INTERACTIVE, budget=None, cancel_token=None):
+        """获取用户ID"""
+        return self._send("GET", self.url("normal_user/getid.php"), "account", priority, coalesce=True,
+                          budget=budget, cancel_token=cancel_token, params={"name": username})
+
+    def upload(self, data, priority=INTERACTIVE, budget=None, cancel_token=None):
+        """上传命令库"""
+        return self._send("POST", self.url("wi/upload.php"), "upload", priority, idempotent=False,
+                          budget=budget, cancel_token=cancel_token, data=data)
+
+
+_api_client = None
+_api_client_lock = threading.Lock()
+
+
+def get_api_client():
+    """返回进程内共享的接口客户端"""
+    global _api_client
+    with _api_client_lock:
+        if _api_client is None:
+            _api_client = ApiClient()
+        return _api_client
@@ -0,0 +1,393 @@
+# 命令库目录(dir.php)的解析工具
+import codecs
+from array import array
+from bisect import bisect_left
+
+
+def parse_catalog_line(line):
+    """解析目录中的一行，返回 (名称, 描述)，空行返回None"""
+    if not line.strip():
+        return None
+    parts = line.split('≈')
+    name = parts[0].strip()
+    desc = parts[1].strip() if len(parts) > 1 else ""
+    return name, desc
+
+
+def parse_catalog_text(text):
+    """解析完整的目录文本，返回 (名称, 描述) 列表"""
+    rows = []
+    for line in text.split('\n'):
+        row = parse_catalog_line(line)
+        if row:
+            rows.append(row)
+    return rows
+
+
+def make_full_name(name, desc):
+    """拼接命令库完整名称，与服务器上的目录名一致"""
+    return f"{name}≈{desc}" if desc else name
+
+
+class CatalogStreamParser:
+    """流式解析目录内容：按块输入原始字节，返回已完整接收的行
+
+    只保留最后一个未结束的行和UTF-8解码器中未完成的字节，
+    因此内存占用与目录总大小无关。
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._tail = ""
+
+    def feed(self, data):
+        """输入一块字节，返回其中已完整的 (名称, 描述) 行"""
+        text = self._tail + self._decoder.decode(data)
+        lines = text.split('\n')
+        self._tail = lines.pop()
+        return self._parse_lines(lines)
+
+    def close(self):
+        """输入结束，返回剩余的最后一行"""
+        text = self._tail + self._decoder.decode(b"", final=True)
+        self._tail = ""
+        return self._parse_lines([text])
+
+    @staticmethod
+    def _parse_lines(lines):
+        rows = []
+        for line in lines:
+            row = parse_catalog_line(line)
+            if row:
+                rows.append(row)
+        return rows
+
+
+class TextColumn:
+    """把大量短字符串拼接存放在一个共享缓冲区中，按偏移读取
+
+    相比每行一个字符串对象，省去了每个对象的头部开销；读取时才切片生成字符串。
+    """
+
+    def __init__(self, texts=()):
+        self._buffer = ""
+        self._pending = []       # 尚未并入缓冲区的字符串
+        self._ends = array('I')  # 每个字符串在缓冲区中的结束位置
+        self.extend(texts)
+
+    def __len__(self):
+        return len(self._ends)
+
+    def extend(self, texts):
+        ends = self._ends
+        end = ends[-1] if ends else 0
+        for text in texts:
+            self._pending.append(text)
+            end += len(text)
+            ends.append(end)
+
+    def flush(self):
+        """把尚未并入的字符串并入缓冲区，释放它们各自的字符串对象"""
+        if self._pending:
+            self._buffer += "".join(self._pending)
+            self._pending = []
+
+    def replace_range(self, start, stop, texts):
+        """用 texts 替换第 start 到 stop(不含) 个字符串，用于插入和删除"""
+        self.flush()
+        ends = self._ends
+        char_start = ends[start - 1] if start else 0
+        char_stop = ends[stop - 1] if stop else 0
+        inserted = "".join(texts)
+        self._buffer = self._buffer[:char_start] + inserted + self._buffer[char_stop:]
+
+        new_ends = array('I')
+        end = char_start
+        for text in texts:
+            end += len(text)
+            new_ends.append(end)
+        shift = len(inserted) - (char_stop - char_start)
+        if shift:
+            tail = array('I', (e + shift for e in ends[stop:]))
+        else:
+            tail = ends[stop:]
+        self._ends = ends[:start] + new_ends + tail
+
+    def __getitem__(self, i):
+        self.flush()
+        ends = self._ends
+        return self._buffer[(ends[i - 1] if i else 0):ends[i]]
+
+    def __iter__(self):
+        self.flush()
+        start = 0
+        for end in self._ends:
+            yield self._buffer[start:end]
+            start = end
+
+    def rows_containing(self, rows, text):
+        """返回 rows(递增的编号)中包含子串 text 的字符串编号"""
+        self.flush()
+        buffer = self._buffer
+        ends = self._ends
+        # 第一个编号可能是0(从缓冲区开头开始)，单独处理，之后的编号不必再判断
+        rows = iter(rows)
+        first = next(rows, None)
+        result = []
+        if first is not None and text in buffer[(ends[first - 1] if first else 0):ends[first]]:
+            result.append(first)
+        result += [row for row in rows if text in buffer[ends[row - 1]:ends[row]]]
+        return result
+
+
+class CatalogStore:
+    """紧凑的目录行存储
+
+    名称存放在共享缓冲区中；描述(通常是"作者@id"，大量重复)去重后只保存一份，
+    每行只记录编号。完整名称(名称≈描述)在需要时再拼接。
+    """
+
+    def __init__(self, rows=()):
+        self._names = TextColumn()
+        self._desc_ids = array('I')
+        self._desc_pool = []    # 去重后的描述
+        self._desc_lookup = {}  # 描述 -> 编号
+        self.extend(rows)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __iter__(self):
+        pool = self._desc_pool
+        for name, desc_id in zip(self._names, self._desc_ids):
+            yield name, pool[desc_id]
+
+    def extend(self, rows):
+        """追加 (名称, 描述) 行"""
+        names = []
+        lookup = self._desc_lookup
+        for name, desc in rows:
+            names.append(name)
+            desc_id = lookup.get(desc)
+            if desc_id is None:
+                desc_id = lookup[desc] = len(self._desc_pool)
+                self._desc_pool.append(desc)
+            self._desc_ids.append(desc_id)
+        self._names.extend(names)
+
+    def replace_range(self, start, stop, rows):
+        """用 rows 替换第 start 到 stop(不含) 行，用于增量同步时的插入和删除"""
+        names = []
+        desc_ids = array('I')
+        lookup = self._desc_lookup
+        for name, desc in rows:
+            names.append(name)
+            desc_id = lookup.get(desc)
+            if desc_id is None:
+                desc_id = lookup[desc] = len(self._desc_pool)
+                self._desc_pool.append(desc)
+            desc_ids.append(desc_id)
+        self._names.replace_range(start, stop, names)
+        self._desc_ids[start:stop] = desc_ids
+
+    def name(self, row):
+        return self._names[row]
+
+    def desc(self, row):
+        return self._desc_pool[self._desc_ids[row]]
+
+    def row(self, row):
+        return self.name(row), self.desc(row)
+
+    def full_name(self, row):
+        return make_full_name(self.name(row), self.desc(row))
+
+
+class CatalogRowList(list):
+    """以普通列表保存的 (名称, 描述) 行，读取接口与 CatalogStore 相同
+
+    增量更新时临时使用：每次插入、删除和移动都只是列表操作，
+    不必为每一段变化重新拼接 CatalogStore 的共享缓冲区。
+    """
+
+    def name(self, row):
+        return self[row][0]
+
+    def desc(self, row):
+        return self[row][1]
+
+    def row(self, row):
+        return self[row]
+
+    def full_name(self, row):
+        return make_full_name(*self[row])
+
+    def replace_range(self, start, stop, rows):
+        self[start:stop] = rows
+
+    def move_rows(self, first, count, dest):
+        """把从 first 开始的 count 行移动到第 dest 行(移动前的行号)之前"""
+        _move_block(self, first, count, dest)
+
+
+def _move_block(items, first, count, dest):
+    """把列表中从 first 开始的 count 项移动到第 dest 项(移动前的位置)之前"""
+    block = items[first:first + count]
+    del items[first:first + count]
+    if dest > first:
+        dest -= count
+    items[dest:dest] = block
+
+
+class CatalogDelta:
+    """两份目录之间的差异
+
+    行以名称区分，同名的行按出现顺序一一对应。依次按 removed(旧目录中被删除的
+    行号，递增)删除、按 moves 移动保留的行、按 inserted(新目录中新增的
+    (行号, 行)，按行号递增)插入，再按 changed(名称不变而描述改变的 (新行号, 行))
+    就地更新，即可得到新目录。
+
+    order 为保留的行在新目录中的顺序(第 j 个保留行原来是删除之后的第 order[j] 行)，
+    顺序不变时为None；需要移动的行太多时 moves 为None，此时按 order 一次调整布局。
+    """
+
+    def __init__(self, removed=(), inserted=(), changed=(), order=None, moves=()):
+        self.removed = list(removed)
+        self.inserted = list(inserted)
+        self.changed = list(changed)
+        self.order = order
+        self.moves = moves if moves is None else list(moves)
+
+    def is_empty(self):
+        return not self.removed and not self.inserted and not self.changed and self.order is None
+
+    def removed_ranges(self):
+        """把删除的行号合并为连续区间 (起始, 数量)，从后往前排列，便于依次删除"""
+        return list(reversed(_group_runs(self.removed)))
+
+    def inserted_ranges(self):
+        """把新增的行合并为连续区间 (起始, 行列表)，从前往后排列，便于依次插入"""
+        return _group_rows(self.inserted)
+
+    def changed_ranges(self):
+        """把描述改变的行合并为连续区间 (起始, 行列表)"""
+        return _group_rows(self.changed)
+
+
+def _group_runs(numbers):
+    """把递增的整数序列合并为 (起始, 数量) 区间"""
+    runs = []
+    for number in numbers:
+        if runs and runs[-1][0] + runs[-1][1] == number:
+            runs[-1][1] += 1
+        else:
+            runs.append([number, 1])
+    return [(start, count) for start, count in runs]
+
+
+def _group_rows(numbered_rows):
+    """把按行号递增的 (行号, 行) 合并为连续区间 (起始, 行列表)"""
+    ranges = []
+    for row, item in numbered_rows:
+        if ranges and ranges[-1][0] + len(ranges[-1][1]) == row:
+            ranges[-1][1].append(item)
+        else:
+            ranges.append((row, [item]))
+    return ranges
+
+
+MAX_MOVED_ROWS = 1000  # 需要移动的行超过这个数量时改为一次调整布局
+
+
+def _row_keys(rows):
+    """行的标识：名称和它在同名行中的序号"""
+    seen = {}
+    keys = []
+    for name, desc in rows:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        keys.append((name, count))
+    return keys
+
+
+def diff_catalog(old_rows, new_rows):
+    """在客户端比较新旧两份目录，返回 CatalogDelta
+
+    行以名称区分：名称相同而描述改变的行记为更新，不再删除后重新插入；
+    保留的行顺序变化时记为移动。
+    """
+    new_lookup = {key: row for row, key in enumerate(_row_keys(new_rows))}
+    removed = []
+    changed = []
+    kept = array('I')  # 保留的行(按旧顺序)在新目录中的行号
+    for row, key in enumerate(_row_keys(old_rows)):
+        new_row = new_lookup.pop(key, None)
+        if new_row is None:
+            removed.append(row)
+            continue
+        kept.append(new_row)
+        if new_rows[new_row][1] != old_rows[row][1]:
+            changed.append((new_row, new_rows[new_row]))
+    changed.sort()
+    inserted = [(row, new_rows[row]) for row in sorted(new_lookup.values())]
+
+    order = None
+    moves = ()
+    if any(a > b for a, b in zip(kept, kept[1:])):
+        order = sorted(range(len(kept)), key=kept.__getitem__)
+        moves = plan_moves(order, MAX_MOVED_ROWS)
+    return CatalogDelta(removed, inserted, changed, order, moves)
+
+
+def plan_moves(order, limit=None):
+    """把保留行的重新排列拆成依次执行的移动，返回 [(起始, 数量, 目标)]
+
+    order[j] 为新顺序中第 j 行原来的位置。最长递增子序列中的行保持不动，
+    其余的行按新顺序逐个移动到前一行之后，当前相邻的行一起移动。目标与
+    QAbstractItemModel.beginMoveRows 的 destinationChild 一样，是移动前的行号。
+    需要移动的行超过 limit 时返回None。
+    """
+    staying = _longest_increasing(order)
+    if limit is not None and len(order) - len(staying) > limit:
+        return None
+
+    current = list(range(len(order)))
+    moves = []
+    j = 0
+    while j < len(order):
+        if order[j] in staying:
+            j += 1
+            continue
+        first = current.index(order[j])
+        count = 1
+        while (j + count < len(order) and order[j + count] not in staying
+               and first + count < len(current) and current[first + count] == order[j + count]):
+            count += 1
+        dest = current.index(order[j - 1]) + 1 if j else 0
+        if not first <= dest <= first + count:
+            moves.append((first, count, dest))
+            _move_block(current, first, count, dest)
+        j += count
+    return moves
+
+
+def _longest_increasing(numbers):
+    """返回 numbers 的一个最长递增子序列中的数字集合"""
+    tails = []        # tails[k]: 长度为 k+1 的递增子序列中最小的结尾
+    tail_indexes = []
+    parents = []
+    for i, number in enumerate(numbers):
+        k = bisect_left(tails, number)
+        parents.append(tail_indexes[k - 1] if k else -1)
+        if k == len(tails):
+            tails.append(number)
+            tail_indexes.append(i)
+        else:
+            tails[k] = number
+            tail_indexes[k] = i
+    result = set()
+    i = tail_indexes[-1] if tail_indexes else -1
+    while i >= 0:
+        result.add(numbers[i])
+        i = parents[i]
+    return result
@@ -0,0 +1,135 @@
+# 命令库目录的本地磁盘缓存
+import os
+import json
+import time
+
+
+def get_cache_dir(*parts):
+    """获取本地缓存目录(不存在时自动创建)"""
+    app_data = os.environ.get('APPDATA', os.path.expanduser('~'))
+    cache_dir = os.path.join(app_data, "MystiAide", "cache", *parts)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def atomic_write(path, data):
+    """先写临时文件再重命名，避免中途退出留下损坏的文件"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+class CatalogCache:
+    """保存 dir.php 的原始内容及其 ETag / Last-Modified，用于条件请求和离线浏览"""
+
+    BODY_FILE = "catalog.dat"
+    META_FILE = "catalog.json"
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or get_cache_dir()
+        self.body_path = os.path.join(self.cache_dir, self.BODY_FILE)
+        self.meta_path = os.path.join(self.cache_dir, self.META_FILE)
+
+    def load_meta(self):
+        """读取缓存的元数据，没有缓存时返回空字典"""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def has_body(self):
+        return os.path.exists(self.body_path) and bool(self.load_meta())
+
+    def iter_body(self, chunk_size=64 * 1024):
+        """按块读取缓存的目录内容"""
+        with open(self.body_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def open_writer(self):
+        """开始边下载边写入新的目录内容，完成后调用 commit()"""
+        return CatalogCacheWriter(self)
+
+    def conditional_headers(self):
+        """根据缓存的校验信息生成条件请求头"""
+        if not self.has_body():
+            return {}
+        meta = self.load_meta()
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def _save_validators(self, etag, last_modified):
+        self._save_meta({
+            "etag": etag,
+            "last_modified": last_modified,
+            "saved_at": time.time(),
+            "checked_at": time.time(),
+        })
+
+    def mark_checked(self):
+        """服务器返回304时记录最近一次确认的时间"""
+        meta = self.load_meta()
+        if meta:
+            meta["checked_at"] = time.time()
+            try:
+                self._save_meta(meta)
+            except OSError as e:
+                print(f"更新目录缓存时出错: {str(e)}")
+
+    def _save_meta(self, meta):
+        atomic_write(self.meta_path, json.dumps(meta).encode('utf-8'))
+
+
+class CatalogCacheWriter:
+    """边下载边写入缓存的临时文件，只有完整接收后才替换原有缓存"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.temp_path = f"{cache.body_path}.part"
+        self._file = None
+        try:
+            self._file = open(self.temp_path, 'wb')
+        except OSError as e:
+            print(f"无法写入目录缓存: {str(e)}")
+
+    def write(self, chunk):
+        if self._file is not None:
+            try:
+                self._file.write(chunk)
+            except OSError as e:
+                print(f"写入目录缓存时出错: {str(e)}")
+                self.abort()
+
+    def commit(self, etag=None, last_modified=None):
+        """下载完成，替换缓存并保存校验信息"""
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+            self._file = None
+            os.replace(self.temp_path, self.cache.body_path)
+            self.cache._save_validators(etag, last_modified)
+        except OSError as e:
+            print(f"保存目录缓存时出错: {str(e)}")
+
+    def abort(self):
+        """下载中断，丢弃临时文件"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
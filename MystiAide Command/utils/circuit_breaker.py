@@ -0,0 +1,131 @@
+# 服务器接口的熔断器和时间预算
+import time
+import threading
+
+import requests
+
+CLOSED = "closed"        # 正常
+OPEN = "open"            # 熔断：请求直接失败，后台定期探测
+HALF_OPEN = "half_open"  # 正在探测
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """熔断期间的请求直接失败，按无法连接处理(使用缓存或离线数据)"""
+
+
+class BudgetExceeded(requests.Timeout):
+    """操作用完了时间预算"""
+
+
+class TimeBudget:
+    """一次面向用户的操作(可能包含多个请求和重试)的总时间上限"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def clip(self, timeout):
+        """把 (连接超时, 读取超时) 缩短到不超过剩余时间；已用完时抛出 BudgetExceeded"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise BudgetExceeded(f"操作超过 {self.seconds} 秒未完成")
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        return min(connect, remaining), min(read, remaining)
+
+
+class CircuitBreaker:
+    """一个接口的熔断器
+
+    连续失败达到 FAILURE_THRESHOLD 次，或平均响应时间(EWMA)超过
+    SLOW_SECONDS 时进入熔断状态：之后的请求立即抛出 CircuitOpenError，
+    界面可以马上改用缓存，而不必逐个等待超时。熔断期间在后台调用
+    probe() 探测服务器，成功后恢复；失败则加倍等待时间后再探测。
+    """
+
+    FAILURE_THRESHOLD = 3
+    SLOW_SECONDS = 6.0
+    EWMA_ALPHA = 0.3
+    OPEN_SECONDS = 10.0
+    MAX_OPEN_SECONDS = 120.0
+
+    def __init__(self, name, probe):
+        self.name = name
+        self.probe = probe
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._latency = None    # 成功请求的平均响应时间(秒)
+        self._open_seconds = self.OPEN_SECONDS
+        self._timer = None
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def latency(self):
+        return self._latency
+
+    def before_request(self):
+        """发送请求前调用，熔断期间抛出 CircuitOpenError"""
+        if self._state != CLOSED:
+            raise CircuitOpenError(f"服务器暂时不可用({self.name})，稍后会自动重试")
+
+    def record_success(self, elapsed):
+        with self._lock:
+            self._failures = 0
+            if self._latency is None:
+                self._latency = elapsed
+            else:
+                self._latency += self.EWMA_ALPHA * (elapsed - self._latency)
+            if self._latency > self.SLOW_SECONDS:
+                self._trip("响应过慢")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.FAILURE_THRESHOLD:
+                self._trip("连续失败")
+
+    def _trip(self, reason):
+        """进入熔断状态并安排后台探测(调用时已持有锁)"""
+        if self._state == HALF_OPEN:
+            return  # 由正在进行的探测决定
+        if self._state == CLOSED:
+            print(f"接口 {self.name} 暂停使用({reason})，{self._open_seconds:.0f} 秒后探测")
+        self._state = OPEN
+        self._schedule_probe()
+
+    def _schedule_probe(self):
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(self._open_seconds, self._run_probe)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run_probe(self):
+        with self._lock:
+            self._timer = None
+            self._state = HALF_OPEN
+        started = time.monotonic()
+        try:
+            healthy = self.probe()
+        except Exception:
+            healthy = False
+        with self._lock:
+            if healthy:
+                self._state = CLOSED
+                self._failures = 0
+                self._latency = time.monotonic() - started
+                self._open_seconds = self.OPEN_SECONDS
+                print(f"接口 {self.name} 已恢复")
+            else:
+                self._state = OPEN
+                self._open_seconds = min(self._open_seconds * 2, self.MAX_OPEN_SECONDS)
+                self._schedule_probe()
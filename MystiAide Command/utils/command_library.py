@@ -0,0 +1,28 @@
+# 命令库详情(main.xml / list.xml)的解析工具
+import re
+
+
+def parse_main_xml(content):
+    """解析 main.xml，返回 (描述, 作者)，缺失的字段为None"""
+    des_match = re.search(r'<des>(.*?)</des>', content)
+    r_match = re.search(r'<r>(.*?)</r>', content)
+    desc = des_match.group(1) if des_match else None
+    author = r_match.group(1) if r_match else None
+    return desc, author
+
+
+def parse_command_list(content):
+    """解析 list.xml，返回 [{'command': ..., 'description': ...}, ...]"""
+    commands = []
+    for item in content.split('∅'):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.split('---')
+        command = parts[0].strip()
+        description = parts[1].strip() if len(parts) > 1 else ""
+        commands.append({
+            'command': command,
+            'description': description
+        })
+    return commands
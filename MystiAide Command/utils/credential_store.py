@@ -0,0 +1,143 @@
+# 保存的登录状态(加密保存在本地)
+import os
+import json
+import time
+import threading
+
+from utils.aes_crypto import AESCrypto
+from utils.catalog_cache import atomic_write
+from utils.machine_id import get_machine_hash
+
+
+def get_secure_config_dir():
+    """获取安全的配置目录"""
+    # 使用AppData目录下的隐藏文件夹
+    app_data = os.environ.get('APPDATA', os.path.expanduser('~'))
+    # 创建一个看起来像系统目录的路径
+    config_dir = os.path.join(app_data, "Microsoft", "Credentials", "SystemData")
+    os.makedirs(config_dir, exist_ok=True)
+    return config_dir
+
+
+def get_secure_login_file_path(config_dir=None):
+    """获取安全的登录文件路径，使用不明显的文件名"""
+    # 使用机器信息的哈希作为文件名的一部分，看起来像系统文件的名称
+    filename = f"CredentialCache_{get_machine_hash()}.dat"
+    return os.path.join(config_dir or get_secure_config_dir(), filename)
+
+
+class CredentialStore:
+    """登录状态 {"username", "user_id", "timestamp"} 的加密存储
+
+    文件格式不变：登录数据先用 AESCrypto.encrypt_login_data 加密成 JSON，
+    整个 JSON 再按 encrypt_file 的格式(16字节IV + 密文)加密。两层加密都在
+    内存中完成，不再经过临时的明文文件，保存时只写一次文件再重命名。
+    读取或保存过的登录状态保留在内存中，进程内之后的读取不再访问磁盘。
+    文件名和密钥都来自机器信息，机器信息的缓存失效(invalidate_machine_info)
+    并且变化后，下次读取按新的文件名重新读取。
+    """
+
+    MAX_AGE = 7 * 24 * 3600  # 秒，登录状态的有效期
+
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._loaded_for = None  # 内存中的登录状态对应的机器信息哈希，None表示还没有读取
+        self._session = None
+
+    @property
+    def path(self):
+        # 不缓存：机器信息的哈希本身已缓存，且失效后文件名要随之改变
+        return self._path or get_secure_login_file_path()
+
+    def load(self):
+        """返回保存的登录状态，没有、已过期或无法解密时返回None(并删除无效的文件)"""
+        with self._lock:
+            machine_hash = get_machine_hash()
+            if self._loaded_for != machine_hash:
+                self._session = self._read()
+                self._loaded_for = machine_hash
+            return dict(self._session) if self._session else None
+
+    def _read(self):
+        try:
+            with open(self.path, 'rb') as f:
+                encrypted = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"读取登录状态时出错: {str(e)}")
+            return None
+
+        try:
+            encrypted_data = json.loads(AESCrypto.decrypt_bytes(encrypted).decode('utf-8'))
+        except (ValueError, KeyError) as e:
+            print(f"解密登录文件失败: {str(e)}")
+            return None
+
+        # 解密内部数据
+        login_data = AESCrypto.decrypt_login_data(encrypted_data)
+        if not login_data:
+            self._remove_file()
+            return None
+        if "username" not in login_data or "user_id" not in login_data:
+            print("登录数据不完整")
+            self._remove_file()
+            return None
+        if "timestamp" in login_data and time.time() - login_data["timestamp"] > self.MAX_AGE:
+            print("登录状态已过期")
+            self._remove_file()
+            return None
+        return login_data
+
+    def save(self, username, user_id):
+        """加密并保存登录状态，返回是否成功"""
+        login_data = {
+            "username": username,
+            "user_id": user_id,
+            "timestamp": time.time()
+        }
+        encrypted_data = AESCrypto.encrypt_login_data(login_data)
+        if not encrypted_data:
+            print("加密登录数据失败")
+            return False
+        try:
+            encrypted = AESCrypto.encrypt_bytes(json.dumps(encrypted_data).encode('utf-8'))
+            with self._lock:
+                atomic_write(self.path, encrypted)
+                self._session = login_data
+                self._loaded_for = get_machine_hash()
+        except Exception as e:
+            print(f"保存登录状态时出错: {str(e)}")
+            return False
+        print("双重加密的登录状态已保存")
+        return True
+
+    def clear(self):
+        """删除保存的登录状态"""
+        with self._lock:
+            self._session = None
+            self._loaded_for = get_machine_hash()
+            self._remove_file()
+
+    def _remove_file(self):
+        try:
+            os.remove(self.path)
+            print("已清除登录状态")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"清除登录状态时出错: {str(e)}")
+
+
+_credential_store = None
+_credential_store_lock = threading.Lock()
+
+
+def get_credential_store():
+    """返回进程内共享的登录状态存储"""
+    global _credential_store
+    with _credential_store_lock:
+        if _credential_store is None:
+            _credential_store = CredentialStore()
+        return _credential_store
@@ -0,0 +1,181 @@
+# 命令库详情的两级缓存(内存LRU + 磁盘)
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from utils.catalog_cache import get_cache_dir, atomic_write
+
+
+class LibraryDetailCache:
+    """按命令库名称(list_name)缓存 main.xml 和 list.xml 的内容
+
+    前面是有数量和字节上限的内存LRU，后面是有总大小上限的磁盘存储，
+    磁盘文件按最近访问时间淘汰。所有方法都可以在后台线程中调用；
+    put() 要写磁盘，只在后台线程中调用。
+    """
+
+    MAX_MEMORY_ENTRIES = 64
+    MAX_MEMORY_BYTES = 8 * 1024 * 1024
+    MAX_DISK_ENTRIES = 2000
+    MAX_DISK_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or get_cache_dir("details")
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # 依次执行 put()，合并和写文件不会交错
+        self._memory = OrderedDict()  # list_name -> (entry, 字节数)
+        self._memory_bytes = 0
+        self._disk_sizes = None       # 文件路径 -> 字节数，首次写入时才扫描目录
+
+    def _path(self, list_name):
+        digest = hashlib.md5(list_name.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    @staticmethod
+    def _entry_size(entry):
+        return sum(len(entry.get(part) or "") * 3 for part in ("main", "list"))
+
+    def get(self, list_name):
+        """返回缓存的详情 {"main": ..., "list": ..., "fetched_at": ...}，没有时返回None"""
+        with self._lock:
+            cached = self._memory.get(list_name)
+            if cached is not None:
+                self._memory.move_to_end(list_name)
+                return dict(cached[0])
+
+        # 内存中没有时读磁盘，并放回内存
+        entry = self._read_disk(list_name)
+        if entry is None:
+            return None
+        with self._lock:
+            cached = self._memory.get(list_name)
+            if cached is not None:
+                return dict(cached[0])  # 读磁盘期间 put() 已放入更新的内容
+            self._remember(list_name, entry)
+        return dict(entry)
+
+    def _read_disk(self, list_name):
+        path = self._path(list_name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # 记录最近访问时间，用于磁盘淘汰
+        except (OSError, ValueError):
+            return None
+        if entry.get("list_name") != list_name:
+            return None
+        return entry
+
+    def peek(self, list_name):
+        """只查内存中的缓存，不读磁盘也不改变淘汰顺序，可以在界面线程中调用"""
+        with self._lock:
+            cached = self._memory.get(list_name)
+            return dict(cached[0]) if cached is not None else None
+
+    def put(self, list_name, part, text):
+        """更新某个命令库的一部分("main" 或 "list")，同时写入内存和磁盘
+
+        同一命令库的两部分通常由两个线程同时获取。读取旧内容、合并、放回内存
+        和写文件都在 _write_lock 内完成，后一次更新总是在前一次的结果上合并，
+        磁盘上也不会被较旧的内容覆盖。
+        """
+        with self._write_lock:
+            with self._lock:
+                cached = self._memory.get(list_name)
+            entry = dict(cached[0]) if cached is not None else self._read_disk(list_name)
+            if entry is None:
+                entry = {"list_name": list_name}
+            entry[part] = text
+            entry["fetched_at"] = time.time()
+
+            with self._lock:
+                self._remember(list_name, entry)
+            self._write_disk(list_name, entry)
+
+    def _remember(self, list_name, entry):
+        """放入内存LRU，超过数量或字节上限时淘汰最久未用的"""
+        old = self._memory.pop(list_name, None)
+        if old is not None:
+            self._memory_bytes -= old[1]
+        size = self._entry_size(entry)
+        self._memory[list_name] = (entry, size)
+        self._memory_bytes += size
+        while self._memory and (len(self._memory) > self.MAX_MEMORY_ENTRIES
+                                or self._memory_bytes > self.MAX_MEMORY_BYTES):
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _write_disk(self, list_name, entry):
+        path = self._path(list_name)
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        try:
+            atomic_write(path, data)
+        except OSError as e:
+            print(f"保存详情缓存时出错: {str(e)}")
+            return
+        with self._lock:
+            sizes = self._scan_disk()
+            sizes[path] = len(data)
+            self._evict_disk(sizes)
+
+    def _scan_disk(self):
+        if self._disk_sizes is None:
+            self._disk_sizes = {}
+            try:
+                for item in os.scandir(self.cache_dir):
+                    if item.name.endswith(".json"):
+                        self._disk_sizes[item.path] = item.stat().st_size
+            except OSError:
+                pass
+        return self._disk_sizes
+
+    def _evict_disk(self, sizes):
+        """磁盘缓存超过数量或总大小上限时，删除最久未访问的文件"""
+        if len(sizes) <= self.MAX_DISK_ENTRIES and sum(sizes.values()) <= self.MAX_DISK_BYTES:
+            return
+
+        def last_used(path):
+            try:
+                return os.stat(path).st_mtime
+            except OSError:
+                return 0
+
+        total = sum(sizes.values())
+        for path in sorted(sizes, key=last_used):
+            if len(sizes) <= self.MAX_DISK_ENTRIES and total <= self.MAX_DISK_BYTES:
+                break
+            total -= sizes.pop(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def invalidate(self, list_name):
+        """删除某个命令库的缓存"""
+        with self._lock:
+            old = self._memory.pop(list_name, None)
+            if old is not None:
+                self._memory_bytes -= old[1]
+            path = self._path(list_name)
+            if self._disk_sizes is not None:
+                self._disk_sizes.pop(path, None)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_detail_cache = None
+_detail_cache_lock = threading.Lock()
+
+
+def get_detail_cache():
+    """返回进程内共享的详情缓存"""
+    global _detail_cache
+    with _detail_cache_lock:
+        if _detail_cache is None:
+            _detail_cache = LibraryDetailCache()
+        return _detail_cache
@@ -0,0 +1,54 @@
+# 登录状态验证结果的本地缓存
+import os
+import json
+import time
+import hashlib
+
+from utils.catalog_cache import get_cache_dir, atomic_write
+
+
+class LoginVerificationCache:
+    """记录服务器最近一次确认保存的登录信息有效的时间
+
+    ttl 秒内再次启动时直接信任保存的登录状态，不再向服务器验证。
+    文件中只有用户名和用户ID的哈希，不保存它们本身。
+    """
+
+    FILE_NAME = "login_verified.json"
+
+    def __init__(self, ttl, cache_dir=None):
+        self.ttl = ttl
+        self.path = os.path.join(cache_dir or get_cache_dir(), self.FILE_NAME)
+
+    @staticmethod
+    def _key(username, user_id):
+        return hashlib.sha256(f"{username}\n{user_id}".encode('utf-8')).hexdigest()
+
+    def is_fresh(self, username, user_id):
+        """该登录信息是否在 ttl 秒内验证过"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(data, dict) or data.get("key") != self._key(username, user_id):
+            return False
+        verified_at = data.get("verified_at", 0)
+        return 0 <= time.time() - verified_at < self.ttl
+
+    def record(self, username, user_id):
+        """记录一次验证成功"""
+        data = {"key": self._key(username, user_id), "verified_at": time.time()}
+        try:
+            atomic_write(self.path, json.dumps(data).encode('utf-8'))
+        except OSError as e:
+            print(f"保存登录验证记录时出错: {str(e)}")
+
+    def clear(self):
+        """退出登录或验证失败时删除记录"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"删除登录验证记录时出错: {str(e)}")
@@ -0,0 +1,65 @@
+# 本机标识和由它派生的加密密钥(进程内只计算一次)
+import uuid
+import hashlib
+import platform
+import threading
+
+_lock = threading.Lock()
+_machine_info = None
+_derived = {}
+
+
+def _compute_machine_info():
+    # 获取系统信息和硬件标识
+    system_info = platform.system() + platform.version()
+    try:
+        machine_id = str(uuid.getnode())  # MAC地址的数字表示，可能需要调用外部命令，较慢
+    except Exception:
+        machine_id = "fallback_id"
+
+    # 组合并返回
+    return f"{system_info}:{machine_id}:MystiAide_Secret_Key"
+
+
+def get_machine_info():
+    """获取机器特定信息作为加密密钥的种子，第一次调用后直接返回缓存的结果"""
+    global _machine_info
+    with _lock:
+        if _machine_info is None:
+            _machine_info = _compute_machine_info()
+        return _machine_info
+
+
+def _derive(name, compute):
+    """返回按名称缓存的派生值，没有时用 compute(机器信息) 计算"""
+    machine_info = get_machine_info()
+    with _lock:
+        value = _derived.get(name)
+        if value is None:
+            value = _derived[name] = compute(machine_info)
+        return value
+
+
+def get_machine_key():
+    """由机器信息派生的16字节AES密钥(登录数据和加密文件使用)"""
+    return _derive("aes_key", lambda info: hashlib.sha256(info.encode()).digest()[:16])
+
+
+def get_machine_hash():
+    """机器信息的MD5前12位，用于登录文件名"""
+    return _derive("file_hash", lambda info: hashlib.md5(info.encode()).hexdigest()[:12])
+
+
+def prefetch_machine_info():
+    """在后台线程中提前计算机器信息和密钥，之后第一次加密解密时不必等待"""
+    thread = threading.Thread(target=get_machine_key, name="machine-info", daemon=True)
+    thread.start()
+    return thread
+
+
+def invalidate_machine_info():
+    """丢弃缓存的机器信息和派生的密钥(如网卡变化后)，下次使用时重新计算"""
+    global _machine_info
+    with _lock:
+        _machine_info = None
+        _derived.clear()
@@ -0,0 +1,260 @@
+# 命令库的本地离线镜像(SQLite)
+import os
+import time
+import sqlite3
+import threading
+
+from utils.catalog import make_full_name
+from utils.catalog_cache import get_cache_dir
+from utils.command_library import parse_command_list
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS libraries (
+    name TEXT PRIMARY KEY,        -- 完整名称(名称≈描述)，与详情地址一致
+    description TEXT NOT NULL,
+    position INTEGER NOT NULL,    -- 在目录中的顺序
+    main TEXT,                    -- main.xml 原文
+    list TEXT,                    -- list.xml 原文
+    synced_at REAL                -- 最近一次同步时间，为NULL表示尚未同步
+);
+CREATE TABLE IF NOT EXISTS commands (
+    library TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    command TEXT NOT NULL,
+    description TEXT NOT NULL,
+    PRIMARY KEY (library, position)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 命令的全文索引，内容取自 commands 表，由触发器保持同步
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE commands_fts USING fts5(
+    command, description, content='commands', content_rowid='rowid', tokenize='{tokenizer}'
+);
+CREATE TRIGGER commands_fts_insert AFTER INSERT ON commands BEGIN
+    INSERT INTO commands_fts (rowid, command, description) VALUES (new.rowid, new.command, new.description);
+END;
+CREATE TRIGGER commands_fts_delete AFTER DELETE ON commands BEGIN
+    INSERT INTO commands_fts (commands_fts, rowid, command, description)
+    VALUES ('delete', old.rowid, old.command, old.description);
+END;
+"""
+
+
+class LibraryMirror:
+    """把整个目录和每个命令库的 main.xml / list.xml 保存在本地 SQLite 数据库中
+
+    同步进度按命令库记录(synced_at)，中断后再次同步只获取尚未同步或
+    已经过期的命令库。每个线程使用自己的连接，数据库为 WAL 模式，
+    后台同步写入时界面仍可读取。
+
+    所有命令另有 FTS5 全文索引，SQLite 支持时使用 trigram 分词，
+    中文和命令中的任意片段都能匹配；不支持 FTS5 时搜索退回逐行匹配。
+    """
+
+    FILE_NAME = "mirror.sqlite3"
+    TRIGRAM_MIN = 3   # trigram 索引只能匹配至少3个字符的片段
+    RANK_MAX = 5000   # 匹配数量不超过此值时按相关度排序
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_cache_dir(), self.FILE_NAME)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock:
+            conn = self._conn()
+            conn.executescript(SCHEMA)
+            conn.commit()
+            self.fts_tokenizer = self._ensure_fts(conn)
+
+    @staticmethod
+    def _ensure_fts(conn):
+        """建立命令全文索引(已有时直接使用)，返回使用的分词器，不支持 FTS5 时返回None"""
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'commands_fts'").fetchone()
+        if row is not None:
+            return "trigram" if "trigram" in row[0] else "unicode61"
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                with conn:
+                    conn.executescript("BEGIN;" + FTS_SCHEMA.format(tokenizer=tokenizer) + "COMMIT;")
+                    # 为建立索引之前已同步的命令补建索引
+                    conn.execute("INSERT INTO commands_fts (commands_fts) VALUES ('rebuild')")
+                return tokenizer
+            except sqlite3.OperationalError:
+                conn.rollback()
+        return None
+
+    @classmethod
+    def exists(cls, path=None):
+        return os.path.exists(path or os.path.join(get_cache_dir(), cls.FILE_NAME))
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def replace_catalog(self, rows):
+        """用最新的目录 [(名称, 描述), ...] 更新命令库列表
+
+        新出现的命令库加入待同步，目录中已不存在的命令库连同命令一起删除，
+        已同步的内容保留。
+        """
+        entries = [(make_full_name(name, desc), desc, position) for position, (name, desc) in enumerate(rows)]
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS current_names (name TEXT PRIMARY KEY)")
+                conn.execute("DELETE FROM current_names")
+                conn.executemany("INSERT OR IGNORE INTO current_names (name) VALUES (?)",
+                                 ((name,) for name, _, _ in entries))
+                conn.execute("DELETE FROM commands WHERE library NOT IN (SELECT name FROM current_names)")
+                conn.execute("DELETE FROM libraries WHERE name NOT IN (SELECT name FROM current_names)")
+                conn.executemany(
+                    "INSERT INTO libraries (name, description, position) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET description = excluded.description, "
+                    "position = excluded.position",
+                    entries)
+
+    def pending_libraries(self, max_age=None):
+        """返回需要同步的命令库名称：尚未同步的在前，其次是同步时间早于 max_age 秒前的"""
+        conn = self._conn()
+        names = [name for (name,) in conn.execute(
+            "SELECT name FROM libraries WHERE synced_at IS NULL ORDER BY position")]
+        if max_age is not None:
+            names.extend(name for (name,) in conn.execute(
+                "SELECT name FROM libraries WHERE synced_at < ? ORDER BY synced_at",
+                (time.time() - max_age,)))
+        return names
+
+    def store_library(self, name, main, list_text):
+        """保存一个命令库的 main.xml 和 list.xml，并展开为命令表"""
+        commands = parse_command_list(list_text)
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                updated = conn.execute(
+                    "UPDATE libraries SET main = ?, list = ?, synced_at = ? WHERE name = ?",
+                    (main, list_text, time.time(), name)).rowcount
+                if not updated:
+                    return  # 同步期间已从目录中删除
+                conn.execute("DELETE FROM commands WHERE library = ?", (name,))
+                conn.executemany(
+                    "INSERT INTO commands (library, position, command, description) VALUES (?, ?, ?, ?)",
+                    ((name, position, c['command'], c['description']) for position, c in enumerate(commands)))
+
+    def get_library(self, name):
+        """返回已同步的命令库 {"main": ..., "list": ..., "fetched_at": ...}，没有时返回None"""
+        row = self._conn().execute(
+            "SELECT main, list, synced_at FROM libraries WHERE name = ? AND synced_at IS NOT NULL",
+            (name,)).fetchone()
+        if row is None:
+            return None
+        return {"main": row[0], "list": row[1], "fetched_at": row[2]}
+
+    def has_library(self, name):
+        return self._conn().execute(
+            "SELECT 1 FROM libraries WHERE name = ? AND synced_at IS NOT NULL", (name,)).fetchone() is not None
+
+    def get_commands(self, name):
+        """返回命令库中的命令 [{'command': ..., 'description': ...}, ...]"""
+        return [{'command': command, 'description': description} for command, description in self._conn().execute(
+            "SELECT command, description FROM commands WHERE library = ? ORDER BY position", (name,))]
+
+    def search_commands(self, query, limit=200):
+        """在所有已同步的命令中搜索，返回按相关度排序的
+        [(命令库名称, 命令在列表中的位置, 命令, 描述), ...]
+
+        查询按空白分成多个词，每个词都要出现在命令或描述中。
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        if self.fts_tokenizer == "trigram" and all(len(term) >= self.TRIGRAM_MIN for term in terms):
+            return self._search_fts(" AND ".join(_fts_phrase(term) for term in terms), limit)
+        if self.fts_tokenizer == "unicode61":
+            return self._search_fts(" AND ".join(_fts_phrase(term) + "*" for term in terms), limit)
+        return self._search_like(terms, limit)
+
+    def _search_fts(self, match, limit):
+        conn = self._conn()
+        matched = conn.execute("SELECT COUNT(*) FROM (SELECT 1 FROM commands_fts WHERE commands_fts MATCH ? LIMIT ?)",
+                               (match, self.RANK_MAX + 1)).fetchone()[0]
+        if matched <= self.RANK_MAX:
+            # 命令中的匹配比描述中的权重更高
+            return conn.execute(
+                "SELECT c.library, c.position, c.command, c.description FROM "
+                "(SELECT rowid, bm25(commands_fts, 4.0, 1.0) AS score FROM commands_fts "
+                " WHERE commands_fts MATCH ? ORDER BY score LIMIT ?) AS hit "
+                "JOIN commands AS c ON c.rowid = hit.rowid ORDER BY hit.score",
+                (match, limit)).fetchall()
+
+        # 匹配的命令太多时逐个计算相关度太慢，且区分意义不大：
+        # 只把命令本身匹配的排在前面，其余按镜像中的顺序
+        select = ("SELECT c.library, c.position, c.command, c.description "
+                  "FROM commands_fts JOIN commands AS c ON c.rowid = commands_fts.rowid "
+                  "WHERE commands_fts MATCH ? LIMIT ?")
+        results = conn.execute(select, (f"command : ({match})", limit)).fetchall()
+        if len(results) < limit:
+            seen = {(library, position) for library, position, _, _ in results}
+            results.extend(row for row in conn.execute(select, (match, limit + len(results)))
+                           if (row[0], row[1]) not in seen)
+        return results[:limit]
+
+    def _search_like(self, terms, limit):
+        """逐行匹配(查询中有过短的词或不支持全文索引时)，命令中出现的排在前面"""
+        patterns = ["%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                    for term in terms]
+        conditions = " AND ".join("(command LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\')" for _ in terms)
+        return self._conn().execute(
+            "SELECT library, position, command, description FROM commands WHERE " + conditions +
+            " ORDER BY command NOT LIKE ? ESCAPE '\\', length(command) LIMIT ?",
+            [value for pattern in patterns for value in (pattern, pattern)] + [patterns[0], limit]).fetchall()
+
+    def catalog_rows(self):
+        """返回镜像中的目录 [(名称, 描述), ...]"""
+        rows = []
+        for full_name, desc in self._conn().execute("SELECT name, description FROM libraries ORDER BY position"):
+            suffix = f"≈{desc}" if desc else ""
+            rows.append((full_name[:len(full_name) - len(suffix)], desc))
+        return rows
+
+    def stats(self):
+        """返回 (命令库总数, 已同步数量)"""
+        total, synced = self._conn().execute(
+            "SELECT COUNT(*), COUNT(synced_at) FROM libraries").fetchone()
+        return total, synced
+
+    def get_meta(self, key, default=None):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def _fts_phrase(term):
+    """把一个词转成 FTS5 的短语，避免其中的符号被当作查询语法"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def get_mirror(create=False):
+    """返回进程内共享的离线镜像；还没有建立过镜像且 create 为False时返回None"""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None and (create or LibraryMirror.exists()):
+            _mirror = LibraryMirror()
+        return _mirror
@@ -0,0 +1,111 @@
+# 汉字名称的拼音和首字母，用于拼音搜索(需要可选的 pypinyin 库)
+import os
+import re
+import json
+import threading
+
+from utils.catalog_cache import get_cache_dir, atomic_write
+
+_HAN = re.compile(r'[\u3400-\u9fff]')  # 常用汉字及扩展A区
+_pypinyin = None
+
+
+def _load_pypinyin():
+    """第一次用到时才导入 pypinyin(导入时要加载字典)，没有安装时返回None"""
+    global _pypinyin
+    if _pypinyin is None:
+        try:
+            import pypinyin
+            _pypinyin = pypinyin
+        except ImportError:
+            print("未安装 pypinyin，搜索不支持拼音")
+            _pypinyin = False
+    return _pypinyin or None
+
+
+def transliterate(text):
+    """返回 (全拼, 首字母)，均为小写且不含空白，如 "网络命令" -> ("wangluomingling", "wlml")
+
+    不含汉字或没有安装 pypinyin 时返回None。非汉字部分原样保留。
+    """
+    if not _HAN.search(text):
+        return None
+    pypinyin = _load_pypinyin()
+    if pypinyin is None:
+        return None
+    full = "".join(pypinyin.lazy_pinyin(text))
+    initials = "".join(pypinyin.lazy_pinyin(text, style=pypinyin.Style.FIRST_LETTER))
+    return "".join(full.lower().split()), "".join(initials.lower().split())
+
+
+class PinyinCache:
+    """目录中名称和描述的拼音，保存在目录缓存旁边
+
+    转换拼音比建立搜索索引本身慢得多，因此结果按原文缓存到磁盘，下次启动
+    只需转换新出现的文本。保存时只保留本次用到的文本，目录中删除的名称
+    不会一直留在缓存里。可以在多个线程中使用。
+    """
+
+    FILE_NAME = "catalog_pinyin.json"
+
+    def __init__(self, cache_dir=None):
+        self.path = os.path.join(cache_dir or get_cache_dir(), self.FILE_NAME)
+        self._lock = threading.Lock()
+        self._entries = None   # 原文 -> [全拼, 首字母]，不含汉字的文本不记录
+        self._used = set()
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def search_text(self, text):
+        """返回追加到搜索文本后面的拼音("\\n全拼\\n首字母")，不含汉字时返回空字符串"""
+        if not _HAN.search(text):
+            return ""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(text)
+            self._used.add(text)
+        if entry is None:
+            entry = transliterate(text)
+            if entry is None:
+                return ""
+            with self._lock:
+                self._entries[text] = list(entry)
+                self._dirty = True
+        return f"\n{entry[0]}\n{entry[1]}"
+
+    def save(self):
+        """把新转换的拼音写入磁盘，并去掉本次没有用到的文本"""
+        with self._lock:
+            if self._entries is None or not self._used:
+                return
+            entries = {text: self._entries[text] for text in self._used if text in self._entries}
+            self._used = set()
+            if not self._dirty and len(entries) == len(self._entries):
+                return
+            self._entries = entries
+            self._dirty = False
+        try:
+            atomic_write(self.path, json.dumps(entries, ensure_ascii=False).encode('utf-8'))
+        except OSError as e:
+            print(f"保存拼音缓存时出错: {str(e)}")
+
+
+_pinyin_cache = None
+_pinyin_cache_lock = threading.Lock()
+
+
+def get_pinyin_cache():
+    """返回进程内共享的拼音缓存"""
+    global _pinyin_cache
+    with _pinyin_cache_lock:
+        if _pinyin_cache is None:
+            _pinyin_cache = PinyinCache()
+        return _pinyin_cache
@@ -0,0 +1,247 @@
+# 统一调度所有网络请求：按优先级排队、限制每个主机的并发数、合并相同的请求
+import itertools
+import threading
+import urllib.parse
+from collections import defaultdict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+# 优先级，数值越小越优先
+INTERACTIVE = 0   # 用户正在等待的请求
+PREFETCH = 1      # 预取
+BACKGROUND = 2    # 后台同步
+
+
+class RequestCancelled(Exception):
+    """请求被取消"""
+
+
+class CancelToken:
+    """取消标记，绑定到一个对话框、一次加载或一次查询
+
+    取消后，排队中的请求不再发送，已登记的回调(如关闭正在读取的连接)
+    会被立即调用；可以在任意线程中取消。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._event = threading.Event()
+        self._callbacks = []
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def raise_if_cancelled(self):
+        if self._cancelled:
+            raise RequestCancelled()
+
+    def wait(self, seconds):
+        """最多等待 seconds 秒，期间被取消时立即返回 True"""
+        return self._event.wait(seconds)
+
+    def add_callback(self, callback):
+        """登记取消时要调用的函数；已经取消的立即调用"""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+
+class _Ticket:
+    """一个正在排队的请求"""
+
+    __slots__ = ("priority", "seq", "host", "cancelled")
+
+    def __init__(self, priority, seq, host):
+        self.priority = priority
+        self.seq = seq
+        self.host = host
+        self.cancelled = False
+
+    def order(self):
+        return self.priority, self.seq
+
+
+class _InFlight:
+    """进行中的可合并请求，后来的相同请求直接等待它的结果"""
+
+    __slots__ = ("future", "ticket")
+
+    def __init__(self):
+        self.future = Future()
+        self.ticket = None
+
+
+class RequestScheduler:
+    """网络请求调度器
+
+    每个请求先按 (优先级, 到达顺序) 排队，同一主机同时进行的请求不超过
+    max_per_host 个，且始终为交互请求保留 reserved_interactive 个名额，
+    因此预取和后台同步不会占满连接而拖慢用户正在等待的请求。
+    排队中的请求可以被取消；后到的高优先级请求总是排在低优先级请求前面。
+    """
+
+    def __init__(self, max_per_host=4, reserved_interactive=1):
+        self.max_per_host = max_per_host
+        self.reserved_interactive = reserved_interactive
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._active = defaultdict(int)  # 主机 -> 进行中的请求数
+        self._waiting = []               # 排队中的 _Ticket
+        self._inflight = {}              # 合并键 -> _InFlight
+
+    @staticmethod
+    def _host(url):
+        return urllib.parse.urlsplit(url).netloc
+
+    def _limit(self, priority):
+        if priority == INTERACTIVE:
+            return self.max_per_host
+        return max(1, self.max_per_host - self.reserved_interactive)
+
+    def _can_start(self, ticket):
+        """同一主机排在最前面且有空闲名额的请求才能开始"""
+        if self._active[ticket.host] >= self._limit(ticket.priority):
+            return False
+        first = min((t for t in self._waiting if t.host == ticket.host), key=_Ticket.order)
+        return first is ticket
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _acquire(self, ticket, cancel_token=None):
+        if cancel_token is not None:
+            cancel_token.add_callback(self._wake)
+        try:
+            with self._cond:
+                self._waiting.append(ticket)
+                try:
+                    while True:
+                        if ticket.cancelled or (cancel_token is not None and cancel_token.is_cancelled()):
+                            raise RequestCancelled()
+                        if self._can_start(ticket):
+                            self._active[ticket.host] += 1
+                            return
+                        self._cond.wait()
+                finally:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+        finally:
+            if cancel_token is not None:
+                cancel_token.remove_callback(self._wake)
+
+    def _release(self, host):
+        with self._cond:
+            self._active[host] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url, priority=INTERACTIVE, cancel_token=None):
+        """占用一个连接名额，用于需要长时间读取的请求(如流式下载)
+
+        排队期间 cancel_token 被取消时抛出 RequestCancelled。
+        """
+        ticket = _Ticket(priority, next(self._seq), self._host(url))
+        self._acquire(ticket, cancel_token)
+        try:
+            yield
+        finally:
+            self._release(ticket.host)
+
+    def request(self, url, fn, priority=INTERACTIVE, key=None, cancel_token=None):
+        """排队后在当前线程执行 fn() 并返回其结果
+
+        key 不为None时，与正在进行的相同 key 的请求合并，只执行一次；
+        如果后来的请求优先级更高，排队中的原请求会提升到该优先级。
+        原请求在排队时被取消的，等待它的请求会自己重新排队。
+        """
+        if key is None:
+            with self.slot(url, priority, cancel_token):
+                return fn()
+
+        while True:
+            with self._cond:
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    inflight = self._inflight[key] = _InFlight()
+                    inflight.ticket = _Ticket(priority, next(self._seq), self._host(url))
+                    break
+                ticket = inflight.ticket
+                if ticket.priority > priority:
+                    ticket.priority = priority
+                    self._cond.notify_all()
+            try:
+                return self._wait_shared(inflight.future, cancel_token)
+            except RequestCancelled:
+                if cancel_token is not None and cancel_token.is_cancelled():
+                    raise
+
+        try:
+            self._acquire(inflight.ticket, cancel_token)
+            try:
+                result = fn()
+            finally:
+                self._release(inflight.ticket.host)
+        except BaseException as e:
+            inflight.future.set_exception(e)
+            raise
+        else:
+            inflight.future.set_result(result)
+            return result
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+
+    @staticmethod
+    def _wait_shared(future, cancel_token):
+        """等待合并的请求完成，自己被取消时不再等待"""
+        while True:
+            try:
+                return future.result(timeout=0.2 if cancel_token is not None else None)
+            except FutureTimeout:
+                if cancel_token.is_cancelled():
+                    raise RequestCancelled()
+
+    def cancel_waiting(self, priority):
+        """取消所有排队中的指定优先级的请求(已开始的不受影响)"""
+        with self._cond:
+            for ticket in self._waiting:
+                if ticket.priority == priority:
+                    ticket.cancelled = True
+            self._cond.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """返回进程内共享的请求调度器"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
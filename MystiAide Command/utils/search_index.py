@@ -0,0 +1,174 @@
+# 命令库目录的内存搜索索引
+from array import array
+from collections import OrderedDict
+from itertools import chain
+
+from utils.catalog import TextColumn
+
+
+class _NgramColumn:
+    """一列小写文本及其1字和2字片段的倒排表，文本拼接存放在一个共享缓冲区中"""
+
+    NGRAM = 2
+
+    def __init__(self):
+        self.texts = TextColumn()
+        self.postings = {}  # 片段 -> array('I') 编号(递增)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def extend(self, texts):
+        postings = self.postings
+        text_id = len(self.texts)
+        for text in texts:
+            for gram in self._grams(text):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array('I')
+                posting.append(text_id)
+            text_id += 1
+        # 在加载线程里并入共享缓冲区，不留到第一次搜索时在界面线程里做
+        self.texts.extend(texts)
+        self.texts.flush()
+
+    def _grams(self, text):
+        """返回文本中所有不重复的1字和2字片段"""
+        grams = set(text)
+        n = self.NGRAM
+        grams.update(text[i:i + n] for i in range(len(text) - n + 1))
+        grams.discard('\n')
+        return {g for g in grams if '\n' not in g}
+
+    def candidates(self, query):
+        """返回可能包含查询的编号(最稀有片段的倒排表)，查询本身是片段时即为结果"""
+        n = self.NGRAM
+        if len(query) <= n:
+            return self.postings.get(query, ())
+        candidates = ()
+        for i in range(len(query) - n + 1):
+            posting = self.postings.get(query[i:i + n])
+            if posting is None:
+                return ()
+            if not candidates or len(posting) < len(candidates):
+                candidates = posting
+        return candidates
+
+    def search(self, query, candidates):
+        """返回候选编号中包含查询子串的编号列表(递增)"""
+        if len(query) <= self.NGRAM and candidates is self.postings.get(query):
+            return list(candidates)
+        return self.texts.rows_containing(candidates, query)
+
+
+class CatalogSearchIndex:
+    """基于字符n-gram倒排表的子串搜索索引
+
+    目录加载时建立一次：名称和描述预先转成小写，并为每个1字和2字片段记录
+    出现过的编号。查询时取查询词中最稀有的片段对应的编号，再逐个确认子串，
+    因此耗时只与候选数有关，与目录大小无关。
+
+    与 CatalogStore 一样，名称逐行拼接存放在一个共享缓冲区中；描述(通常是
+    "作者@id"，大量重复)去重后只索引一次，每行只记录描述编号，匹配的描述
+    再展开为使用它的行。
+
+    连续输入时(如 dock -> docke -> docker)，新查询包含上一次查询时直接在
+    上一次的结果中筛选；最近的查询结果保存在一个小的LRU缓存里，退格和重复
+    搜索可以直接命中。
+
+    传入 pinyin(PinyinCache)时，含汉字的名称和描述的全拼和首字母也加入
+    各自的文本，"wlml"、"wangluo" 都能搜到 "网络命令"，与直接搜索汉字
+    走同一套索引，速度相同。
+    """
+
+    NGRAM = _NgramColumn.NGRAM
+    CACHE_SIZE = 32
+
+    def __init__(self, pinyin=None):
+        self.pinyin = pinyin
+        self.clear()
+
+    def clear(self):
+        """清空索引"""
+        self._names = _NgramColumn()  # 每行小写的名称，后面可能跟着拼音
+        self._descs = _NgramColumn()  # 去重后小写的描述，后面可能跟着拼音
+        self._desc_lookup = {}        # 描述 -> 编号
+        self._desc_rows = []          # 描述编号 -> array('I') 使用它的行号(递增)
+        self._reset_query_cache()
+
+    def _reset_query_cache(self):
+        """索引内容变化后，之前的查询结果全部失效"""
+        self._cache = OrderedDict()  # 查询 -> 行号列表
+        self._last_query = None
+        self._last_result = None
+
+    def __len__(self):
+        return len(self._names)
+
+    def add_rows(self, rows):
+        """按顺序追加 (名称, 描述) 行，行号与目录模型中的行号一致"""
+        self._reset_query_cache()
+        pinyin = self.pinyin
+        lookup = self._desc_lookup
+        desc_rows = self._desc_rows
+        names = []
+        new_descs = []
+        row_id = len(self._names)
+        for name, desc in rows:
+            text = name.lower()
+            if pinyin is not None:
+                text += pinyin.search_text(name)
+            names.append(text)
+
+            desc_id = lookup.get(desc)
+            if desc_id is None:
+                desc_id = lookup[desc] = len(desc_rows)
+                desc_rows.append(array('I'))
+                text = desc.lower()
+                if pinyin is not None:
+                    text += pinyin.search_text(desc)
+                new_descs.append(text)
+            desc_rows[desc_id].append(row_id)
+            row_id += 1
+        self._names.extend(names)
+        self._descs.extend(new_descs)
+
+    def search(self, query):
+        """返回包含查询子串的行号列表(递增)，空查询返回None表示全部
+
+        返回的列表可能来自缓存，调用方不要修改。
+        """
+        query = query.lower()
+        if not query:
+            return None
+
+        result = self._cache.get(query)
+        if result is not None:
+            self._cache.move_to_end(query)
+        else:
+            result = self._search_uncached(query)
+            self._cache[query] = result
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+        self._last_query = query
+        self._last_result = result
+        return result
+
+    def _search_uncached(self, query):
+        # 名称匹配的行：新查询包含上一次的查询时，结果一定是上一次结果的子集
+        candidates = self._names.candidates(query)
+        last_query = self._last_query
+        if (last_query and last_query in query
+                and len(self._last_result) < len(candidates)):
+            candidates = self._last_result
+        name_rows = self._names.search(query, candidates)
+
+        # 描述匹配的行：每种描述只检查一次，再展开为使用它的行
+        desc_ids = self._descs.search(query, self._descs.candidates(query))
+        if not desc_ids:
+            return name_rows
+        if len(desc_ids) == 1 and not name_rows:
+            return list(self._desc_rows[desc_ids[0]])
+        # 整数集合按从小到大的顺序存放，排序几乎不用再移动
+        return sorted(set(chain(name_rows, *map(self._desc_rows.__getitem__, desc_ids))))
@@ -0,0 +1,55 @@
+# 启动过程各阶段的耗时
+import os
+import time
+
+PROFILE_ENV = "MYSTIAIDE_PROFILE_STARTUP"  # 设置后在控制台输出启动耗时
+
+
+class StartupTimeline:
+    """记录启动时每个阶段的耗时
+
+    mark(阶段) 记录从上一次 mark(或开始)到现在的时间；finish() 结束记录，
+    启用时输出每个阶段的毫秒数和总耗时。结束后的 mark 被忽略。
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []   # [(阶段, 毫秒), ...]
+        self.finished = False
+
+    def mark(self, phase):
+        if self.finished:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def total_ms(self):
+        return (self._last - self.started) * 1000
+
+    def report(self):
+        lines = ["启动耗时:"]
+        lines.extend(f"  {phase}: {ms:.1f} ms" for phase, ms in self.phases)
+        lines.append(f"  合计: {self.total_ms():.1f} ms")
+        return "\n".join(lines)
+
+    def finish(self, phase=None):
+        """记录最后一个阶段并结束，只有第一次调用有效"""
+        if self.finished:
+            return
+        if phase:
+            self.mark(phase)
+        self.finished = True
+        if self.enabled:
+            print(self.report())
+
+
+# 在 main.py 最先导入，开始时间接近进程启动时间
+_timeline = StartupTimeline(enabled=bool(os.environ.get(PROFILE_ENV)))
+
+
+def get_startup_timeline():
+    """返回本次启动的耗时记录"""
+    return _timeline
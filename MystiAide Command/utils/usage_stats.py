@@ -0,0 +1,43 @@
+# 记录用户打开各个命令库的次数，用于预取常用命令库
+import os
+import json
+import time
+
+from utils.catalog_cache import get_cache_dir, atomic_write
+
+
+class LibraryUsageStats:
+    """按命令库名称(list_name)统计打开次数和最近打开时间，保存在本地"""
+
+    MAX_ENTRIES = 500
+    FILE_NAME = "usage.json"
+
+    def __init__(self, cache_dir=None):
+        self.path = os.path.join(cache_dir or get_cache_dir(), self.FILE_NAME)
+        self._usage = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def record_open(self, list_name):
+        """记录一次打开"""
+        count, _ = self._usage.get(list_name, (0, 0))
+        self._usage[list_name] = (count + 1, time.time())
+        if len(self._usage) > self.MAX_ENTRIES:
+            # 只保留最常用的命令库
+            kept = sorted(self._usage.items(), key=lambda item: item[1], reverse=True)
+            self._usage = dict(kept[:self.MAX_ENTRIES])
+        try:
+            atomic_write(self.path, json.dumps(self._usage, ensure_ascii=False).encode('utf-8'))
+        except OSError as e:
+            print(f"保存使用记录时出错: {str(e)}")
+
+    def most_used(self, limit=5):
+        """返回打开次数最多的命令库名称，次数相同时最近打开的在前"""
+        ranked = sorted(self._usage.items(), key=lambda item: (item[1][0], item[1][1]), reverse=True)
+        return [list_name for list_name, _ in ranked[:limit]]